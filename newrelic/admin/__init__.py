@@ -25,6 +25,7 @@ _builtin_plugins = [
     "run_program",
     "run_python",
     "server_config",
+    "startup_profile",
     "validate_config",
 ]
 
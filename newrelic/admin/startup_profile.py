@@ -0,0 +1,52 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from newrelic.admin import command, usage
+
+
+@command('startup-profile', '[--output=path] ...',
+"""Executes the command line in the same way as run-program, but also
+profiles the time the agent adds to the startup of each Python process
+started. When the process exits, a JSON report is written with the time
+taken by each phase of the agent startup, the time taken by each
+instrumentation hook which was run, and the modules imported only because
+of the agent.
+
+The report is written to the path given by the --output option, where any
+"{pid}" is replaced with the process ID. The default path is
+newrelic-startup-profile-{pid}.json in the current working directory, and
+a path of "-" writes the report to stderr. As with run-program, the agent
+configuration must be supplied using environment variables.""")
+def startup_profile(args):
+    import os
+    import sys
+
+    from newrelic.admin.run_program import run_program
+
+    output = 'newrelic-startup-profile-{pid}.json'
+
+    if args and args[0].startswith('--output='):
+        output = args[0][len('--output='):]
+        args = args[1:]
+
+    if len(args) == 0 or not output:
+        usage('startup-profile')
+        sys.exit(1)
+
+    if output != '-':
+        output = os.path.abspath(output)
+
+    os.environ['NEW_RELIC_STARTUP_PROFILE'] = output
+
+    run_program(args)
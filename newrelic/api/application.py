@@ -87,6 +87,10 @@ class Application():
             return global_settings
         return self._agent.application_settings(self._name)
 
+    @property
+    def preconnect_settings(self):
+        return self._agent.application_preconnect_settings(self._name)
+
     @property
     def active(self):
         return self.settings is not None
@@ -136,6 +140,10 @@ class Application():
         if self.active:
             self._agent.record_custom_metric(self._name, name, value)
 
+    def record_log_line(self, level_name):
+        if self.active:
+            self._agent.record_log_line(self._name, level_name)
+
     def record_custom_metrics(self, metrics):
         if self.active and metrics:
             self._agent.record_custom_metrics(self._name, metrics)
@@ -157,7 +165,7 @@ class Application():
             self._agent.record_ml_event(self._name, event_type, params)
 
     def record_transaction(self, data):
-        if self.active:
+        if self.active or self.preconnect_settings is not None:
             self._agent.record_transaction(self._name, data)
 
     def record_log_event(self, message, level=None, timestamp=None, attributes=None, priority=None):
@@ -56,8 +56,47 @@ _ok_modules = (
 
 _uninstrumented_modules = set()
 
+# Import hooks which are only created when the module is imported. Maps the
+# module name to the factory which creates the hook and its arguments.
+
+_lazy_import_hooks = {}
+
+
+def register_lazy_import_hooks(hooks, factory):
+    """Registers import hooks which are created by calling the factory with
+    the module name and the arguments for the module from the hooks mapping,
+    but only when the module is imported. This avoids creating and
+    registering hooks for the many modules which will never be imported.
+    Hooks for modules which have already been imported are created and
+    fired immediately.
+
+    """
+
+    for name, args in hooks.items():
+        if name in sys.modules or name in _import_hooks or name in _lazy_import_hooks:
+            register_import_hook(name, factory(name, *args))
+        else:
+            _lazy_import_hooks[name] = (factory, args)
+
+
+def _register_lazy_import_hook(name):
+    try:
+        factory, args = _lazy_import_hooks.pop(name)
+    except KeyError:
+        # Registered by another thread importing the same module.
+        return
+
+    _logger.debug("register module %s", (name,) + tuple(args))
+    register_import_hook(name, factory(name, *args))
+
 
 def register_import_hook(name, callable):  # pylint: disable=redefined-builtin
+    # Any lazy hook for the module is registered first, so hooks are still
+    # called in the order they were registered.
+
+    if name in _lazy_import_hooks:
+        _register_lazy_import_hook(name)
+
     hooks = _import_hooks.get(name, None)
 
     if name not in _import_hooks or hooks is None:
@@ -176,6 +215,9 @@ class ImportHookFinder:
 
         # If not something we are interested in we can return.
 
+        if fullname in _lazy_import_hooks:
+            _register_lazy_import_hook(fullname)
+
         if fullname not in _import_hooks:
             return None
 
@@ -21,7 +21,6 @@ from traceback import format_tb
 from newrelic.api.application import application_instance
 from newrelic.api.time_trace import get_linking_metadata
 from newrelic.api.transaction import current_transaction, record_log_event
-from newrelic.common import agent_http
 from newrelic.common.encoding_utils import json_encode
 from newrelic.common.object_names import parse_exc_info
 from newrelic.core.attribute import truncate
@@ -222,6 +221,8 @@ class NewRelicLogHandler(logging.Handler):
         self.license_key = license_key or self.settings.license_key
         self.host = host or self.settings.host or self.default_host(self.license_key)
 
+        from newrelic.common import agent_http
+
         self.client = agent_http.HttpClient(
             host=host,
             port=port,
@@ -20,12 +20,13 @@ import warnings
 from newrelic.api.transaction import current_transaction
 from newrelic.common.object_names import callable_name
 from newrelic.core.config import global_settings
-from newrelic.hooks.mlmodel_sklearn import _nr_instrument_model
 
 _logger = logging.getLogger(__name__)
 
 
 def wrap_mlmodel(model, name=None, version=None, feature_names=None, label_names=None, metadata=None):
+    from newrelic.hooks.mlmodel_sklearn import _nr_instrument_model
+
     model_callable_name = callable_name(model)
     _class = model.__class__.__name__
     module = sys.modules[model_callable_name.split(":")[0]]
@@ -27,7 +27,7 @@ from newrelic.core.code_level_metrics import (
     extract_code_from_callable,
     extract_code_from_traceback,
 )
-from newrelic.core.config import is_expected_error, should_ignore_error
+from newrelic.core.config import hot_flags, is_expected_error, should_ignore_error
 from newrelic.core.trace_cache import trace_cache
 
 _logger = logging.getLogger(__name__)
@@ -208,7 +208,7 @@ class TimeTrace():
         """Extract source code context from a callable and add appropriate attributes."""
         # Some derived classes do not have self.settings immediately
         settings = self.settings or self.transaction.settings
-        if source and settings and settings.code_level_metrics and settings.code_level_metrics.enabled:
+        if source and settings and hot_flags(settings).code_level_metrics:
             try:
                 node = extract_code_from_callable(source)
                 node.add_attrs(self._add_agent_attribute)
@@ -227,16 +227,9 @@ class TimeTrace():
         if not settings:
             return
 
-        if not settings.error_collector.enabled:
-            return
-
-        # At least one destination for error events must be enabled
-        if not (
-            settings.collect_traces
-            or settings.collect_span_events
-            or settings.collect_errors
-            or settings.collect_error_events
-        ):
+        # Error collection must be enabled, with at least one destination
+        # for error events.
+        if not hot_flags(settings).observe_errors:
             return
 
         # If no exception details provided, use current exception.
@@ -673,39 +666,74 @@ def get_trace_linking_metadata():
         return {}
 
 
-def get_service_linking_metadata(application=None, settings=None):
+# The service linking metadata for the last settings it was built for. This
+# is replaced whenever the settings change, such as when an application is
+# registered again and new settings are finalized.
+_service_linking_metadata_cache = None
+
+
+def _service_linking_metadata(settings):
+    """Returns the service linking metadata for the settings. The returned
+    dict is shared between callers so must be copied before it is changed.
+
+    """
+
+    global _service_linking_metadata_cache
+
+    app_name = settings.app_name
+    entity_guid = settings.entity_guid
+
+    cache = _service_linking_metadata_cache
+    if cache is not None and cache[0] is settings and cache[1] == app_name and cache[2] == entity_guid:
+        return cache[3]
+
     metadata = {
         "entity.type": "SERVICE",
+        "entity.name": app_name,
     }
+    if entity_guid:
+        metadata["entity.guid"] = entity_guid
+    metadata["hostname"] = platform.uname()[1]
 
-    trace = current_trace()
-    if settings is None and trace:
+    _service_linking_metadata_cache = (settings, app_name, entity_guid, metadata)
+
+    return metadata
+
+
+def _linking_metadata_settings(trace, application=None):
+    if trace:
         txn = trace.transaction
-        if txn:
-            settings = txn.settings
+        if txn and txn.settings:
+            return txn.settings
 
-    if not settings:
-        if application is None:
-            from newrelic.api.application import application_instance
+    if application is None:
+        from newrelic.api.application import application_instance
 
-            application = application_instance(activate=False)
+        application = application_instance(activate=False)
 
-        if application is not None:
-            settings = application.settings
+    if application is not None:
+        return application.settings
 
-    if settings:
-        metadata["entity.name"] = settings.app_name
-        entity_guid = settings.entity_guid
-        if entity_guid:
-            metadata["entity.guid"] = entity_guid
-        metadata["hostname"] = platform.uname()[1]
 
-    return metadata
+def get_service_linking_metadata(application=None, settings=None):
+    if settings is None:
+        settings = _linking_metadata_settings(current_trace(), application)
+
+    if not settings:
+        return {"entity.type": "SERVICE"}
+
+    return dict(_service_linking_metadata(settings))
 
 
 def get_linking_metadata(application=None):
-    metadata = get_service_linking_metadata()
     trace = current_trace()
+    settings = _linking_metadata_settings(trace)
+
+    if settings:
+        metadata = dict(_service_linking_metadata(settings))
+    else:
+        metadata = {"entity.type": "SERVICE"}
+
     if trace:
         metadata.update(trace._get_trace_linking_metadata())
     return metadata
@@ -13,7 +13,6 @@
 # limitations under the License.
 
 import logging
-import os
 import random
 import re
 import sys
@@ -64,12 +63,13 @@ from newrelic.core.config import (
     CUSTOM_EVENT_RESERVOIR_SIZE,
     LOG_EVENT_RESERVOIR_SIZE,
     ML_EVENT_RESERVOIR_SIZE,
+    hot_flags,
 )
 from newrelic.core.custom_event import create_custom_event
 from newrelic.core.log_event_node import LogEventNode
 from newrelic.core.stack_trace import exception_stack
 from newrelic.core.stats_engine import CustomMetrics, DimensionalMetrics, SampledDataSet
-from newrelic.core.thread_utilization import utilization_tracker
+from newrelic.core.thread_utilization import thread_cpu_time, utilization_tracker
 from newrelic.core.trace_cache import (
     TraceCacheActiveTraceError,
     TraceCacheNoActiveTraceError,
@@ -186,6 +186,7 @@ class Transaction():
         self._name = None
         self._cached_path = CachedPath(self)
         self._loop_time = 0.0
+        self._gc_pause_time = 0.0
 
         self._frameworks = set()
         self._message_brokers = set()
@@ -334,6 +335,12 @@ class Transaction():
 
                     self._settings = application.settings
 
+                if not self._settings:
+                    # Until the application is registered the transaction
+                    # may still be recorded into the pre-connect buffer.
+
+                    self._settings = application.preconnect_settings
+
                 if self._settings:
                     self.enabled = True
 
@@ -367,16 +374,21 @@ class Transaction():
 
         self.start_time = time.time()
 
-        # Record initial CPU user time.
-
-        self._cpu_user_time_start = os.times()[0]
-
         # Set the thread ID upon entering the transaction.
         # This is done here so that any asyncio tasks will
         # be active and the task ID will be used to
         # store traces into the trace cache.
         self.thread_id = trace_cache().current_thread_id()
 
+        # Record initial CPU time of the thread. This is only
+        # done where the transaction runs in its own thread
+        # and not in a coroutine or greenlet, as the CPU time
+        # of the thread would then include that used by any
+        # other transactions run by the same thread.
+
+        if thread_cpu_time and self._in_own_thread():
+            self._cpu_user_time_start = thread_cpu_time()
+
         # Create the root span then push it
         # into the trace cache as the active trace.
         # If there is an active transaction already
@@ -477,10 +489,10 @@ class Transaction():
         else:
             response_time = self.last_byte_time - self.start_time
 
-        # Calculate overall user time.
+        # Calculate overall CPU time of the thread.
 
         if not self._cpu_user_time_end:
-            self._cpu_user_time_end = os.times()[0]
+            self._cpu_user_time_end = self._thread_cpu_time()
 
         if duration and self._cpu_user_time_end:
             self._cpu_user_time_value = self._cpu_user_time_end - self._cpu_user_time_start
@@ -571,7 +583,7 @@ class Transaction():
             for ml_model, version in self._ml_models:
                 self.record_custom_metric(f"Supportability/Python/ML/{ml_model}/{version}", 1)
 
-        if self._settings.distributed_tracing.enabled:
+        if hot_flags(self._settings).distributed_tracing:
             # Sampled and priority need to be computed at the end of the
             # transaction when distributed tracing or span events are enabled.
             self._compute_sampled_and_priority()
@@ -640,6 +652,7 @@ class Transaction():
             root_span_guid=root.guid,
             trace_id=self.trace_id,
             loop_time=self._loop_time,
+            gc_pause_time=self._gc_pause_time,
             root=root_node,
         )
 
@@ -870,21 +883,19 @@ class Transaction():
             i_attrs["totalTime"] = self.total_time
         if self._loop_time:
             i_attrs["eventLoopTime"] = self._loop_time
+        if self._gc_pause_time:
+            i_attrs["gcPauseTime"] = self._gc_pause_time
 
         # `guid` is added here to make it an intrinsic
         # that is agnostic to distributed tracing.
         if self.guid:
             i_attrs["guid"] = self.guid
 
-        # Add in special CPU time value for UI to display CPU burn.
-
-        # TODO: Disable cpu time value for CPU burn as was
-        # previously reporting incorrect value and we need to
-        # fix it, at least on Linux to report just the CPU time
-        # for the executing thread.
+        # Add in CPU time value of the thread for UI to display CPU
+        # burn.
 
-        # if self._cpu_user_time_value:
-        #     i_attrs['cpu_time'] = self._cpu_user_time_value
+        if self._cpu_user_time_value:
+            i_attrs["cpuTime"] = self._cpu_user_time_value
 
         i_attrs.update(self.distributed_trace_intrinsics)
 
@@ -903,7 +914,7 @@ class Transaction():
         # a distributed tracing intrinsic that should be included elsewhere)
         i_attrs["guid"] = self.guid
 
-        if not self._settings.distributed_tracing.enabled:
+        if not hot_flags(self._settings).distributed_tracing:
             return i_attrs
 
         i_attrs["sampled"] = self.sampled
@@ -1102,7 +1113,7 @@ class Transaction():
             data["tk"] = trusted_account_key
 
         current_span = trace_cache().current_trace()
-        if settings.span_events.enabled and settings.collect_span_events and current_span:
+        if hot_flags(settings).collect_span_events and current_span:
             data["id"] = current_span.guid
 
         self._distributed_trace_state |= CREATED_DISTRIBUTED_TRACE
@@ -1543,13 +1554,15 @@ class Transaction():
 
     def record_log_event(self, message, level=None, timestamp=None, attributes=None, priority=None):
         settings = self.settings
-        if not (
-            settings
-            and settings.application_logging
-            and settings.application_logging.enabled
-            and settings.application_logging.forwarding
-            and settings.application_logging.forwarding.enabled
-        ):
+        flags = settings and hot_flags(settings)
+        if not (flags and flags.log_forwarding):
+            return
+
+        if priority is None:
+            priority = random.random()  # nosec
+
+        # Skip processing log events which would be discarded by the reservoir.
+        if self._log_events.skip_sample(priority):
             return
 
         timestamp = timestamp if timestamp is not None else time.time()
@@ -1580,7 +1593,7 @@ class Transaction():
 
         # Collect attributes from linking metadata, context data, and message attributes
         collected_attributes = {}
-        if settings and settings.application_logging.forwarding.context_data.enabled:
+        if flags.log_context_data:
             if context_attributes:
                 context_attributes = resolve_logging_context_attributes(
                     context_attributes, settings.attribute_filter, "context."
@@ -1775,7 +1788,28 @@ class Transaction():
                 if not self._thread_utilization_end:
                     self._thread_utilization_end = self._utilization_tracker.utilization_count()
 
-        self._cpu_user_time_end = os.times()[0]
+        self._cpu_user_time_end = self._thread_cpu_time()
+
+    def _in_own_thread(self):
+        # When threading is monkey patched by gevent, threading.get_ident()
+        # returns the ID of the current greenlet, which is also used as the
+        # thread ID of a transaction run in a greenlet. Any greenlet other
+        # than the root greenlet of the thread is therefore checked for.
+
+        greenlet = trace_cache().greenlet
+        if greenlet:
+            current = greenlet.getcurrent()
+            if current is not None and current.parent:
+                return False
+
+        return self.thread_id == threading.get_ident()
+
+    def _thread_cpu_time(self):
+        # The CPU time of the thread can only be compared with that at
+        # the start of the transaction when read from the same thread.
+
+        if self._cpu_user_time_start is not None and self._in_own_thread():
+            return thread_cpu_time()
 
     def add_custom_attribute(self, name, value):
         if not self._settings:
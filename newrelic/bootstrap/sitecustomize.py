@@ -17,6 +17,11 @@ import sys
 import time
 from importlib.machinery import PathFinder
 
+# Record when the bootstrap started for the profile of the agent startup
+# generated by the newrelic-admin startup-profile command.
+
+startup_time = time.perf_counter()
+
 # Define some debug logging routines to help sort out things when this
 # all doesn't work as expected.
 
@@ -177,6 +182,9 @@ if k8s_operator_enabled or azure_operator_enabled or (python_prefix_matches and
         log_message(f"new_relic_path = {new_relic_path!r}")
         log_message(f"do_insert_path = {do_insert_path!r}")
 
+        import_time = time.perf_counter()
+        import_modules = set(sys.modules)
+
         try:
             if do_insert_path:
                 sys.path.insert(0, new_relic_path)
@@ -191,7 +199,22 @@ if k8s_operator_enabled or azure_operator_enabled or (python_prefix_matches and
         # Finally initialize the agent.
         import newrelic.config
 
-        newrelic.config.initialize(config_file, environment)
+        startup_profile_output = os.environ.get("NEW_RELIC_STARTUP_PROFILE", None)
+
+        if startup_profile_output:
+            from newrelic.core.startup_profile import enable
+
+            log_message("startup_profile_output = %r", startup_profile_output)
+
+            profile = enable(startup_profile_output, startup_time, import_modules)
+            profile.add_phase("bootstrap", startup_time, import_time)
+            profile.add_phase("import", import_time, time.perf_counter())
+            profile.add_modules(import_modules)
+
+            with profile.phase("initialize"):
+                newrelic.config.initialize(config_file, environment)
+        else:
+            newrelic.config.initialize(config_file, environment)
     else:
         log_message(
             "New Relic could not start due to missing configuration. Either NEW_RELIC_LICENSE_KEY or NEW_RELIC_CONFIG_FILE are required."
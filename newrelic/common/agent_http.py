@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import abc
+import logging
 import os
 import sys
+import threading
 import time
 import zlib
 from pprint import pprint
@@ -43,6 +46,14 @@ except ImportError:
         return _DEFAULT_CERT_PATH
 
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+_logger = logging.getLogger(__name__)
+
 HEADER_AUDIT_LOGGING_DENYLIST = frozenset(("x-api-key", "api-key"))
 
 
@@ -73,6 +84,99 @@ def _urllib3_ssl_recursion_workaround(wrapped, instance, args, kwargs):
         return wrapped(*args, **kwargs)
 
 
+class CompressionCodec(abc.ABC):
+    """Base class for payload compression codecs.
+
+    The name of a codec is the value sent in the Content-Encoding header.
+    The levels are ordered from cheapest to most expensive and are used when
+    selecting a level adaptively.
+    """
+
+    name = None
+    levels = ()
+    default_level = None
+
+    @abc.abstractmethod
+    def compress(self, data, level=None):
+        pass
+
+
+class ZlibCodec(CompressionCodec):
+    levels = tuple(range(1, 10))
+    default_level = zlib.Z_DEFAULT_COMPRESSION
+
+    def __init__(self, name, wbits):
+        self.name = name
+        self._wbits = wbits
+
+    def compress(self, data, level=None):
+        compressor = zlib.compressobj(level or self.default_level, zlib.DEFLATED, self._wbits)
+        return compressor.compress(data) + compressor.flush()
+
+
+class ZstdCodec(CompressionCodec):
+    name = "zstd"
+    levels = (1, 2, 3, 5, 7, 9, 12, 15, 19)
+    default_level = 3
+
+    def compress(self, data, level=None):
+        return zstandard.ZstdCompressor(level=level or self.default_level).compress(data)
+
+
+_compression_codecs = {}
+
+
+def register_compression_codec(codec):
+    _compression_codecs[codec.name] = codec
+
+
+def compression_codec(name):
+    return _compression_codecs.get(name)
+
+
+register_compression_codec(ZlibCodec("gzip", 31))
+register_compression_codec(ZlibCodec("deflate", 15))
+
+# The zstd codec is only available when the optional zstandard package is
+# installed, and should only be selected for endpoints which accept it.
+
+if zstandard is not None:
+    register_compression_codec(ZstdCodec())
+
+
+class AdaptiveCompressionLevel:
+    """Selects the cheapest compression level which meets a target ratio.
+
+    Payloads are grouped into buckets by the power of two of their size, as
+    the ratio a level achieves depends heavily on the amount of data. Within
+    a bucket, the level steps up when the last payload missed the target and
+    steps back down when it cleared the target with room to spare.
+    """
+
+    HEADROOM = 1.25
+
+    def __init__(self, codec, target_ratio):
+        self.target_ratio = target_ratio
+        self._levels = codec.levels
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def level(self, size):
+        return self._levels[self._index.get(size.bit_length(), 0)]
+
+    def update(self, size, compressed_size):
+        ratio = float(size) / max(compressed_size, 1)
+        bucket = size.bit_length()
+
+        with self._lock:
+            index = self._index.get(bucket, 0)
+            if ratio < self.target_ratio:
+                index = min(index + 1, len(self._levels) - 1)
+            elif ratio >= self.target_ratio * self.HEADROOM:
+                index = max(index - 1, 0)
+            self._index[bucket] = index
+
+
 class BaseClient:
     AUDIT_LOG_ID = 0
 
@@ -94,6 +198,7 @@ class BaseClient:
         max_payload_size_in_bytes=1000000,
         audit_log_fp=None,
         default_content_encoding_header="Identity",
+        compression_target_ratio=None,
     ):
         self._audit_log_fp = audit_log_fp
 
@@ -249,12 +354,28 @@ class HttpClient(BaseClient):
         max_payload_size_in_bytes=1000000,
         audit_log_fp=None,
         default_content_encoding_header="Identity",
+        compression_target_ratio=None,
     ):
         self._host = host
         port = self._port = port
         self._compression_threshold = compression_threshold
         self._compression_level = compression_level
         self._compression_method = compression_method
+        self._compression_codec = compression_codec(compression_method)
+        if self._compression_codec is None:
+            _logger.warning(
+                "The compression method %r is not available, so payloads will be compressed with gzip instead.",
+                compression_method,
+            )
+            self._compression_codec = compression_codec("gzip")
+
+        # An explicitly configured compression level always takes precedence
+        # over selecting one adaptively.
+
+        if compression_target_ratio and not compression_level:
+            self._adaptive_level = AdaptiveCompressionLevel(self._compression_codec, compression_target_ratio)
+        else:
+            self._adaptive_level = None
         self._max_payload_size_in_bytes = max_payload_size_in_bytes
         self._audit_log_fp = audit_log_fp
         self._default_content_encoding_header = default_content_encoding_header
@@ -383,17 +504,28 @@ class HttpClient(BaseClient):
     @staticmethod
     def _compress(data, method="gzip", level=None):
         compression_start = time.time()
-        level = level or zlib.Z_DEFAULT_COMPRESSION
-        wbits = 31 if method == "gzip" else 15
+        codec = compression_codec(method) or compression_codec("gzip")
 
-        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
-        data = compressor.compress(data)
-        data += compressor.flush()
+        data = codec.compress(data, level)
 
         compression_time = max(time.time(), compression_start) - compression_start
 
         return data, compression_time
 
+    def _compress_payload(self, payload):
+        codec = self._compression_codec
+        if self._adaptive_level:
+            level = self._adaptive_level.level(len(payload))
+        else:
+            level = self._compression_level
+
+        body, compression_time = self._compress(payload, method=codec.name, level=level)
+
+        if self._adaptive_level:
+            self._adaptive_level.update(len(payload), len(body))
+
+        return body, compression_time
+
     def send_request(
         self,
         method="POST",
@@ -416,12 +548,8 @@ class HttpClient(BaseClient):
         compression_time = None
         if payload is not None:
             if len(payload) > self._compression_threshold:
-                body, compression_time = self._compress(
-                    payload,
-                    method=self._compression_method,
-                    level=self._compression_level,
-                )
-                merged_headers["Content-Encoding"] = self._compression_method
+                body, compression_time = self._compress_payload(payload)
+                merged_headers["Content-Encoding"] = self._compression_codec.name
             elif self._default_content_encoding_header:
                 merged_headers["Content-Encoding"] = self._default_content_encoding_header
 
@@ -490,6 +618,7 @@ class InsecureHttpClient(HttpClient):
         max_payload_size_in_bytes=1000000,
         audit_log_fp=None,
         default_content_encoding_header="Identity",
+        compression_target_ratio=None,
     ):
         proxy = self._parse_proxy(proxy_scheme, proxy_host, None, None, None)
         if proxy and proxy.scheme == "https":
@@ -517,6 +646,7 @@ class InsecureHttpClient(HttpClient):
             max_payload_size_in_bytes,
             audit_log_fp,
             default_content_encoding_header,
+            compression_target_ratio,
         )
 
 
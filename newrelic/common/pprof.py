@@ -0,0 +1,215 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements an encoder for the pprof profile format. This is
+the protocol buffer message defined by profile.proto in the pprof project,
+compressed with gzip.
+
+Only the parts of the message needed to describe samples of Python stack
+traces are encoded, which avoids a dependency on the protobuf package.
+
+"""
+
+import gzip
+
+# Field numbers of the messages in profile.proto.
+
+_PROFILE_SAMPLE_TYPE = 1
+_PROFILE_SAMPLE = 2
+_PROFILE_LOCATION = 4
+_PROFILE_FUNCTION = 5
+_PROFILE_STRING_TABLE = 6
+_PROFILE_TIME_NANOS = 9
+_PROFILE_DURATION_NANOS = 10
+_PROFILE_PERIOD_TYPE = 11
+_PROFILE_PERIOD = 12
+
+_VALUE_TYPE_TYPE = 1
+_VALUE_TYPE_UNIT = 2
+
+_SAMPLE_LOCATION_ID = 1
+_SAMPLE_VALUE = 2
+_SAMPLE_LABEL = 3
+
+_LABEL_KEY = 1
+_LABEL_STR = 2
+
+_LOCATION_ID = 1
+_LOCATION_LINE = 4
+
+_LINE_FUNCTION_ID = 1
+_LINE_LINE = 2
+
+_FUNCTION_ID = 1
+_FUNCTION_NAME = 2
+_FUNCTION_SYSTEM_NAME = 3
+_FUNCTION_FILENAME = 4
+_FUNCTION_START_LINE = 5
+
+_WIRE_VARINT = 0
+_WIRE_LENGTH_DELIMITED = 2
+
+
+def _varint(value):
+    # Negative values are encoded as 64 bit two's complement, as for int64
+    # fields in protocol buffers.
+
+    value &= 0xFFFFFFFFFFFFFFFF
+
+    result = bytearray()
+    while value > 0x7F:
+        result.append((value & 0x7F) | 0x80)
+        value >>= 7
+    result.append(value)
+
+    return bytes(result)
+
+
+def _varint_field(field, value):
+    if not value:
+        return b""
+    return _varint(field << 3 | _WIRE_VARINT) + _varint(value)
+
+
+def _bytes_field(field, value):
+    return _varint(field << 3 | _WIRE_LENGTH_DELIMITED) + _varint(len(value)) + value
+
+
+def _packed_field(field, values):
+    if not values:
+        return b""
+    return _bytes_field(field, b"".join(_varint(value) for value in values))
+
+
+class Profile():
+    """Builder for a pprof profile. Stack traces are added as a sequence of
+    (filename, function name, first line, line) tuples, ordered from the
+    root of the stack to the function being executed.
+
+    """
+
+    def __init__(self, sample_types, period_type, period, time_nanos=0, duration_nanos=0):
+        self._strings = {"": 0}
+        self._functions = {}
+        self._locations = {}
+        self._samples = []
+
+        self.sample_types = [(self._string(name), self._string(unit)) for name, unit in sample_types]
+        self.period_type = (self._string(period_type[0]), self._string(period_type[1]))
+        self.period = period
+        self.time_nanos = time_nanos
+        self.duration_nanos = duration_nanos
+
+    def _string(self, value):
+        try:
+            return self._strings[value]
+        except KeyError:
+            index = self._strings[value] = len(self._strings)
+            return index
+
+    def _function(self, filename, func_name, first_line):
+        key = (filename, func_name, first_line)
+
+        try:
+            return self._functions[key]
+        except KeyError:
+            function_id = self._functions[key] = len(self._functions) + 1
+            return function_id
+
+    def _location(self, method):
+        try:
+            return self._locations[method]
+        except KeyError:
+            filename, func_name, first_line, line = method
+            location_id = len(self._locations) + 1
+            self._locations[method] = location_id
+            self._function(filename, func_name, first_line)
+            return location_id
+
+    def add_sample(self, stack_trace, values, labels=None):
+        """Adds a sample for the stack trace with a value for each of the
+        sample types. The labels are a mapping of string keys and values.
+
+        """
+
+        # The location of the function being executed is first in a sample.
+
+        location_ids = [self._location(method) for method in reversed(stack_trace)]
+        labels = [(self._string(key), self._string(str(value))) for key, value in (labels or {}).items()]
+
+        self._samples.append((location_ids, values, labels))
+
+    def _value_type(self, field, value_type):
+        type_index, unit_index = value_type
+        return _bytes_field(
+            field, _varint_field(_VALUE_TYPE_TYPE, type_index) + _varint_field(_VALUE_TYPE_UNIT, unit_index)
+        )
+
+    def encode(self):
+        """Returns the profile as an uncompressed protocol buffer message."""
+
+        parts = [self._value_type(_PROFILE_SAMPLE_TYPE, value_type) for value_type in self.sample_types]
+
+        for location_ids, values, labels in self._samples:
+            sample = [_packed_field(_SAMPLE_LOCATION_ID, location_ids), _packed_field(_SAMPLE_VALUE, values)]
+            for key, value in labels:
+                sample.append(
+                    _bytes_field(_SAMPLE_LABEL, _varint_field(_LABEL_KEY, key) + _varint_field(_LABEL_STR, value))
+                )
+            parts.append(_bytes_field(_PROFILE_SAMPLE, b"".join(sample)))
+
+        for (filename, func_name, first_line, line), location_id in self._locations.items():
+            function_id = self._functions[(filename, func_name, first_line)]
+            line_message = _varint_field(_LINE_FUNCTION_ID, function_id) + _varint_field(_LINE_LINE, line)
+            parts.append(
+                _bytes_field(
+                    _PROFILE_LOCATION,
+                    _varint_field(_LOCATION_ID, location_id) + _bytes_field(_LOCATION_LINE, line_message),
+                )
+            )
+
+        for (filename, func_name, first_line), function_id in list(self._functions.items()):
+            name_index = self._string(func_name)
+            filename_index = self._string(filename)
+            parts.append(
+                _bytes_field(
+                    _PROFILE_FUNCTION,
+                    _varint_field(_FUNCTION_ID, function_id)
+                    + _varint_field(_FUNCTION_NAME, name_index)
+                    + _varint_field(_FUNCTION_SYSTEM_NAME, name_index)
+                    + _varint_field(_FUNCTION_FILENAME, filename_index)
+                    + _varint_field(_FUNCTION_START_LINE, first_line),
+                )
+            )
+
+        # The string table is written last, as the strings for the function
+        # names and filenames are only added when the functions are encoded.
+
+        for value in self._strings:
+            parts.append(_bytes_field(_PROFILE_STRING_TABLE, value.encode("utf-8")))
+
+        parts.append(_varint_field(_PROFILE_TIME_NANOS, self.time_nanos))
+        parts.append(_varint_field(_PROFILE_DURATION_NANOS, self.duration_nanos))
+        parts.append(self._value_type(_PROFILE_PERIOD_TYPE, self.period_type))
+        parts.append(_varint_field(_PROFILE_PERIOD, self.period))
+
+        return b"".join(parts)
+
+    def to_bytes(self):
+        """Returns the profile as a gzip compressed protocol buffer message,
+        as is expected for a pprof file.
+
+        """
+
+        return gzip.compress(self.encode())
@@ -14,7 +14,9 @@
 
 import collections
 import logging
+import random
 import threading
+import time
 
 try:
     from newrelic.core.infinite_tracing_pb2 import AttributeValue, SpanBatch
@@ -26,7 +28,9 @@ _logger = logging.getLogger(__name__)
 
 
 class StreamBuffer():
-    def __init__(self, maxlen, batching=False):
+    def __init__(
+        self, maxlen, batching=False, backpressure_threshold=None, backpressure_window=1.0, minimum_sampling_rate=0.01
+    ):
         self._queue = collections.deque(maxlen=maxlen)
         self._notify = self.condition()
         self._shutdown = False
@@ -36,6 +40,21 @@ class StreamBuffer():
 
         self.batching = batching
 
+        # Back-pressure state. When the ratio of dropped to seen spans
+        # within a window exceeds the threshold, the sampling rate is
+        # lowered so that whole transactions are skipped before their
+        # spans are built. The rate recovers once drops stop.
+
+        self.backpressure_threshold = backpressure_threshold
+        self.backpressure_window = backpressure_window
+        self.minimum_sampling_rate = minimum_sampling_rate
+        self.sampling_rate = 1.0
+        self._window_start = time.time()
+        self._window_seen = 0
+        self._window_dropped = 0
+        self._transactions_seen = 0
+        self._transactions_sampled = 0
+
     @staticmethod
     def condition(*args, **kwargs):
         return threading.Condition(*args, **kwargs)
@@ -57,12 +76,56 @@ class StreamBuffer():
             #
             # This is because the length of the queue can be changing as it's
             # being measured.
+            self._window_seen += 1
+
             if len(self._queue) >= self._queue.maxlen:
                 self._dropped += 1
+                self._window_dropped += 1
 
             self._queue.append(item)
             self._notify.notify_all()
 
+    def should_sample(self):
+        """Decide whether the spans of a transaction should be built and
+        placed in the buffer. Always returns True unless back-pressure is
+        enabled and spans have recently been dropped.
+
+        """
+        if self.backpressure_threshold is None:
+            return True
+
+        now = time.time()
+        if now - self._window_start >= self.backpressure_window:
+            with self._notify:
+                self._update_sampling_rate(now)
+
+        sampling_rate = self.sampling_rate
+        sampled = sampling_rate >= 1.0 or random.random() < sampling_rate  # nosec
+
+        # These counters are only used for reporting and can tolerate
+        # the occasional lost update from concurrent transactions.
+        self._transactions_seen += 1
+        if sampled:
+            self._transactions_sampled += 1
+
+        return sampled
+
+    def _update_sampling_rate(self, now):
+        # Must be called with the condition lock held.
+        if now - self._window_start < self.backpressure_window:
+            return
+
+        seen, dropped = self._window_seen, self._window_dropped
+        self._window_start = now
+        self._window_seen, self._window_dropped = 0, 0
+
+        if seen and float(dropped) / seen > self.backpressure_threshold:
+            # Cut the rate in proportion to the fraction of spans lost.
+            sampling_rate = self.sampling_rate * (1.0 - float(dropped) / seen)
+            self.sampling_rate = max(sampling_rate, self.minimum_sampling_rate)
+        elif not dropped and self.sampling_rate < 1.0:
+            self.sampling_rate = min(self.sampling_rate * 2.0, 1.0)
+
     def stats(self):
         with self._notify:
             seen, dropped = self._seen, self._dropped
@@ -70,6 +133,13 @@ class StreamBuffer():
 
         return seen, dropped
 
+    def sampling_stats(self):
+        with self._notify:
+            seen, sampled = self._transactions_seen, self._transactions_sampled
+            self._transactions_seen, self._transactions_sampled = 0, 0
+
+        return seen, sampled
+
     def __bool__(self):
         return bool(self._queue)
 
@@ -21,12 +21,12 @@ import multiprocessing
 import os
 import re
 import socket
+import stat
 import subprocess
 import sys
 import threading
 from subprocess import check_output as _execute_program
 
-from newrelic.common.utilization import CommonUtilization
 
 try:
     import resource
@@ -400,36 +400,53 @@ def getips():
     return _nr_cached_ip_address
 
 
-class BootIdUtilization(CommonUtilization):
-    VENDOR_NAME = "boot_id"
-    METADATA_URL = "/proc/sys/kernel/random/boot_id"
+def owned_by_current_user(st):
+    """Returns whether the file with the given stat result is owned by the
+    user the process is running as. This is always True on platforms
+    without user ids.
 
-    @classmethod
-    def fetch(cls):
-        if not sys.platform.startswith("linux"):
-            return
+    """
+
+    if not hasattr(os, "getuid"):
+        return True
+    return st.st_uid == os.getuid()
+
+
+def private_directory(path, mode=0o700):
+    """Creates the directory if it does not already exist, and returns
+    whether it can be trusted to hold data private to the current user.
+
+    The directory must not be a symbolic link, must be owned by the current
+    user and must not grant any permissions beyond those in the mode. This
+    guards against a directory in a shared location, such as the temporary
+    directory, having been created first by another user.
+
+    """
+
+    try:
+        os.makedirs(path, mode=mode, exist_ok=True)
+        st = os.lstat(path)
+    except OSError:
+        return False
+
+    if not stat.S_ISDIR(st.st_mode) or not owned_by_current_user(st):
+        return False
+
+    # Permission bits are not meaningful on Windows.
+    if hasattr(os, "getuid") and stat.S_IMODE(st.st_mode) & ~mode:
+        return False
 
-        try:
-            with open(cls.METADATA_URL, "rb") as f:
-                return f.readline().decode("ascii")
-        except:
-            # There are all sorts of exceptions that can occur here
-            # (i.e. permissions, non-existent file, etc)
-            cls.record_error(cls.METADATA_URL, "File read error.")
-            pass
+    return True
 
-    @staticmethod
-    def get_values(value):
-        return value
 
-    @classmethod
-    def sanitize(cls, value):
-        if value is None:
-            return
+def __getattr__(name):
+    # The detection of the boot ID is implemented with the other utilization
+    # data, which pulls in the HTTP client used to query the cloud vendors,
+    # so is only imported when first accessed.
 
-        stripped = value.strip()
+    if name == "BootIdUtilization":
+        from newrelic.common.utilization import BootIdUtilization
 
-        if len(stripped) != 36:
-            cls.record_error(cls.METADATA_URL, stripped)
+        return BootIdUtilization
 
-        return stripped[:128] or None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
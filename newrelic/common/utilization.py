@@ -12,17 +12,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import logging
 import os
 import re
 import socket
 import json
 import string
+import sys
+import threading
+import time
 import newrelic.packages.urllib3 as urllib3
 
 from newrelic.common.agent_http import InsecureHttpClient
 from newrelic.common.encoding_utils import json_decode
-from newrelic.core.internal_metrics import internal_count_metric
+from newrelic.core.connect_cache import default_cache_directory, read_cache_file, write_cache_file
+from newrelic.core.internal_metrics import InternalTraceContext, current_internal_metrics, internal_count_metric
 
 
 _logger = logging.getLogger(__name__)
@@ -32,7 +37,17 @@ VALID_CHARS_RE = re.compile(r"[0-9a-zA-Z_ ./-]")
 class UtilizationHttpClient(InsecureHttpClient):
     SOCKET_TIMEOUT = 0.05
 
+    # Metadata hosts which could not be connected to. As the AWS and Azure
+    # metadata endpoints share a host, once one of them is known to be
+    # unreachable the requests for the other are not attempted. This is
+    # cleared at the start of each detection of the cloud vendor.
+    UNREACHABLE_HOSTS = set()
+
     def send_request(self, *args, **kwargs):
+        address = (self._host, self._port)
+        if address in self.UNREACHABLE_HOSTS:
+            raise OSError(f"Metadata host {self._host}:{self._port} is unreachable.")
+
         sock = socket.socket()
         sock.settimeout(self.SOCKET_TIMEOUT)
 
@@ -41,7 +56,10 @@ class UtilizationHttpClient(InsecureHttpClient):
         # to use an http client.
         # This is an optimization which will speed up connect.
         try:
-            sock.connect((self._host, self._port))
+            sock.connect(address)
+        except OSError:
+            self.UNREACHABLE_HOSTS.add(address)
+            raise
         finally:
             sock.close()
 
@@ -399,3 +417,106 @@ class KubernetesUtilization(CommonUtilization):
             v = v.decode("utf-8")
 
         return {"kubernetes_service_host": v}
+
+
+class BootIdUtilization(CommonUtilization):
+    VENDOR_NAME = "boot_id"
+    METADATA_URL = "/proc/sys/kernel/random/boot_id"
+
+    @classmethod
+    def fetch(cls):
+        if not sys.platform.startswith("linux"):
+            return
+
+        try:
+            with open(cls.METADATA_URL, "rb") as f:
+                return f.readline().decode("ascii")
+        except:
+            # There are all sorts of exceptions that can occur here
+            # (i.e. permissions, non-existent file, etc)
+            cls.record_error(cls.METADATA_URL, "File read error.")
+            pass
+
+    @staticmethod
+    def get_values(value):
+        return value
+
+    @classmethod
+    def sanitize(cls, value):
+        if value is None:
+            return
+
+        stripped = value.strip()
+
+        if len(stripped) != 36:
+            cls.record_error(cls.METADATA_URL, stripped)
+
+        return stripped[:128] or None
+
+
+def utilization_cache_path(directory, boot_id):
+    key = hashlib.sha256(boot_id.encode("utf-8")).hexdigest()
+    return os.path.join(directory or default_cache_directory(), f"utilization-{key}.json")
+
+
+def detect_cloud_vendor(vendors, timeout=None, cache_path=None):
+    """Detects which of the cloud vendors the host is running in. Returns a
+    tuple of the vendor name and its metadata, or None if no vendor is
+    detected.
+
+    The vendors are probed concurrently, waiting no longer than the timeout
+    for them all, and the first of them in the order given which is detected
+    is returned. A vendor which is still being probed when the timeout is
+    reached is treated as not detected. If a cache path is given, the vendor
+    detected is written to it, and a vendor already held in it is returned
+    without probing. The cache path should be specific to the boot of the
+    host, as the vendor and its metadata do not change while it is running.
+
+    """
+
+    if cache_path:
+        cached = read_cache_file(cache_path) or {}
+        for vendor in vendors:
+            metadata = cached.get(vendor.VENDOR_NAME)
+            if metadata:
+                return vendor.VENDOR_NAME, metadata
+
+    UtilizationHttpClient.UNREACHABLE_HOSTS.clear()
+
+    # The probes record supportability metrics for invalid metadata, so
+    # are run with the internal metrics of the calling thread.
+
+    internal_metrics = current_internal_metrics()
+    results = {}
+    finished = {}
+
+    def _probe(vendor):
+        try:
+            with InternalTraceContext(internal_metrics):
+                results[vendor] = vendor.detect()
+        except Exception:
+            _logger.debug("Unable to detect the %s cloud vendor.", vendor.VENDOR_NAME, exc_info=True)
+        finally:
+            finished[vendor].set()
+
+    for vendor in vendors:
+        finished[vendor] = threading.Event()
+        thread = threading.Thread(target=_probe, args=(vendor,), name=f"NR-Utilization-{vendor.VENDOR_NAME}")
+        thread.daemon = True
+        thread.start()
+
+    deadline = None if timeout is None else time.time() + timeout
+
+    for vendor in vendors:
+        remaining = None if deadline is None else max(deadline - time.time(), 0.0)
+        if not finished[vendor].wait(remaining):
+            _logger.debug("Timed out detecting the %s cloud vendor.", vendor.VENDOR_NAME)
+            continue
+
+        metadata = results.get(vendor)
+        if metadata:
+            if cache_path:
+                write_cache_file(cache_path, {vendor.VENDOR_NAME: metadata})
+            return vendor.VENDOR_NAME, metadata
+
+    return None
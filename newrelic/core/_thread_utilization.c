@@ -20,6 +20,8 @@
 #include <Python.h>
 #include <pythread.h>
 
+#include <time.h>
+
 #ifndef PyVarObject_HEAD_INIT
 #define PyVarObject_HEAD_INIT(type, size) PyObject_HEAD_INIT(type) size,
 #endif
@@ -404,12 +406,42 @@ PyTypeObject NRUtilization_Type = {
 
 /* ------------------------------------------------------------------------- */
 
+/*
+ * Returns the CPU time, in seconds, used by the calling thread. Comparing
+ * the CPU time at the start and end of a transaction distinguishes a
+ * thread which is busy executing code from one blocked on I/O.
+ */
+
+static PyObject *thread_cpu_time(PyObject *self, PyObject *args)
+{
+#if defined(CLOCK_THREAD_CPUTIME_ID)
+    struct timespec tp;
+
+    if (clock_gettime(CLOCK_THREAD_CPUTIME_ID, &tp) != 0) {
+        PyErr_SetFromErrno(PyExc_OSError);
+        return NULL;
+    }
+
+    return PyFloat_FromDouble(tp.tv_sec + tp.tv_nsec * 1e-9);
+#else
+    PyErr_SetNone(PyExc_NotImplementedError);
+    return NULL;
+#endif
+}
+
+static PyMethodDef thread_utilization_methods[] = {
+    { "thread_cpu_time",    (PyCFunction)thread_cpu_time, METH_NOARGS, 0 },
+    { NULL, NULL }
+};
+
+/* ------------------------------------------------------------------------- */
+
 static struct PyModuleDef moduledef = {
     PyModuleDef_HEAD_INIT,
     "_thread_utilization", /* m_name */
     NULL,                /* m_doc */
     -1,                  /* m_size */
-    NULL,                /* m_methods */
+    thread_utilization_methods, /* m_methods */
     NULL,                /* m_reload */
     NULL,                /* m_traverse */
     NULL,                /* m_clear */
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 import random
 import time
 import threading
@@ -79,3 +80,102 @@ class AdaptiveSampler():
                                        self.sampling_target)
         self.computed_count = 0
         self.sampled_count = 0
+
+
+class _SamplingPeriod():
+    __slots__ = ("end", "max_sampled", "computed_count_last", "computed", "sampled", "sampled_count")
+
+    def __init__(self, end, max_sampled, computed_count_last):
+        self.end = end
+        self.max_sampled = max_sampled
+        self.computed_count_last = computed_count_last
+
+        # The counters hand out a distinct index to each caller without a
+        # lock, as advancing an itertools.count is a single operation.
+        self.computed = itertools.count()
+        self.sampled = itertools.count()
+        self.sampled_count = 0
+
+
+class LockFreeAdaptiveSampler():
+    """An adaptive sampler making the same decisions as AdaptiveSampler
+    without taking a lock for each decision. A lock is only taken when the
+    state for a sampling period is replaced at the end of the period.
+
+    Each sampled decision must claim one of the slots up to the maximum
+    sampled for the period, so the maximum is never exceeded. With
+    concurrent callers, the count of sampled decisions used to pick the
+    adaptive target can lag behind by the decisions still in progress.
+
+    """
+
+    def __init__(self, sampling_target, sampling_period):
+        self.period = sampling_period
+        self.sampling_target = sampling_target
+        self._lock = threading.Lock()
+
+        # The adaptive target once a given number of transactions have been
+        # sampled within a period, for the periods after the first.
+        self._adaptive_targets = [0.0] * sampling_target + [
+            sampling_target ** (float(sampling_target) / count) - sampling_target ** 0.5
+            for count in range(sampling_target, 2 * sampling_target)
+        ]
+
+        # For the first harvest, collect a max of sampling_target number of
+        # "sampled" transactions.
+        self._period = _SamplingPeriod(time.time() + sampling_period, sampling_target, sampling_target)
+
+    def _next_period(self, period, now):
+        with self._lock:
+            if self._period is not period:
+                return self._period
+
+            # Advancing the counter of the period being replaced gives the
+            # number of decisions computed within it.
+            computed_count = next(period.computed)
+
+            # If more than one period has passed, no transactions were seen
+            # in the last full period.
+            if now >= period.end + self.period:
+                computed_count = 0
+
+            # For subsequent harvests, collect a max of twice the
+            # self.sampling_target value.
+            self._period = _SamplingPeriod(
+                now + self.period,
+                2 * self.sampling_target,
+                max(computed_count, self.sampling_target),
+            )
+
+            return self._period
+
+    def compute_sampled(self):
+        period = self._period
+
+        now = time.time()
+        if now >= period.end:
+            period = self._next_period(period, now)
+
+        sampled_count = period.sampled_count
+
+        if sampled_count >= period.max_sampled:
+            return False
+
+        computed_count = next(period.computed)
+
+        if sampled_count < self.sampling_target:
+            sampled = random.randrange(period.computed_count_last) < self.sampling_target
+        else:
+            sampled = random.randrange(max(computed_count, 1)) < self._adaptive_targets[sampled_count]
+
+        if not sampled:
+            return False
+
+        slot = next(period.sampled)
+        if slot >= period.max_sampled:
+            return False
+
+        if slot >= period.sampled_count:
+            period.sampled_count = slot + 1
+
+        return True
@@ -21,6 +21,7 @@ import atexit
 import logging
 import os
 import sched
+import socket
 import sys
 import threading
 import time
@@ -31,9 +32,14 @@ import newrelic
 import newrelic.core.application
 import newrelic.core.config
 from newrelic.common.log_file import initialize_logging
+from newrelic.core.aggregator import Aggregator, default_socket_path
+from newrelic.core.startup_profile import startup_phase
 from newrelic.core.thread_utilization import thread_utilization_data_source
+from newrelic.samplers.continuous_profiler import continuous_profiler_data_source
 from newrelic.samplers.cpu_usage import cpu_usage_data_source
+from newrelic.samplers.event_loop_blocking import event_loop_blocking_data_source
 from newrelic.samplers.gc_data import garbage_collector_data_source
+from newrelic.samplers.memory_allocations import memory_allocations_data_source
 from newrelic.samplers.memory_usage import memory_usage_data_source
 
 _logger = logging.getLogger(__name__)
@@ -184,9 +190,15 @@ class Agent():
                 instance.register_data_source(memory_usage_data_source)
                 instance.register_data_source(thread_utilization_data_source)
                 instance.register_data_source(garbage_collector_data_source)
+                instance.register_data_source(memory_allocations_data_source)
+                instance.register_data_source(continuous_profiler_data_source)
+                instance.register_data_source(event_loop_blocking_data_source)
 
                 Agent._instance = instance
 
+                if settings.reinitialize_after_fork and hasattr(os, "register_at_fork"):
+                    os.register_at_fork(after_in_child=_after_fork_in_child)
+
         return Agent._instance
 
     def __init__(self, config):
@@ -218,6 +230,8 @@ class Agent():
 
         self._process_shutdown = False
 
+        self._aggregator = None
+
         self._lock = threading.Lock()
 
         if self._config.enabled:
@@ -285,6 +299,19 @@ class Agent():
         if application:
             return application.configuration
 
+    def application_preconnect_settings(self, app_name):
+        """Returns the settings which transactions are started with while
+        the application is still registering, so that they are recorded
+        into the pre-connect buffer. This returns None if the buffer is not
+        in use or once the application has been registered.
+
+        """
+
+        application = self._applications.get(app_name)
+
+        if application:
+            return application.preconnect_configuration
+
     def application_attribute_filter(self, app_name):
         """Returns the attribute filter for the application."""
 
@@ -391,7 +418,8 @@ class Agent():
             # the period of the timeout.
 
             if activate_session:
-                application.activate_session(self.activate_agent, timeout)
+                with startup_phase("activate_application"):
+                    application.activate_session(self.activate_agent, timeout)
 
     @property
     def applications(self):
@@ -505,6 +533,19 @@ class Agent():
 
         application.record_custom_metric(name, value)
 
+    def record_log_line(self, app_name, level_name):
+        """Counts a log line for the named application. If there has
+        been no prior request to activate the application, the log line
+        is discarded.
+
+        """
+
+        application = self._applications.get(app_name, None)
+        if application is None or not application.active:
+            return
+
+        application.record_log_line(level_name)
+
     def record_custom_metrics(self, app_name, metrics):
         """Records the metrics for the named application. If there has
         been no prior request to activate the application, the metric is
@@ -576,7 +617,13 @@ class Agent():
         """
 
         application = self._applications.get(app_name, None)
-        if application is None or not application.active:
+        if application is None:
+            return
+
+        # Transactions which complete before the application is registered
+        # are recorded into the pre-connect buffer when it is in use.
+
+        if not application.active and application.preconnect_configuration is None:
             return
 
         application.record_transaction(data)
@@ -618,7 +665,8 @@ class Agent():
 
         for application in list(self._applications.values()):
             try:
-                application.harvest(shutdown=False, flexible=True)
+                if not self._forward_harvest(application, flexible=True):
+                    application.harvest(shutdown=False, flexible=True)
             except Exception:
                 _logger.exception(f"Failed to harvest data for {application.name}.")
 
@@ -640,9 +688,16 @@ class Agent():
         self._default_harvest_count += 1
         self._last_default_harvest = time.time()
 
+        # Stop accepting snapshots from worker processes before the final
+        # harvest, so that they elect a new harvester.
+
+        if shutdown and self._aggregator:
+            self._aggregator.close()
+
         for application in list(self._applications.values()):
             try:
-                application.harvest(shutdown, flexible=False)
+                if not self._forward_harvest(application, flexible=False):
+                    application.harvest(shutdown, flexible=False)
             except Exception:
                 _logger.exception(f"Failed to harvest data for {application.name}.")
 
@@ -650,6 +705,65 @@ class Agent():
 
         _logger.debug("Completed harvest[default] of application data in %.2f seconds.", self._default_harvest_duration)
 
+    def _start_aggregator(self, settings):
+        if not hasattr(socket, "AF_UNIX"):
+            _logger.warning("Aggregation of data across processes requires Unix domain sockets and is disabled.")
+            return
+
+        path = settings.aggregator.socket_path or default_socket_path()
+        self._aggregator = Aggregator(path, self._merge_aggregation_snapshot, settings.aggregator.timeout)
+        self._aggregator.elect()
+
+    def _merge_aggregation_snapshot(self, app_name, snapshot):
+        application = self._applications.get(app_name, None)
+        if application is None or not application.active:
+            return False
+
+        application.merge_aggregation_snapshot(snapshot)
+        return True
+
+    def _forward_harvest(self, application, flexible):
+        # When aggregating data across processes, only the elected harvester
+        # reports data to the data collector. Returns False when the data
+        # should be reported by this process.
+
+        aggregator = self._aggregator
+        if aggregator is None or aggregator.is_harvester:
+            return False
+
+        return application.forward_harvest(aggregator, flexible)
+
+    def after_fork_in_child(self):
+        """Reinitializes the agent in a child process after a fork. The
+        harvest thread does not survive the fork, so is recreated along with
+        the locks and scheduler it uses, and each application is then
+        reinitialized in turn.
+
+        """
+
+        Agent._instance_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+        self._process_id = os.getpid()
+
+        harvest_started = self._harvest_thread.ident is not None and not self._harvest_shutdown_is_set()
+
+        self._harvest_thread = threading.Thread(target=self._harvest_loop, name="NR-Harvest-Thread")
+        self._harvest_thread.daemon = True
+        self._harvest_shutdown = threading.Event()
+        self._scheduler = sched.scheduler(self._harvest_timer, self._harvest_shutdown.wait)
+
+        # The harvester for cross process aggregation is elected again
+        # when the harvest thread starts.
+
+        self._aggregator = None
+
+        for application in list(self._applications.values()):
+            application.after_fork_in_child()
+
+        if harvest_started:
+            self._harvest_thread.start()
+
     def _harvest_timer(self):
         if self._harvest_shutdown_is_set():
             return float("inf")
@@ -661,6 +775,9 @@ class Agent():
         settings = newrelic.core.config.global_settings()
         event_harvest_config = settings.event_harvest_config
 
+        if settings.aggregator.enabled:
+            self._start_aggregator(settings)
+
         self._scheduler.enter(event_harvest_config.report_period_ms / 1000.0, 1, self._harvest_flexible, ())
         self._scheduler.enter(60.0, 2, self._harvest_default, ())
 
@@ -755,6 +872,15 @@ class Agent():
             self._harvest_thread.join(timeout)
 
 
+def _after_fork_in_child():
+    instance = Agent._instance
+    if instance is not None:
+        try:
+            instance.after_fork_in_child()
+        except Exception:
+            _logger.exception("Unable to reinitialize the agent after a fork.")
+
+
 def agent_instance():
     """Returns the agent object. This function should always be used and
     instances of the agent object should never be created directly to
@@ -14,6 +14,7 @@
 
 import logging
 import os
+import time
 
 from newrelic import version
 from newrelic.common import system_info
@@ -26,11 +27,14 @@ from newrelic.common.encoding_utils import (
 from newrelic.common.utilization import (
     AWSUtilization,
     AzureUtilization,
+    BootIdUtilization,
     DockerUtilization,
     ECSUtilization,
     GCPUtilization,
     KubernetesUtilization,
     PCFUtilization,
+    detect_cloud_vendor,
+    utilization_cache_path,
 )
 from newrelic.core.attribute import truncate
 from newrelic.core.config import (
@@ -38,6 +42,7 @@ from newrelic.core.config import (
     finalize_application_settings,
     global_settings_dump,
 )
+from newrelic.core.connect_cache import load_connect_cache, save_connect_cache
 from newrelic.core.internal_metrics import internal_count_metric
 from newrelic.core.otlp_utils import OTLP_CONTENT_TYPE, otlp_encode
 from newrelic.network.exceptions import (
@@ -45,6 +50,7 @@ from newrelic.network.exceptions import (
     ForceAgentDisconnect,
     ForceAgentRestart,
     NetworkInterfaceException,
+    PayloadTooLargeForRequest,
     RetryDataForRequest,
 )
 
@@ -65,7 +71,7 @@ class AgentProtocol():
         409: ForceAgentRestart,
         410: ForceAgentDisconnect,
         411: DiscardDataForRequest,
-        413: DiscardDataForRequest,
+        413: PayloadTooLargeForRequest,
         414: DiscardDataForRequest,
         415: DiscardDataForRequest,
         417: DiscardDataForRequest,
@@ -178,6 +184,7 @@ class AgentProtocol():
             compression_threshold=settings.agent_limits.data_compression_threshold,
             compression_level=settings.agent_limits.data_compression_level,
             compression_method=settings.compressed_content_encoding,
+            compression_target_ratio=settings.agent_limits.data_compression_target_ratio,
             max_payload_size_in_bytes=settings.max_payload_size_in_bytes,
             audit_log_fp=audit_log_fp,
         )
@@ -202,6 +209,11 @@ class AgentProtocol():
         self._headers["Content-Type"] = "application/json"
         self._run_token = settings.agent_run_id
 
+        # The host the data collector redirected to on connecting and
+        # the utilization data sent with the connect.
+        self.redirect_host = host
+        self.utilization = None
+
         # Logging
         self._proxy_host = settings.proxy_host
         self._proxy_port = settings.proxy_port
@@ -274,7 +286,56 @@ class AgentProtocol():
         return params, self._headers, json_encode(payload).encode("utf-8")
 
     @staticmethod
-    def _connect_payload(app_name, linked_applications, environment, settings):
+    def _utilization_vendors(settings):
+        """Detects the cloud vendor and container the process is running in,
+        as reported in the utilization data of the connect payload. The
+        settings are those returned by global_settings_dump().
+
+        """
+
+        vendors = []
+        ecs_id = None
+        utilization_vendor_settings = {}
+
+        if settings["utilization.detect_aws"]:
+            vendors.append(AWSUtilization)
+            ecs_id = ECSUtilization.detect()
+            if ecs_id:
+                utilization_vendor_settings["ecs"] = ecs_id
+
+        if settings["utilization.detect_pcf"]:
+            vendors.append(PCFUtilization)
+        if settings["utilization.detect_gcp"]:
+            vendors.append(GCPUtilization)
+        if settings["utilization.detect_azure"]:
+            vendors.append(AzureUtilization)
+
+        cache_path = None
+        if settings["utilization.cache_enabled"]:
+            boot_id = BootIdUtilization.detect()
+            if boot_id:
+                cache_path = utilization_cache_path(settings["connect_cache.directory"], boot_id)
+
+        detected = detect_cloud_vendor(vendors, settings["utilization.detect_timeout"], cache_path)
+        if detected:
+            vendor_name, metadata = detected
+            utilization_vendor_settings[vendor_name] = metadata
+
+        if settings["utilization.detect_docker"]:
+            if not ecs_id:
+                docker = DockerUtilization.detect()
+                if docker:
+                    utilization_vendor_settings["docker"] = docker
+
+        if settings["utilization.detect_kubernetes"]:
+            kubernetes = KubernetesUtilization.detect()
+            if kubernetes:
+                utilization_vendor_settings["kubernetes"] = kubernetes
+
+        return utilization_vendor_settings
+
+    @staticmethod
+    def _connect_payload(app_name, linked_applications, environment, settings, utilization_vendor_settings=None):
         settings = global_settings_dump(settings)
         app_names = [app_name] + linked_applications
 
@@ -304,7 +365,7 @@ class AgentProtocol():
         if ip_address:
             utilization_settings["ip_address"] = ip_address
 
-        boot_id = system_info.BootIdUtilization.detect()
+        boot_id = BootIdUtilization.detect()
         if boot_id:
             utilization_settings["boot_id"] = boot_id
 
@@ -321,39 +382,8 @@ class AgentProtocol():
         if utilization_conf:
             utilization_settings["config"] = utilization_conf
 
-        vendors = []
-        ecs_id = None
-        utilization_vendor_settings = {}
-
-        if settings["utilization.detect_aws"]:
-            vendors.append(AWSUtilization)
-            ecs_id = ECSUtilization.detect()
-            if ecs_id:
-                utilization_vendor_settings["ecs"] = ecs_id
-
-        if settings["utilization.detect_pcf"]:
-            vendors.append(PCFUtilization)
-        if settings["utilization.detect_gcp"]:
-            vendors.append(GCPUtilization)
-        if settings["utilization.detect_azure"]:
-            vendors.append(AzureUtilization)
-
-        for vendor in vendors:
-            metadata = vendor.detect()
-            if metadata:
-                utilization_vendor_settings[vendor.VENDOR_NAME] = metadata
-                break
-
-        if settings["utilization.detect_docker"]:
-            if not ecs_id:
-                docker = DockerUtilization.detect()
-                if docker:
-                    utilization_vendor_settings["docker"] = docker
-
-        if settings["utilization.detect_kubernetes"]:
-            kubernetes = KubernetesUtilization.detect()
-            if kubernetes:
-                utilization_vendor_settings["kubernetes"] = kubernetes
+        if utilization_vendor_settings is None:
+            utilization_vendor_settings = AgentProtocol._utilization_vendors(settings)
 
         if utilization_vendor_settings:
             utilization_settings["vendors"] = utilization_vendor_settings
@@ -453,14 +483,53 @@ class AgentProtocol():
         environment,
         settings,
         client_cls=ApplicationModeClient,
+        parent=None,
     ):
-        with cls(settings, client_cls=client_cls) as preconnect:
-            redirect_host = preconnect.send("preconnect")["redirect_host"]
+        # The utilization data gathered by a prior process is used when
+        # it is held in the connect cache, avoiding the need to probe the
+        # cloud vendor metadata endpoints again. A process forked from one
+        # which has already connected, reuses the utilization data and the
+        # redirect host of the protocol of the parent process instead.
+
+        app_names = [app_name] + linked_applications
+        cache_entry = None
+        utilization_vendor_settings = parent and parent.utilization
+        redirect_host = parent and parent.redirect_host
+
+        if settings.connect_cache.enabled:
+            cache_entry = load_connect_cache(settings, app_names)
+            if cache_entry is not None and utilization_vendor_settings is None:
+                utilization_vendor_settings = cache_entry.get("utilization")
+
+        if utilization_vendor_settings is None:
+            utilization_vendor_settings = cls._utilization_vendors(global_settings_dump(settings))
+
+        if not redirect_host:
+            with cls(settings, client_cls=client_cls) as preconnect:
+                redirect_host = preconnect.send("preconnect")["redirect_host"]
 
         with cls(settings, host=redirect_host, client_cls=client_cls) as protocol:
             configuration = protocol.send(
                 "connect",
-                cls._connect_payload(app_name, linked_applications, environment, settings),
+                cls._connect_payload(
+                    app_name, linked_applications, environment, settings, utilization_vendor_settings
+                ),
+            )
+
+        # The cache entry keeps the time it was first created, so that the
+        # utilization data and environment are gathered again once it has
+        # expired, even though the connect response is always updated.
+
+        if settings.connect_cache.enabled:
+            save_connect_cache(
+                settings,
+                app_names,
+                {
+                    "created": cache_entry["created"] if cache_entry else time.time(),
+                    "configuration": json_decode(json_encode(configuration)),
+                    "utilization": utilization_vendor_settings,
+                    "environment": environment,
+                },
             )
 
         # Apply High Security Mode to server_config, so the local
@@ -478,6 +547,8 @@ class AgentProtocol():
         with cls(settings, host=redirect_host, client_cls=client_cls) as protocol:
             protocol.send("agent_settings", (global_settings_dump(settings, serializable=True),))
 
+        protocol.utilization = utilization_vendor_settings
+
         if "messages" in configuration:
             for item in configuration["messages"]:
                 message = item["message"]
@@ -529,6 +600,7 @@ class ServerlessModeProtocol(AgentProtocol):
         environment,
         settings,
         client_cls=ServerlessModeClient,
+        parent=None,
     ):
         aws_lambda_metadata = settings.aws_lambda_metadata
         settings = finalize_application_settings({"cross_application_tracer.enabled": False}, settings)
@@ -559,6 +631,7 @@ class OtlpProtocol(AgentProtocol):
             compression_threshold=settings.agent_limits.data_compression_threshold,
             compression_level=settings.agent_limits.data_compression_level,
             compression_method=settings.compressed_content_encoding,
+            compression_target_ratio=settings.agent_limits.data_compression_target_ratio,
             max_payload_size_in_bytes=1000000,
             audit_log_fp=audit_log_fp,
             default_content_encoding_header=None,
@@ -599,6 +672,7 @@ class OtlpProtocol(AgentProtocol):
         environment,
         settings,
         client_cls=ApplicationModeClient,
+        parent=None,
     ):
         with cls(settings, client_cls=client_cls) as protocol:
             pass
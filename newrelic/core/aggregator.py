@@ -0,0 +1,219 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements aggregation of harvest data across the worker
+processes of a pre-fork server.
+
+One process is elected as the harvester by being the first to bind a Unix
+domain socket. The other processes send the snapshot of the data for each
+harvest to the harvester over the socket, rather than reporting it to the
+data collector themselves. The harvester merges the data into its own stats
+engine and reports it as part of its next harvest. The slow SQL and
+transaction traces are still reported by each process, as the explain plans
+for the slow SQL are run using the database connections of the process. If
+the harvester goes away, the next process to fail to send its data takes
+over the socket.
+
+The socket is created in a directory only accessible by the user the
+processes run as, and a process only sends data to a socket owned by the
+same user.
+
+"""
+
+import errno
+import logging
+import os
+import socket
+import stat
+import struct
+import tempfile
+import threading
+
+from newrelic.common.encoding_utils import json_decode, json_encode
+from newrelic.common.system_info import owned_by_current_user, private_directory
+
+_logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+
+
+def default_socket_path():
+    # Worker processes of a pre-fork server share the parent process, so
+    # the path defaults to one derived from that, in a directory private to
+    # the user.
+    return os.path.join(tempfile.gettempdir(), f"newrelic-aggregator-{os.getuid()}", f"{os.getppid()}.sock")
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+class Aggregator:
+    """Elects the harvesting process for the socket path and either
+    receives snapshots from the other processes, or sends snapshots to the
+    harvester. The callback is called with the application name and the
+    snapshot for each snapshot received, and returns whether it was merged.
+    Snapshots which are not merged are reported by the sending process.
+
+    """
+
+    def __init__(self, path, callback, timeout=5.0):
+        self.path = path
+        self._callback = callback
+        self._timeout = timeout
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_harvester(self):
+        return self._server is not None
+
+    def elect(self):
+        """Attempts to become the harvester, returning True if successful.
+        A socket file left behind by a harvester which has exited is
+        removed and taken over.
+
+        """
+
+        with self._lock:
+            if self._server is not None:
+                return True
+
+            if not private_directory(os.path.dirname(self.path) or "."):
+                _logger.warning(
+                    "The directory for the aggregator socket %r is not private to the current user. "
+                    "Aggregation of data across processes is disabled.",
+                    self.path,
+                )
+                return False
+
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                server.bind(self.path)
+            except OSError as exc:
+                if exc.errno != errno.EADDRINUSE or self._harvester_alive():
+                    server.close()
+                    return False
+
+                try:
+                    os.unlink(self.path)
+                    server.bind(self.path)
+                except OSError:
+                    # Another process won the race to take over.
+                    server.close()
+                    return False
+
+            os.chmod(self.path, 0o600)
+            server.listen(socket.SOMAXCONN)
+            server.settimeout(1.0)
+
+            self._server = server
+            self._thread = threading.Thread(target=self._serve, args=(server,), name="NR-Aggregator-Thread")
+            self._thread.daemon = True
+            self._thread.start()
+
+        _logger.debug("Process %d elected as the harvester for %r.", os.getpid(), self.path)
+
+        return True
+
+    def _trusted_socket(self):
+        # Data is only sent to a socket bound by a process running as the
+        # same user.
+        try:
+            st = os.lstat(self.path)
+        except OSError:
+            return False
+        return stat.S_ISSOCK(st.st_mode) and owned_by_current_user(st)
+
+    def _harvester_alive(self):
+        if not self._trusted_socket():
+            return False
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            return False
+        finally:
+            sock.close()
+        return True
+
+    def send(self, app_name, snapshot):
+        """Sends a snapshot to the harvester. Returns False if the snapshot
+        could not be sent, in which case an election is held and the caller
+        should report the data itself.
+
+        """
+
+        data = json_encode({"app_name": app_name, "snapshot": snapshot}).encode("utf-8")
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            if not self._trusted_socket():
+                raise OSError(errno.EPERM, "Untrusted aggregator socket.")
+            sock.connect(self.path)
+            sock.sendall(_HEADER.pack(len(data)) + data)
+            acknowledged = _recv_exactly(sock, 1) == b"\x01"
+        except (OSError, EOFError):
+            acknowledged = False
+        finally:
+            sock.close()
+
+        if not acknowledged:
+            _logger.debug("Unable to send harvest snapshot to the harvester for %r.", self.path)
+            self.elect()
+
+        return acknowledged
+
+    def _serve(self, server):
+        while self._server is server:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                # The server socket has been closed.
+                return
+
+            try:
+                conn.settimeout(self._timeout)
+                (size,) = _HEADER.unpack(_recv_exactly(conn, _HEADER.size))
+                message = json_decode(_recv_exactly(conn, size).decode("utf-8"))
+                if self._callback(message["app_name"], message["snapshot"]):
+                    conn.sendall(b"\x01")
+            except Exception:
+                _logger.exception("Failed to merge a harvest snapshot received from a worker process.")
+            finally:
+                conn.close()
+
+    def close(self):
+        with self._lock:
+            server, self._server = self._server, None
+            if server is None:
+                return
+
+            server.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
@@ -16,6 +16,7 @@
 
 """
 
+import copy
 import logging
 import os
 import sys
@@ -26,10 +27,9 @@ import warnings
 from functools import partial
 
 from newrelic.common.object_names import callable_name
-from newrelic.core.adaptive_sampler import AdaptiveSampler
-from newrelic.core.config import global_settings
+from newrelic.core.adaptive_sampler import AdaptiveSampler, LockFreeAdaptiveSampler
+from newrelic.core.config import finalize_application_settings, global_settings
 from newrelic.core.custom_event import create_custom_event
-from newrelic.core.data_collector import create_session
 from newrelic.core.database_utils import SQLConnections
 from newrelic.core.environment import environment_settings, plugins
 from newrelic.core.internal_metrics import (
@@ -38,9 +38,10 @@ from newrelic.core.internal_metrics import (
     internal_count_metric,
     internal_metric,
 )
-from newrelic.core.profile_sessions import profile_session_manager
 from newrelic.core.rules_engine import RulesEngine, SegmentCollapseEngine
 from newrelic.core.stats_engine import CustomMetrics, StatsEngine
+from newrelic.core.thread_accumulators import ThreadAccumulator, ThreadAccumulators
+from newrelic.core.thread_counters import ThreadLocalCounters
 from newrelic.network.exceptions import (
     DiscardDataForRequest,
     ForceAgentDisconnect,
@@ -77,6 +78,14 @@ class Application:
 
         self._active_session = None
         self._harvest_enabled = False
+        self._reinitializing = False
+        self._environment = None
+        self._environment_cached = False
+
+        self._preconnect_settings = None
+        self._preconnect_stats = None
+        self._preconnect_count = 0
+        self._preconnect_dropped = 0
 
         self._transaction_count = 0
         self._last_transaction = 0.0
@@ -104,6 +113,9 @@ class Application:
         self._stats_custom_lock = threading.RLock()
         self._stats_custom_engine = StatsEngine()
 
+        self._log_line_counters = ThreadLocalCounters()
+        self._thread_accumulators = None
+
         self._agent_commands_lock = threading.Lock()
         self._data_samplers_lock = threading.Lock()
         self._data_samplers_started = False
@@ -131,6 +143,10 @@ class Application:
         # self._profiler_started = False
         # self._send_profile_data = False
 
+        # The thread profiler is only loaded once an application is created.
+
+        from newrelic.core.profile_sessions import profile_session_manager
+
         self.profile_manager = profile_session_manager()
 
         self.plugins = plugins()  # initialize the generator
@@ -147,7 +163,22 @@ class Application:
 
     @property
     def configuration(self):
-        return self._active_session and self._active_session.configuration
+        if self._active_session:
+            return self._active_session.configuration
+        return None
+
+    @property
+    def preconnect_configuration(self):
+        """The settings transactions are started with until the session is
+        registered, so they can be recorded into the pre-connect buffer.
+        These are the local settings, or the server side configuration held
+        in the connect cache. This is None once the session is registered.
+
+        """
+
+        if self._active_session:
+            return None
+        return self._preconnect_settings
 
     @property
     def active(self):
@@ -210,6 +241,29 @@ class Application:
         self._connected_event.clear()
         self._deadlock_event.clear()
 
+        settings = global_settings()
+
+        cache_entry = None
+        if settings.connect_cache.enabled:
+            from newrelic.core.connect_cache import load_connect_cache
+
+            cache_entry = load_connect_cache(settings, [self._app_name] + self._linked_applications)
+
+        self._environment_cached = bool(cache_entry and cache_entry.get("environment"))
+        if self._environment_cached:
+            self._environment = cache_entry["environment"]
+
+        if (settings.preconnect_buffer.enabled or cache_entry is not None) and self._preconnect_settings is None:
+            preconnect_settings = self._preconnect_configuration(cache_entry)
+
+            with self._stats_lock:
+                self._preconnect_stats = StatsEngine()
+                self._preconnect_stats.reset_stats(preconnect_settings)
+                self._preconnect_count = 0
+                self._preconnect_dropped = 0
+
+            self._preconnect_settings = preconnect_settings
+
         # If the session is activated when the Python global import lock
         # has been acquired by the parent thread then the parent thread
         # can potentially deadlock due to lazy imports in code being run
@@ -290,7 +344,10 @@ class Application:
         if self._pending_shutdown:
             return
 
-        if self._active_session:
+        # A process reinitialized after a fork records data using the
+        # session of the parent process until it has registered its own.
+
+        if self._active_session and not self._reinitializing:
             return
 
         # Remember when we started attempt to connect so can record a
@@ -345,6 +402,11 @@ class Application:
         connect_attempts = 0
         settings = global_settings()
 
+        # The communication layer with the data collector, including the
+        # HTTP client, is only loaded once registration is attempted.
+
+        from newrelic.core.data_collector import create_session
+
         while not active_session:
             if self._agent_shutdown:
                 return
@@ -356,10 +418,25 @@ class Application:
 
             internal_metrics = CustomMetrics()
 
+            # The environment of a process reinitialized after a fork is
+            # the same as that already gathered by the parent process, and
+            # that held in the connect cache was gathered by a prior one.
+            # The first attempt to register also reuses the redirect host
+            # and utilization data of the session of the parent process.
+            # Should it fail, a full registration is performed instead.
+
+            if not ((self._reinitializing or self._environment_cached) and self._environment):
+                self._environment = environment_settings()
+
+            parent_session = None
+
+            if self._reinitializing and connect_attempts == 1:
+                parent_session = self._active_session
+
             with InternalTraceContext(internal_metrics):
                 try:
                     active_session = create_session(
-                        None, self._app_name, self.linked_applications, environment_settings()
+                        None, self._app_name, self.linked_applications, self._environment, parent=parent_session
                     )
                 except ForceAgentDisconnect:
                     # Any disconnect exception means we should stop trying to connect
@@ -492,33 +569,78 @@ class Application:
 
         configuration = active_session.configuration
 
+        recorded = None
+
+        previous_accumulators = None
+
         with self._stats_lock:
+            if self._reinitializing:
+                recorded = copy.copy(self._stats_engine)
+                previous_accumulators = self._thread_accumulators
+
             self._stats_engine.reset_stats(configuration, reset_stream=True)
 
             if configuration.serverless_mode.enabled:
                 sampling_target_period = 60.0
             else:
                 sampling_target_period = configuration.sampling_target_period_in_seconds
-            self.adaptive_sampler = AdaptiveSampler(configuration.sampling_target, sampling_target_period)
+            if configuration.adaptive_sampling.lock_free:
+                sampler_cls = LockFreeAdaptiveSampler
+            else:
+                sampler_cls = AdaptiveSampler
+            self.adaptive_sampler = sampler_cls(configuration.sampling_target, sampling_target_period)
+
+            if configuration.thread_local_accumulators.enabled:
+                self._thread_accumulators = ThreadAccumulators(configuration)
+            else:
+                self._thread_accumulators = None
 
         active_session.connect_span_stream(self._stats_engine.span_stream, self.record_custom_metric)
 
         with self._stats_custom_lock:
+            recorded_custom = self._reinitializing and copy.copy(self._stats_custom_engine)
+
             self._stats_custom_engine.reset_stats(configuration)
 
+            if recorded_custom:
+                self._stats_custom_engine.merge_metric_stats(recorded_custom)
+
         with self._stats_lock:
             self._stats_engine.reset_stats(configuration)
 
+            # Keep any data recorded after a fork while the session was
+            # being registered.
+
+            if recorded is not None:
+                self._stats_engine.merge_buffered(recorded)
+
+            # Merge the transactions recorded before the session was
+            # registered. These were aggregated using the local settings,
+            # so the event data sets are sampled again down to the limits
+            # from the server side settings.
+
+            preconnect_stats, self._preconnect_stats = self._preconnect_stats, None
+            preconnect_count, preconnect_dropped = self._preconnect_count, self._preconnect_dropped
+
+            if preconnect_stats is not None:
+                self._stats_engine.merge_buffered(preconnect_stats)
+
         # Record an initial start time for the reporting period and
         # clear record of last transaction processed.
 
         self._period_start = time.time()
 
-        self._transaction_count = 0
+        self._transaction_count = preconnect_count
         self._last_transaction = 0.0
 
         self._global_events_account = 0
 
+        # Keep any data recorded into the thread accumulators after a fork
+        # while the session was being registered.
+
+        if previous_accumulators is not None:
+            self._merge_thread_accumulators(previous_accumulators)
+
         with InternalTraceContext(internal_metrics):
             # Record metrics for how long it took us to connect and how
             # many attempts we made. Also record metrics for the final
@@ -536,6 +658,10 @@ class Application:
             )
             internal_metric("Supportability/Python/Application/Registration/Attempts", connect_attempts)
 
+            if preconnect_stats is not None:
+                internal_count_metric("Supportability/Python/PreconnectBuffer/Transactions", preconnect_count)
+                internal_count_metric("Supportability/Python/PreconnectBuffer/Dropped", preconnect_dropped)
+
             # Record metrics for feature toggles from settings
 
             # Logging feature toggle metrics
@@ -596,6 +722,8 @@ class Application:
         # recording of transactions to start.
 
         self._active_session = active_session
+        self._reinitializing = False
+        self._preconnect_settings = None
 
         # Enable the ability to perform a harvest. This is okay to
         # do at this point as the processing of agent commands and
@@ -622,6 +750,58 @@ class Application:
         except:
             pass
 
+    def after_fork_in_child(self):
+        """Reinitializes the application in a child process after a fork.
+        Locks which may have been held by other threads at the time of the
+        fork are replaced and data recorded by the parent is discarded, as
+        the parent reports it. Recording continues using the configuration
+        of the parent process, while a session for this process is
+        registered in the background. Data is reported once registered.
+
+        """
+
+        if self._agent_shutdown or self._pending_shutdown:
+            return
+
+        self._process_id = os.getpid()
+
+        self._stats_lock = threading.RLock()
+        self._stats_custom_lock = threading.RLock()
+        self._log_line_counters = ThreadLocalCounters()
+        self._agent_commands_lock = threading.Lock()
+        self._data_samplers_lock = threading.Lock()
+        self._data_samplers_started = False
+
+        self._connected_event = threading.Event()
+        self._deadlock_event = threading.Event()
+
+        self._harvest_enabled = False
+        self._reinitializing = self._active_session is not None
+
+        configuration = self.configuration
+        if configuration:
+            self._stats_engine.reset_stats(configuration, reset_stream=True)
+            self._stats_custom_engine.reset_stats(configuration)
+
+        # The accumulators of the parent process are replaced, as the data
+        # in them is reported by the parent.
+
+        if configuration and configuration.thread_local_accumulators.enabled:
+            self._thread_accumulators = ThreadAccumulators(configuration)
+        else:
+            self._thread_accumulators = None
+
+        self._period_start = time.time()
+        self._transaction_count = 0
+        self._last_transaction = 0.0
+        self._global_events_account = 0
+
+        thread = threading.Thread(
+            target=self.connect_to_data_collector, name=f"NR-Activate-Session/{self.name}", args=(None,)
+        )
+        thread.daemon = True
+        thread.start()
+
     def validate_process(self):
         """Logs a warning message if called in a process different to
         where the application was registered. Only logs a message the
@@ -670,7 +850,11 @@ class Application:
 
         """
 
-        if not self._active_session:
+        # Before the session is registered, the rules from the connect
+        # cache are applied to transactions recorded into the pre-connect
+        # buffer.
+
+        if not self._active_session and self.preconnect_configuration is None:
             return name, False
 
         try:
@@ -840,15 +1024,52 @@ class Application:
         the transaction when all other metrics are aggregated and so no
         additional locking will be required.
 
+        If thread local accumulators are enabled, the metrics are instead
+        accumulated by the current thread without locking, and merged
+        into the stats engine at harvest time.
+
         """
 
         if not self._active_session:
             return
 
+        thread_accumulators = self._thread_accumulators
+        if thread_accumulators is not None:
+            thread_accumulators.record(ThreadAccumulator.record_custom_metric, name, value)
+            return
+
         with self._stats_custom_lock:
             self._global_events_account += 1
             self._stats_custom_engine.record_custom_metric(name, value)
 
+    def record_log_line(self, level_name):
+        """Count a log line against the application independent of a
+        specific transaction.
+
+        The counts are kept per thread without any locking and are only
+        recorded as the logging metrics at the time of a harvest, so that
+        threads logging outside of a transaction do not contend on the lock
+        for the custom metrics.
+
+        """
+
+        if not self._active_session:
+            return
+
+        self._log_line_counters.increment(level_name)
+
+    def _record_log_line_metrics(self):
+        # Must be called with the lock for the custom metrics held.
+
+        log_lines = self._log_line_counters.harvest()
+        if not log_lines:
+            return
+
+        self._global_events_account += 1
+        self._stats_custom_engine.record_custom_metric("Logging/lines", {"count": sum(log_lines.values())})
+        for level_name, count in log_lines.items():
+            self._stats_custom_engine.record_custom_metric(f"Logging/lines/{level_name}", {"count": count})
+
     def record_custom_metrics(self, metrics):
         """Record a set of custom metrics against the application
         independent of a specific transaction.
@@ -860,11 +1081,20 @@ class Application:
         the transaction when all other metrics are aggregated and so no
         additional locking will be required.
 
+        If thread local accumulators are enabled, the metrics are instead
+        accumulated by the current thread without locking, and merged
+        into the stats engine at harvest time.
+
         """
 
         if not self._active_session:
             return
 
+        thread_accumulators = self._thread_accumulators
+        if thread_accumulators is not None:
+            thread_accumulators.record(ThreadAccumulator.record_custom_metrics, metrics)
+            return
+
         with self._stats_custom_lock:
             for name, value in metrics:
                 self._global_events_account += 1
@@ -881,11 +1111,20 @@ class Application:
         the transaction when all other metrics are aggregated and so no
         additional locking will be required.
 
+        If thread local accumulators are enabled, the metrics are instead
+        accumulated by the current thread without locking, and merged
+        into the stats engine at harvest time.
+
         """
 
         if not self._active_session:
             return
 
+        thread_accumulators = self._thread_accumulators
+        if thread_accumulators is not None:
+            thread_accumulators.record(ThreadAccumulator.record_dimensional_metric, name, value, tags)
+            return
+
         with self._stats_lock:
             self._global_events_account += 1
             self._stats_engine.record_dimensional_metric(name, value, tags)
@@ -901,11 +1140,20 @@ class Application:
         the transaction when all other metrics are aggregated and so no
         additional locking will be required.
 
+        If thread local accumulators are enabled, the metrics are instead
+        accumulated by the current thread without locking, and merged
+        into the stats engine at harvest time.
+
         """
 
         if not self._active_session:
             return
 
+        thread_accumulators = self._thread_accumulators
+        if thread_accumulators is not None:
+            thread_accumulators.record(ThreadAccumulator.record_dimensional_metrics, metrics)
+            return
+
         with self._stats_lock:
             for metric in metrics:
                 name, value = metric[:2]
@@ -926,6 +1174,14 @@ class Application:
         event = create_custom_event(event_type, params, settings=settings)
 
         if event:
+            thread_accumulators = self._thread_accumulators
+            if thread_accumulators is not None:
+                if settings.collect_custom_events:
+                    thread_accumulators.record(ThreadAccumulator.record_custom_event, event)
+                else:
+                    thread_accumulators.record(ThreadAccumulator.count_event)
+                return
+
             with self._stats_custom_lock:
                 self._global_events_account += 1
                 self._stats_engine.record_custom_event(event)
@@ -942,6 +1198,11 @@ class Application:
         event = create_custom_event(event_type, params, settings=settings, is_ml_event=True)
 
         if event:
+            thread_accumulators = self._thread_accumulators
+            if thread_accumulators is not None:
+                thread_accumulators.record(ThreadAccumulator.record_ml_event, event)
+                return
+
             with self._stats_custom_lock:
                 self._global_events_account += 1
                 self._stats_engine.record_ml_event(event)
@@ -957,10 +1218,88 @@ class Application:
             if event:
                 self._global_events_account += 1
 
+    def _preconnect_configuration(self, cache_entry):
+        """Returns the settings used to record transactions before the
+        session is registered. If the connect cache holds the response from
+        the last registration, the server side configuration and the
+        normalization rules from it are used. Otherwise only the local
+        settings are used.
+
+        """
+
+        if cache_entry is not None:
+            from newrelic.core.agent_protocol import AgentProtocol
+
+            try:
+                configuration = AgentProtocol._apply_high_security_mode_fixups(
+                    cache_entry["configuration"], global_settings()
+                )
+                preconnect_settings = finalize_application_settings(configuration)
+
+                rules_engine = {
+                    "url": RulesEngine(preconnect_settings.url_rules),
+                    "metric": RulesEngine(preconnect_settings.metric_name_rules),
+                    "transaction": RulesEngine(preconnect_settings.transaction_name_rules),
+                    "segment": SegmentCollapseEngine(preconnect_settings.transaction_segment_terms),
+                }
+            except Exception:
+                _logger.debug(
+                    "Unable to apply the cached server side configuration for %r.", self._app_name, exc_info=True
+                )
+            else:
+                _logger.debug("Using the cached server side configuration for %r.", self._app_name)
+                self._rules_engine.update(rules_engine)
+                return preconnect_settings
+
+        return finalize_application_settings()
+
+    def _record_preconnect_transaction(self, data):
+        """Records a transaction which completed before the session was
+        registered into the pre-connect buffer. The number of transactions
+        buffered is capped by the preconnect_buffer.max_transactions setting.
+
+        """
+
+        settings = self.preconnect_configuration
+
+        # Only transactions which were started using the local settings
+        # for the buffer are recorded.
+
+        if settings is None or data.settings is not settings:
+            return
+
+        with self._stats_lock:
+            stats_engine = self._preconnect_stats
+            if stats_engine is None:
+                return
+
+            if self._preconnect_count >= settings.preconnect_buffer.max_transactions:
+                self._preconnect_dropped += 1
+                return
+
+            self._preconnect_count += 1
+
+        try:
+            stats = stats_engine.create_workarea()
+            stats.record_transaction(data)
+        except Exception:
+            _logger.exception(
+                "The generation of transaction data for the pre-connect "
+                "buffer has failed. This would indicate some sort of internal "
+                "implementation issue with the agent. Please report this "
+                "problem to New Relic support for further investigation."
+            )
+            return
+
+        with self._stats_lock:
+            if self._preconnect_stats is stats_engine:
+                stats_engine.merge(stats)
+
     def record_transaction(self, data):
         """Record a single transaction against this application."""
 
         if not self._active_session:
+            self._record_preconnect_transaction(data)
             return
 
         settings = self._stats_engine.settings
@@ -1146,6 +1485,188 @@ class Application:
 
         return {command_id: {}}
 
+    def _merge_thread_accumulators(self, thread_accumulators=None):
+        """Merges the custom metrics and events accumulated by each thread
+        since the last harvest into the stats engines.
+
+        """
+
+        thread_accumulators = thread_accumulators or self._thread_accumulators
+        if thread_accumulators is None:
+            return
+
+        accumulators = thread_accumulators.harvest()
+        if not accumulators:
+            return
+
+        with self._stats_custom_lock:
+            for accumulator in accumulators:
+                self._global_events_account += accumulator.events_account
+                self._stats_custom_engine.merge_custom_metrics(accumulator.custom_metrics.metrics())
+
+        with self._stats_lock:
+            for accumulator in accumulators:
+                self._stats_engine.merge_dimensional_metrics(accumulator.dimensional_metrics.metrics())
+                self._stats_engine._merge_custom_events(accumulator)
+                self._stats_engine._merge_ml_events(accumulator)
+
+    def _merge_data_sampler_metrics(self, stats):
+        # Merge in any metrics from the data samplers associated
+        # with this application.
+        #
+        # NOTE If a data sampler has problems then what data was
+        # collected up to that point is retained. The data
+        # collector itself is still retained and would be used
+        # again on future harvest. If it is a persistent problem
+        # with the data sampler the issue would then reoccur
+        # with every harvest. If data sampler is a user provided
+        # data sampler, then should perhaps deregister it if it
+        # keeps having problems.
+
+        _logger.debug("Fetching metrics from data sources for harvest of %r.", self._app_name)
+
+        for data_sampler in self._data_samplers:
+            try:
+                for sample in data_sampler.metrics():
+                    try:
+                        name, value = sample
+                        stats.record_custom_metric(name, value)
+                    except Exception:
+                        _logger.exception(
+                            "The merging of custom "
+                            "metric sample %r from data "
+                            "source %r has failed. Validate "
+                            "the format of the sample. If "
+                            "this issue persists then please "
+                            "report this problem to the data "
+                            "source provider or New Relic "
+                            "support for further "
+                            "investigation.",
+                            sample,
+                            data_sampler.name,
+                        )
+                        break
+
+            except Exception:
+                _logger.exception(
+                    "The merging of custom metric "
+                    "samples from data source %r has failed. "
+                    "Validate that the data source is "
+                    "producing samples correctly. If this "
+                    "issue persists then please report this "
+                    "problem to the data source provider or "
+                    "New Relic support for further "
+                    "investigation.",
+                    data_sampler.name,
+                )
+
+    def forward_harvest(self, aggregator, flexible=False):
+        """Sends the snapshot for a harvest to the harvester process rather
+        than reporting it to the data collector. Only the slow SQL and
+        transaction traces are reported directly. Returns False if the
+        snapshot could not be sent, in which case the data is merged back
+        and the caller should perform a normal harvest instead.
+
+        """
+
+        if self._agent_shutdown or not self._active_session or not self._harvest_enabled:
+            return True
+
+        self._merge_thread_accumulators()
+
+        with self._stats_lock:
+            self._transaction_count = 0
+            self._last_transaction = 0.0
+
+            stats = self._stats_engine.harvest_snapshot(flexible)
+
+        if not flexible:
+            with self._stats_custom_lock:
+                self._record_log_line_metrics()
+                stats_custom = self._stats_custom_engine.harvest_snapshot()
+
+            stats.merge_metric_stats(stats_custom)
+
+            self._merge_data_sampler_metrics(stats)
+
+        _logger.debug("Forwarding harvest snapshot of %r to the harvester process.", self._app_name)
+
+        if not aggregator.send(self._app_name, stats.aggregation_snapshot()):
+            with self._stats_lock:
+                self._stats_engine.rollback(stats)
+
+            return False
+
+        # The slow SQL and transaction traces are not part of the snapshot
+        # and are sent by this process, as the explain plans for the slow
+        # SQL need to be run using the database connections of this process.
+        # As in a normal harvest, they are discarded if they can't be sent.
+
+        if not flexible:
+            try:
+                self._send_traces(self._active_session.configuration, stats)
+
+            except ForceAgentRestart:
+                self.internal_agent_shutdown(restart=True)
+
+            except ForceAgentDisconnect:
+                self.internal_agent_shutdown(restart=False)
+
+            except (RetryDataForRequest, DiscardDataForRequest):
+                _logger.debug("Discarding slow SQL and transaction traces for harvest of %r.", self._app_name)
+
+            except Exception:
+                _logger.exception(
+                    "Unexpected exception when attempting "
+                    "to send the slow SQL and transaction traces to the "
+                    "data collector. Please report this problem to "
+                    "New Relic support for further investigation."
+                )
+
+            finally:
+                if self._active_session:
+                    self._active_session.close_connection()
+
+        return True
+
+    def _send_traces(self, configuration, stats):
+        """Sends the slow SQL and transaction traces from the stats engine
+        snapshot for a harvest to the data collector.
+
+        """
+
+        if not configuration.collect_traces:
+            return
+
+        connections = SQLConnections(configuration.agent_limits.max_sql_connections)
+
+        with connections:
+            if configuration.slow_sql.enabled:
+                _logger.debug("Processing slow SQL data for harvest of %r.", self._app_name)
+
+                slow_sql_data = stats.slow_sql_data(connections)
+
+                if slow_sql_data:
+                    _logger.debug("Sending slow SQL data for harvest of %r.", self._app_name)
+
+                    self._active_session.send_sql_traces(slow_sql_data)
+
+            slow_transaction_data = stats.transaction_trace_data(connections)
+
+            if slow_transaction_data:
+                _logger.debug("Sending slow transaction data for harvest of %r.", self._app_name)
+
+                self._active_session.send_transaction_traces(slow_transaction_data)
+
+    def merge_aggregation_snapshot(self, snapshot):
+        """Merges a harvest snapshot received from a worker process into
+        the data to be reported by this process.
+
+        """
+
+        with self._stats_lock:
+            self._stats_engine.merge_aggregation_snapshot(snapshot)
+
     def harvest(self, shutdown=False, flexible=False):
         """Performs a harvest, reporting aggregated data for the current
         reporting period to the data collector.
@@ -1183,6 +1704,9 @@ class Application:
                 _logger.debug("Snapshotting for harvest[%s] of %r.", call_metric, self._app_name)
 
                 configuration = self._active_session.configuration
+
+                self._merge_thread_accumulators()
+
                 transaction_count = self._transaction_count
 
                 with self._stats_lock:
@@ -1194,6 +1718,8 @@ class Application:
 
                 if not flexible:
                     with self._stats_custom_lock:
+                        self._record_log_line_metrics()
+
                         global_events_account = self._global_events_account
                         self._global_events_account = 0
 
@@ -1206,52 +1732,13 @@ class Application:
 
                     # Now merge in any metrics from the data samplers
                     # associated with this application.
-                    #
-                    # NOTE If a data sampler has problems then what data was
-                    # collected up to that point is retained. The data
-                    # collector itself is still retained and would be used
-                    # again on future harvest. If it is a persistent problem
-                    # with the data sampler the issue would then reoccur
-                    # with every harvest. If data sampler is a user provided
-                    # data sampler, then should perhaps deregister it if it
-                    # keeps having problems.
-
-                    _logger.debug("Fetching metrics from data sources for harvest of %r.", self._app_name)
-
-                    for data_sampler in self._data_samplers:
-                        try:
-                            for sample in data_sampler.metrics():
-                                try:
-                                    name, value = sample
-                                    stats.record_custom_metric(name, value)
-                                except Exception:
-                                    _logger.exception(
-                                        "The merging of custom "
-                                        "metric sample %r from data "
-                                        "source %r has failed. Validate "
-                                        "the format of the sample. If "
-                                        "this issue persists then please "
-                                        "report this problem to the data "
-                                        "source provider or New Relic "
-                                        "support for further "
-                                        "investigation.",
-                                        sample,
-                                        data_sampler.name,
-                                    )
-                                    break
-
-                        except Exception:
-                            _logger.exception(
-                                "The merging of custom metric "
-                                "samples from data source %r has failed. "
-                                "Validate that the data source is "
-                                "producing samples correctly. If this "
-                                "issue persists then please report this "
-                                "problem to the data source provider or "
-                                "New Relic support for further "
-                                "investigation.",
-                                data_sampler.name,
-                            )
+
+                    self._merge_data_sampler_metrics(stats)
+
+                    # Merge in the metrics about the overhead of any
+                    # thread profiling session for this application.
+
+                    stats.merge_custom_metrics(self.profile_manager.overhead_metrics(self._app_name))
 
                     # Send environment plugin list
 
@@ -1364,6 +1851,21 @@ class Application:
 
                                 internal_count_metric("Supportability/InfiniteTracing/Span/Seen", spans_seen)
                                 internal_count_metric("Supportability/InfiniteTracing/Span/Sent", spans_sent)
+
+                                # Report the effective transaction sampling
+                                # rate applied due to back-pressure.
+                                transactions_seen, transactions_sampled = span_stream.sampling_stats()
+                                if transactions_seen:
+                                    internal_count_metric(
+                                        "Supportability/InfiniteTracing/Backpressure/Seen", transactions_seen
+                                    )
+                                    internal_count_metric(
+                                        "Supportability/InfiniteTracing/Backpressure/Sampled", transactions_sampled
+                                    )
+                                    internal_metric(
+                                        "Supportability/InfiniteTracing/Backpressure/SamplingRate",
+                                        float(transactions_sampled) / transactions_seen,
+                                    )
                         else:
                             spans = stats.span_events
                             if spans:
@@ -1486,26 +1988,7 @@ class Application:
                             self._active_session.send_errors(error_data)
 
                     if not flexible:
-                        if configuration.collect_traces:
-                            connections = SQLConnections(configuration.agent_limits.max_sql_connections)
-
-                            with connections:
-                                if configuration.slow_sql.enabled:
-                                    _logger.debug("Processing slow SQL data for harvest of %r.", self._app_name)
-
-                                    slow_sql_data = stats.slow_sql_data(connections)
-
-                                    if slow_sql_data:
-                                        _logger.debug("Sending slow SQL data for harvest of %r.", self._app_name)
-
-                                        self._active_session.send_sql_traces(slow_sql_data)
-
-                                slow_transaction_data = stats.transaction_trace_data(connections)
-
-                                if slow_transaction_data:
-                                    _logger.debug("Sending slow transaction data for harvest of %r.", self._app_name)
-
-                                    self._active_session.send_transaction_traces(slow_transaction_data)
+                        self._send_traces(configuration, stats)
 
                         # Create a metric_normalizer based on normalize_name
                         # If metric rename rules are empty, set normalizer
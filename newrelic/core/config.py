@@ -29,20 +29,12 @@ import os
 import re
 import threading
 import urllib.parse as urlparse
+from collections import namedtuple
 
 from newrelic.common.object_names import parse_exc_info
 from newrelic.core.attribute import MAX_ATTRIBUTE_LENGTH
 from newrelic.core.attribute_filter import AttributeFilter
 
-try:
-    import grpc
-
-    from newrelic.core.infinite_tracing_pb2 import (  # pylint: disable=W0611,C0412  # noqa: F401
-        Span,
-    )
-except Exception:
-    grpc = None
-
 
 # By default, Transaction Events and Custom Events have the same size
 # reservoir. Error Events have a different default size.
@@ -117,6 +109,10 @@ class TopLevelSettings(Settings):
     _host = None
     _otlp_host = None
 
+    # Set to the snapshot of the flags checked on every transaction when
+    # the application settings are finalized.
+    hot_flags = None
+
     @property
     def host(self):
         if self._host:
@@ -158,6 +154,14 @@ class MemoryRuntimeMetricsSettings(Settings):
     pass
 
 
+class MemoryAllocationsSettings(Settings):
+    pass
+
+
+class ContinuousProfilerSettings(Settings):
+    pass
+
+
 class MachineLearningSettings(Settings):
     pass
 
@@ -196,6 +200,10 @@ class CodeLevelMetricsSettings(Settings):
     pass
 
 
+class ConnectCacheSettings(Settings):
+    pass
+
+
 class ThreadProfilerSettings(Settings):
     pass
 
@@ -246,6 +254,10 @@ class AgentLimitsSettings(Settings):
     pass
 
 
+class AggregatorSettings(Settings):
+    pass
+
+
 class ConsoleSettings(Settings):
     pass
 
@@ -407,7 +419,14 @@ class InfiniteTracingSettings(Settings):
 
     @staticmethod
     def _can_enable_infinite_tracing():
-        if grpc is None:
+        # The libraries required for infinite tracing are only imported once
+        # a trace observer has been configured.
+
+        try:
+            import grpc  # noqa: F401
+
+            from newrelic.core.infinite_tracing_pb2 import Span  # noqa: F401
+        except Exception:
             _logger.error(
                 "Unable to import libraries required for infinite tracing. "
                 "Please run pip install newrelic[infinite-tracing] "
@@ -419,10 +438,26 @@ class InfiniteTracingSettings(Settings):
         return True
 
 
+class InfiniteTracingBackpressureSettings(Settings):
+    pass
+
+
 class InstrumentationSettings(Settings):
     pass
 
 
+class PreconnectBufferSettings(Settings):
+    pass
+
+
+class AdaptiveSamplingSettings(Settings):
+    pass
+
+
+class ThreadLocalAccumulatorsSettings(Settings):
+    pass
+
+
 class InstrumentationGraphQLSettings(Settings):
     pass
 
@@ -449,6 +484,7 @@ class EventHarvestConfigHarvestLimitSettings(Settings):
 
 _settings = TopLevelSettings()
 _settings.agent_limits = AgentLimitsSettings()
+_settings.aggregator = AggregatorSettings()
 _settings.application_logging = ApplicationLoggingSettings()
 _settings.application_logging.forwarding = ApplicationLoggingForwardingSettings()
 _settings.application_logging.forwarding.labels = ApplicationLoggingForwardingLabelsSettings()
@@ -466,10 +502,13 @@ _settings.ai_monitoring.record_content = AIMonitoringRecordContentSettings()
 _settings.k8s_operator = K8sOperatorSettings()
 _settings.azure_operator = AzureOperatorSettings()
 _settings.package_reporting = PackageReportingSettings()
+_settings.adaptive_sampling = AdaptiveSamplingSettings()
+_settings.thread_local_accumulators = ThreadLocalAccumulatorsSettings()
 _settings.attributes = AttributesSettings()
 _settings.browser_monitoring = BrowserMonitorSettings()
 _settings.browser_monitoring.attributes = BrowserMonitorAttributesSettings()
 _settings.code_level_metrics = CodeLevelMetricsSettings()
+_settings.connect_cache = ConnectCacheSettings()
 _settings.console = ConsoleSettings()
 _settings.cross_application_tracer = CrossApplicationTracerSettings()
 _settings.custom_insights_events = CustomInsightsEventsSettings()
@@ -486,11 +525,15 @@ _settings.event_harvest_config.harvest_limits = EventHarvestConfigHarvestLimitSe
 _settings.event_loop_visibility = EventLoopVisibilitySettings()
 _settings.gc_runtime_metrics = GCRuntimeMetricsSettings()
 _settings.memory_runtime_pid_metrics = MemoryRuntimeMetricsSettings()
+_settings.memory_allocations = MemoryAllocationsSettings()
+_settings.continuous_profiler = ContinuousProfilerSettings()
 _settings.heroku = HerokuSettings()
 _settings.infinite_tracing = InfiniteTracingSettings()
+_settings.infinite_tracing.backpressure = InfiniteTracingBackpressureSettings()
 _settings.instrumentation = InstrumentationSettings()
 _settings.instrumentation.graphql = InstrumentationGraphQLSettings()
 _settings.message_tracer = MessageTracerSettings()
+_settings.preconnect_buffer = PreconnectBufferSettings()
 _settings.process_host = ProcessHostSettings()
 _settings.rum = RumSettings()
 _settings.serverless_mode = ServerlessModeSettings()
@@ -686,6 +729,7 @@ _settings.host = os.environ.get("NEW_RELIC_HOST")
 _settings.otlp_host = os.environ.get("NEW_RELIC_OTLP_HOST")
 _settings.port = int(os.environ.get("NEW_RELIC_PORT", "0"))
 _settings.otlp_port = int(os.environ.get("NEW_RELIC_OTLP_PORT", "0"))
+_settings.otlp_export = _environ_as_set("NEW_RELIC_OTLP_EXPORT", "")
 
 _settings.agent_run_id = None
 _settings.entity_guid = None
@@ -744,6 +788,14 @@ _settings.sampling_rate = 0
 
 _settings.startup_timeout = float(os.environ.get("NEW_RELIC_STARTUP_TIMEOUT", "0.0"))
 _settings.shutdown_timeout = float(os.environ.get("NEW_RELIC_SHUTDOWN_TIMEOUT", "2.5"))
+_settings.reinitialize_after_fork = _environ_as_bool("NEW_RELIC_REINITIALIZE_AFTER_FORK", default=False)
+
+_settings.preconnect_buffer.enabled = _environ_as_bool("NEW_RELIC_PRECONNECT_BUFFER_ENABLED", default=False)
+_settings.preconnect_buffer.max_transactions = _environ_as_int("NEW_RELIC_PRECONNECT_BUFFER_MAX_TRANSACTIONS", 1000)
+
+_settings.connect_cache.enabled = _environ_as_bool("NEW_RELIC_CONNECT_CACHE_ENABLED", default=False)
+_settings.connect_cache.directory = os.environ.get("NEW_RELIC_CONNECT_CACHE_DIRECTORY", None)
+_settings.connect_cache.ttl = _environ_as_float("NEW_RELIC_CONNECT_CACHE_TTL", 3600.0)
 
 _settings.beacon = None
 _settings.error_beacon = None
@@ -766,6 +818,10 @@ _settings.trusted_account_key = os.environ.get("NEW_RELIC_TRUSTED_ACCOUNT_KEY")
 _settings.encoding_key = None
 _settings.sampling_target = 10
 _settings.sampling_target_period_in_seconds = 60
+_settings.adaptive_sampling.lock_free = _environ_as_bool("NEW_RELIC_ADAPTIVE_SAMPLING_LOCK_FREE", default=False)
+_settings.thread_local_accumulators.enabled = _environ_as_bool(
+    "NEW_RELIC_THREAD_LOCAL_ACCUMULATORS_ENABLED", default=False
+)
 
 _settings.compressed_content_encoding = "gzip"
 _settings.max_payload_size_in_bytes = 1000000
@@ -775,15 +831,34 @@ _settings.attributes.exclude = []
 _settings.attributes.include = []
 
 _settings.thread_profiler.enabled = True
+_settings.thread_profiler.overhead_budget = 0.05
+_settings.thread_profiler.max_sample_period = 5.0
 _settings.cross_application_tracer.enabled = False
 
 _settings.gc_runtime_metrics.enabled = _environ_as_bool("NEW_RELIC_GC_RUNTIME_METRICS_ENABLED", default=False)
 _settings.gc_runtime_metrics.top_object_count_limit = 5
+_settings.gc_runtime_metrics.census_sample_size = 0
+_settings.gc_runtime_metrics.census_time_budget = 0.05
+_settings.gc_runtime_metrics.transaction_attribution = False
 
 _settings.memory_runtime_pid_metrics.enabled = _environ_as_bool(
     "NEW_RELIC_MEMORY_RUNTIME_PID_METRICS_ENABLED", default=True
 )
 
+_settings.memory_allocations.enabled = _environ_as_bool("NEW_RELIC_MEMORY_ALLOCATIONS_ENABLED", default=False)
+_settings.memory_allocations.frame_depth = _environ_as_int("NEW_RELIC_MEMORY_ALLOCATIONS_FRAME_DEPTH", default=5)
+_settings.memory_allocations.top_n = 10
+_settings.memory_allocations.custom_events = True
+_settings.memory_allocations.overhead_budget = 0.01
+_settings.memory_allocations.max_overhead_memory = 64 * 1024 * 1024
+
+_settings.continuous_profiler.enabled = _environ_as_bool("NEW_RELIC_CONTINUOUS_PROFILER_ENABLED", default=False)
+_settings.continuous_profiler.sample_period = 1.0
+_settings.continuous_profiler.profile_agent_code = False
+_settings.continuous_profiler.output_directory = os.environ.get("NEW_RELIC_CONTINUOUS_PROFILER_OUTPUT_DIRECTORY", None)
+_settings.continuous_profiler.endpoint = os.environ.get("NEW_RELIC_CONTINUOUS_PROFILER_ENDPOINT", None)
+_settings.continuous_profiler.max_files = 100
+
 _settings.transaction_events.enabled = True
 _settings.transaction_events.attributes.enabled = True
 _settings.transaction_events.attributes.exclude = []
@@ -867,6 +942,11 @@ _settings.agent_limits.synthetics_events = 200
 _settings.agent_limits.synthetics_transactions = 20
 _settings.agent_limits.data_compression_threshold = 64 * 1024
 _settings.agent_limits.data_compression_level = None
+_settings.agent_limits.data_compression_target_ratio = None
+
+_settings.aggregator.enabled = _environ_as_bool("NEW_RELIC_AGGREGATOR_ENABLED", default=False)
+_settings.aggregator.socket_path = os.environ.get("NEW_RELIC_AGGREGATOR_SOCKET_PATH", None)
+_settings.aggregator.timeout = 5.0
 
 _settings.infinite_tracing.trace_observer_host = os.environ.get("NEW_RELIC_INFINITE_TRACING_TRACE_OBSERVER_HOST", None)
 _settings.infinite_tracing.trace_observer_port = _environ_as_int("NEW_RELIC_INFINITE_TRACING_TRACE_OBSERVER_PORT", 443)
@@ -874,6 +954,14 @@ _settings.infinite_tracing.compression = _environ_as_bool("NEW_RELIC_INFINITE_TR
 _settings.infinite_tracing.batching = _environ_as_bool("NEW_RELIC_INFINITE_TRACING_BATCHING", default=True)
 _settings.infinite_tracing.ssl = True
 _settings.infinite_tracing.span_queue_size = _environ_as_int("NEW_RELIC_INFINITE_TRACING_SPAN_QUEUE_SIZE", 10000)
+_settings.infinite_tracing.backpressure.enabled = _environ_as_bool(
+    "NEW_RELIC_INFINITE_TRACING_BACKPRESSURE_ENABLED", default=False
+)
+_settings.infinite_tracing.backpressure.drop_threshold = _environ_as_float(
+    "NEW_RELIC_INFINITE_TRACING_BACKPRESSURE_DROP_THRESHOLD", 0.05
+)
+_settings.infinite_tracing.backpressure.window = 1.0
+_settings.infinite_tracing.backpressure.minimum_sampling_rate = 0.01
 
 _settings.instrumentation.graphql.capture_introspection_queries = os.environ.get(
     "NEW_RELIC_INSTRUMENTATION_GRAPHQL_CAPTURE_INTROSPECTION_QUERIES", False
@@ -938,6 +1026,8 @@ _settings.utilization.detect_docker = True
 _settings.utilization.detect_kubernetes = True
 _settings.utilization.detect_gcp = True
 _settings.utilization.detect_pcf = True
+_settings.utilization.detect_timeout = _environ_as_float("NEW_RELIC_UTILIZATION_DETECT_TIMEOUT", 1.0)
+_settings.utilization.cache_enabled = _environ_as_bool("NEW_RELIC_UTILIZATION_CACHE_ENABLED", default=False)
 
 _settings.utilization.logical_processors = _environ_as_int("NEW_RELIC_UTILIZATION_LOGICAL_PROCESSORS")
 _settings.utilization.total_ram_mib = _environ_as_int("NEW_RELIC_UTILIZATION_TOTAL_RAM_MIB")
@@ -959,6 +1049,9 @@ _settings.aws_lambda_metadata = {}
 
 _settings.event_loop_visibility.enabled = True
 _settings.event_loop_visibility.blocking_threshold = 0.1
+_settings.event_loop_visibility.callback_timing = _environ_as_bool(
+    "NEW_RELIC_EVENT_LOOP_VISIBILITY_CALLBACK_TIMING", default=False
+)
 _settings.code_level_metrics.enabled = True
 
 _settings.application_logging.enabled = _environ_as_bool("NEW_RELIC_APPLICATION_LOGGING_ENABLED", default=True)
@@ -1057,6 +1150,91 @@ def flatten_settings(settings):
     return flattened
 
 
+_HotFlags = namedtuple(
+    "_HotFlags",
+    [
+        "collect_errors",
+        "collect_error_events",
+        "observe_errors",
+        "collect_slow_sql",
+        "collect_transaction_traces",
+        "collect_transaction_events",
+        "collect_custom_events",
+        "collect_ml_events",
+        "distributed_tracing",
+        "collect_span_events",
+        "infinite_tracing",
+        "code_level_metrics",
+        "application_logging",
+        "log_metrics",
+        "log_forwarding",
+        "log_context_data",
+        "log_local_decorating",
+    ],
+)
+
+
+class HotFlags(_HotFlags):
+    """A flattened, immutable snapshot of the settings which are checked
+    for every transaction, trace or log record. Each flag combines the
+    chain of nested settings, and the server side collect flags, which
+    together decide whether the data is captured.
+
+    """
+
+    @classmethod
+    def from_settings(cls, settings):
+        error_collector = settings.error_collector
+        application_logging = settings.application_logging
+        forwarding = application_logging.forwarding
+        logging_enabled = bool(application_logging.enabled)
+        forwarding_enabled = logging_enabled and bool(forwarding.enabled)
+
+        return cls(
+            collect_errors=bool(error_collector.enabled and settings.collect_errors),
+            collect_error_events=bool(
+                error_collector.enabled and error_collector.capture_events and settings.collect_error_events
+            ),
+            observe_errors=bool(
+                error_collector.enabled
+                and (
+                    settings.collect_traces
+                    or settings.collect_span_events
+                    or settings.collect_errors
+                    or settings.collect_error_events
+                )
+            ),
+            collect_slow_sql=bool(settings.slow_sql.enabled and settings.collect_traces),
+            collect_transaction_traces=bool(settings.transaction_tracer.enabled and settings.collect_traces),
+            collect_transaction_events=bool(settings.collect_analytics_events and settings.transaction_events.enabled),
+            collect_custom_events=bool(settings.collect_custom_events and settings.custom_insights_events.enabled),
+            collect_ml_events=bool(settings.ml_insights_events.enabled),
+            distributed_tracing=bool(settings.distributed_tracing.enabled),
+            collect_span_events=bool(
+                settings.distributed_tracing.enabled and settings.span_events.enabled and settings.collect_span_events
+            ),
+            infinite_tracing=bool(settings.infinite_tracing.enabled),
+            code_level_metrics=bool(settings.code_level_metrics and settings.code_level_metrics.enabled),
+            application_logging=logging_enabled,
+            log_metrics=logging_enabled and bool(application_logging.metrics.enabled),
+            log_forwarding=forwarding_enabled,
+            log_context_data=forwarding_enabled and bool(forwarding.context_data.enabled),
+            log_local_decorating=logging_enabled and bool(application_logging.local_decorating.enabled),
+        )
+
+
+def hot_flags(settings):
+    """Returns the hot flags for the settings. These are computed once when
+    the application settings are finalized, so changes made to finalized
+    settings afterwards are not reflected in them. For any other settings,
+    such as the global settings, they are computed on each call so that
+    changes to the settings are always seen.
+
+    """
+
+    return getattr(settings, "hot_flags", None) or HotFlags.from_settings(settings)
+
+
 def create_obfuscated_netloc(username, password, hostname, mask):
     """Create a netloc string from hostname, username and password. If the
     username and/or password is present, replace them with the obfuscation
@@ -1316,7 +1494,7 @@ def apply_server_side_settings(server_side_config=None, settings=_settings):
 
 
 def finalize_application_settings(server_side_config=None, settings=_settings):
-    """Overlay server-side settings and add attribute filter."""
+    """Overlay server-side settings and add attribute filter and hot flags."""
     server_side_config = server_side_config if server_side_config is not None else {}
 
     # Remove values from server_config that should not overwrite the
@@ -1326,6 +1504,7 @@ def finalize_application_settings(server_side_config=None, settings=_settings):
     application_settings = apply_server_side_settings(server_side_config, settings)
 
     application_settings.attribute_filter = AttributeFilter(flatten_settings(application_settings))
+    application_settings.hot_flags = HotFlags.from_settings(application_settings)
 
     return application_settings
 
@@ -0,0 +1,162 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements the on-disk cache of the data gathered when
+registering an application with the data collector.
+
+An entry holds the last connect response received from the data
+collector, along with the utilization data and environment which were
+gathered to build the connect payload. Entries are keyed by the license
+key, the application names, the collector host and the agent version, and
+expire once older than the TTL given by the connect_cache.ttl setting.
+
+The cached connect response allows an application to start recording data
+using the server side configuration as soon as the process starts, while
+the cached utilization data and environment shorten the registration which
+then takes place in the background. The cloud vendor detected for the host
+is also cached in the same directory, for each boot of the host.
+
+The default directory is created in the temporary directory, accessible
+only by the current user. Neither the cache directory nor an entry in it is
+used unless owned by the current user, so another user cannot plant or
+tamper with an entry.
+
+"""
+
+import hashlib
+import logging
+import os
+import stat
+import tempfile
+import time
+
+from newrelic import version
+from newrelic.common.encoding_utils import json_decode, json_encode
+from newrelic.common.system_info import owned_by_current_user, private_directory
+
+_logger = logging.getLogger(__name__)
+
+
+def default_cache_directory():
+    uid = os.getuid() if hasattr(os, "getuid") else os.getpid()
+    return os.path.join(tempfile.gettempdir(), f"newrelic-connect-cache-{uid}")
+
+
+def connect_cache_path(settings, app_names):
+    key = "\0".join((settings.license_key or "", settings.host or "", version, *app_names))
+    directory = settings.connect_cache.directory or default_cache_directory()
+    return os.path.join(directory, f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json")
+
+
+def _trusted_directory(directory):
+    # The default directory is in a location shared with other users, so
+    # must be private to the current user. A directory which has been
+    # configured explicitly may be readable by others, but must not be
+    # writable by them.
+
+    mode = 0o700 if directory == default_cache_directory() else 0o755
+
+    if private_directory(directory, mode):
+        return True
+
+    _logger.debug("Not using the cache directory %r as it is not private to the current user.", directory)
+    return False
+
+
+def read_cache_file(path):
+    """Returns the decoded contents of a cache file, or None if the file
+    does not exist, is not owned by the current user or cannot be decoded.
+
+    """
+
+    if not _trusted_directory(os.path.dirname(path)):
+        return None
+
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except FileNotFoundError:
+        return None
+    except Exception:
+        _logger.debug("Unable to read the cache file %r.", path, exc_info=True)
+        return None
+
+    try:
+        with os.fdopen(fd) as fh:
+            st = os.fstat(fh.fileno())
+            if not stat.S_ISREG(st.st_mode) or not owned_by_current_user(st):
+                _logger.debug("Ignoring the cache file %r as it is not owned by the current user.", path)
+                return None
+
+            return json_decode(fh.read())
+    except Exception:
+        _logger.debug("Unable to read the cache file %r.", path, exc_info=True)
+        return None
+
+
+def write_cache_file(path, data):
+    """Writes the encoded data to a cache file. The data is written to a
+    temporary file which then replaces any existing file, so a process
+    never reads a partially written file.
+
+    """
+
+    directory = os.path.dirname(path)
+
+    if not _trusted_directory(directory):
+        return False
+
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                fh.write(json_encode(data))
+            os.replace(temp_path, path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+    except Exception:
+        _logger.debug("Unable to write the cache file %r.", path, exc_info=True)
+        return False
+
+    return True
+
+
+def load_connect_cache(settings, app_names):
+    """Returns the cache entry for the application names, or None if there
+    is no entry or the entry has expired.
+
+    """
+
+    path = connect_cache_path(settings, app_names)
+    entry = read_cache_file(path)
+
+    if entry is None:
+        return None
+
+    try:
+        age = time.time() - entry["created"]
+    except Exception:
+        _logger.debug("Ignoring the malformed connect cache entry %r.", path)
+        return None
+
+    if not 0 <= age < settings.connect_cache.ttl:
+        return None
+
+    return entry
+
+
+def save_connect_cache(settings, app_names, entry):
+    """Writes the cache entry for the application names."""
+
+    return write_cache_file(connect_cache_path(settings, app_names), entry)
@@ -30,9 +30,23 @@ from newrelic.core.agent_protocol import (
 )
 from newrelic.core.agent_streaming import StreamingRpc
 from newrelic.core.config import global_settings
-from newrelic.core.otlp_utils import encode_metric_data, encode_ml_event_data
+from newrelic.core.internal_metrics import internal_count_metric
+from newrelic.core.otlp_utils import (
+    encode_custom_event_data,
+    encode_error_event_data,
+    encode_log_event_data,
+    encode_metric_data,
+    encode_ml_event_data,
+    encode_span_event_data,
+    encode_transaction_event_data,
+)
 
 from newrelic.core.attribute import process_user_attribute, MAX_NUM_USER_ATTRIBUTES
+from newrelic.network.exceptions import (
+    DiscardDataForRequest,
+    PayloadTooLargeForRequest,
+    RetryDataForRequest,
+)
 
 _logger = logging.getLogger(__name__)
 
@@ -42,9 +56,22 @@ class Session:
     OTLP_PROTOCOL = OtlpProtocol
     CLIENT = ApplicationModeClient
 
-    def __init__(self, app_name, linked_applications, environment, settings):
+    def __init__(self, app_name, linked_applications, environment, settings, parent=None):
+        # A session is never shared with a process forked from the one
+        # which registered it. The data collector identifies an instance of
+        # the application, including its host and process ID, by the run
+        # token, and applies the harvest limits to each run. A shutdown of
+        # the parent process would also end the run of all its children.
+        # The protocol of the session of the parent is only used to skip
+        # the preconnect and the gathering of the utilization data.
+
         self._protocol = self.PROTOCOL.connect(
-            app_name, linked_applications, environment, settings, client_cls=self.CLIENT
+            app_name,
+            linked_applications,
+            environment,
+            settings,
+            client_cls=self.CLIENT,
+            parent=parent and parent._protocol,
         )
         self._otlp_protocol = self.OTLP_PROTOCOL.connect(
             app_name, linked_applications, environment, settings, client_cls=self.CLIENT
@@ -62,6 +89,41 @@ class Session:
     def close_connection(self):
         self._protocol.close_connection()
 
+    def _otlp_export(self, method):
+        # Event types listed in the otlp_export setting are sent as OTLP
+        # log records to the OTLP endpoint rather than as JSON to the
+        # data collector.
+        return method in self.configuration.otlp_export
+
+    def _send_event_data(self, method, sampling_info, samples, send):
+        """Sends event samples with the supplied send function, splitting
+        them in half and sending each half in order whenever the payload is
+        rejected as too large. The sampling info is divided between the
+        halves in proportion to the number of samples in each.
+
+        """
+
+        try:
+            return send(sampling_info, samples)
+        except PayloadTooLargeForRequest:
+            samples = list(samples)
+            if len(samples) < 2:
+                raise
+
+        internal_count_metric(f"Supportability/Python/Collector/{method}/Split", 1)
+
+        middle = len(samples) // 2
+        first_info, second_info = _split_sampling_info(sampling_info, middle, len(samples))
+
+        self._send_event_data(method, first_info, samples[:middle], send)
+
+        try:
+            self._send_event_data(method, second_info, samples[middle:], send)
+        except RetryDataForRequest:
+            # Retrying would merge all of the samples back into the next
+            # harvest, sending the first half a second time.
+            raise DiscardDataForRequest
+
     def connect_span_stream(self, span_iterator, record_metric):
         if not self._rpc:
             host = self.configuration.infinite_tracing.trace_observer_host
@@ -112,14 +174,28 @@ class Session:
     def send_transaction_events(self, sampling_info, sample_set):
         """Called to submit sample set for analytics."""
 
-        payload = (self.agent_run_id, sampling_info, sample_set)
-        return self._protocol.send("analytic_event_data", payload)
+        def send(sampling_info, sample_set):
+            if self._otlp_export("analytic_event_data"):
+                payload = encode_transaction_event_data(sample_set, str(self.agent_run_id))
+                return self._otlp_protocol.send("analytic_event_data", payload, path="/v1/logs")
+
+            payload = (self.agent_run_id, sampling_info, sample_set)
+            return self._protocol.send("analytic_event_data", payload)
+
+        return self._send_event_data("analytic_event_data", sampling_info, sample_set, send)
 
     def send_custom_events(self, sampling_info, custom_event_data):
         """Called to submit sample set for custom events."""
 
-        payload = (self.agent_run_id, sampling_info, custom_event_data)
-        return self._protocol.send("custom_event_data", payload)
+        def send(sampling_info, custom_event_data):
+            if self._otlp_export("custom_event_data"):
+                payload = encode_custom_event_data(custom_event_data, str(self.agent_run_id))
+                return self._otlp_protocol.send("custom_event_data", payload, path="/v1/logs")
+
+            payload = (self.agent_run_id, sampling_info, custom_event_data)
+            return self._protocol.send("custom_event_data", payload)
+
+        return self._send_event_data("custom_event_data", sampling_info, custom_event_data, send)
 
     def send_ml_events(self, sampling_info, custom_event_data):
         """Called to submit sample set for machine learning events."""
@@ -129,8 +205,15 @@ class Session:
     def send_span_events(self, sampling_info, span_event_data):
         """Called to submit sample set for span events."""
 
-        payload = (self.agent_run_id, sampling_info, span_event_data)
-        return self._protocol.send("span_event_data", payload)
+        def send(sampling_info, span_event_data):
+            if self._otlp_export("span_event_data"):
+                payload = encode_span_event_data(span_event_data, str(self.agent_run_id))
+                return self._otlp_protocol.send("span_event_data", payload, path="/v1/traces")
+
+            payload = (self.agent_run_id, sampling_info, span_event_data)
+            return self._protocol.send("span_event_data", payload)
+
+        return self._send_event_data("span_event_data", sampling_info, span_event_data, send)
 
     def send_metric_data(self, start_time, end_time, metric_data):
         """Called to submit metric data for specified period of time.
@@ -202,14 +285,22 @@ class Session:
     def send_log_events(self, sampling_info, log_event_data):
         """Called to submit sample set for log events."""
 
-        payload = ({"logs": tuple(log._asdict() for log in log_event_data)},)
-
         # Add common block attributes if not empty
         common = self.get_log_events_common_block()
-        if common:
-            payload[0]["common"] = {"attributes": common}
 
-        return self._protocol.send("log_event_data", payload)
+        def send(sampling_info, log_event_data):
+            if self._otlp_export("log_event_data"):
+                payload = encode_log_event_data(log_event_data, common, str(self.agent_run_id))
+                return self._otlp_protocol.send("log_event_data", payload, path="/v1/logs")
+
+            payload = ({"logs": tuple(log._asdict() for log in log_event_data)},)
+
+            if common:
+                payload[0]["common"] = {"attributes": common}
+
+            return self._protocol.send("log_event_data", payload)
+
+        return self._send_event_data("log_event_data", sampling_info, log_event_data, send)
 
     def get_agent_commands(self):
         """Receive agent commands from the data collector."""
@@ -232,8 +323,15 @@ class Session:
     def send_error_events(self, sampling_info, error_data):
         """Called to submit sample set for error events."""
 
-        payload = (self.agent_run_id, sampling_info, error_data)
-        return self._protocol.send("error_event_data", payload)
+        def send(sampling_info, error_data):
+            if self._otlp_export("error_event_data"):
+                payload = encode_error_event_data(error_data, str(self.agent_run_id))
+                return self._otlp_protocol.send("error_event_data", payload, path="/v1/logs")
+
+            payload = (self.agent_run_id, sampling_info, error_data)
+            return self._protocol.send("error_event_data", payload)
+
+        return self._send_event_data("error_event_data", sampling_info, error_data, send)
 
     def send_sql_traces(self, sql_traces):
         """Called to sub SQL traces. The SQL traces should be an
@@ -306,11 +404,22 @@ class ServerlessModeSession(Session):
         pass
 
 
-def create_session(license_key, app_name, linked_applications, environment):
+def _split_sampling_info(sampling_info, count, total):
+    if not sampling_info:
+        return sampling_info, sampling_info
+
+    first, second = {}, {}
+    for key, value in sampling_info.items():
+        first[key] = value * count // total
+        second[key] = value - first[key]
+    return first, second
+
+
+def create_session(license_key, app_name, linked_applications, environment, parent=None):
     settings = global_settings()
     if settings.serverless_mode.enabled:
-        return ServerlessModeSession(app_name, linked_applications, environment, settings)
+        return ServerlessModeSession(app_name, linked_applications, environment, settings, parent)
     elif settings.developer_mode:
-        return DeveloperModeSession(app_name, linked_applications, environment, settings)
+        return DeveloperModeSession(app_name, linked_applications, environment, settings, parent)
     else:
-        return Session(app_name, linked_applications, environment, settings)
+        return Session(app_name, linked_applications, environment, settings, parent)
@@ -28,12 +28,37 @@ from newrelic.core.stats_engine import CountStats, TimeStats
 
 _logger = logging.getLogger(__name__)
 
+# Mapping of log level names to OTLP severity numbers. Levels which are
+# not listed here are sent as SEVERITY_NUMBER_UNSPECIFIED.
+SEVERITY_NUMBERS = {
+    "TRACE": 1,
+    "DEBUG": 5,
+    "INFO": 9,
+    "WARN": 13,
+    "WARNING": 13,
+    "ERROR": 17,
+    "CRITICAL": 21,
+    "FATAL": 21,
+}
+
+# Mapping of the span.kind intrinsic of span events to OTLP span kinds.
+# Spans without a span.kind are sent as SPAN_KIND_INTERNAL.
+SPAN_KIND_INTERNAL = 1
+SPAN_KINDS = {
+    "server": 2,
+    "client": 3,
+    "producer": 4,
+    "consumer": 5,
+}
+STATUS_CODE_ERROR = 2
+
 _settings = global_settings()
 otlp_content_setting = _settings.debug.otlp_content_encoding
 if not otlp_content_setting or otlp_content_setting == "protobuf":
     try:
         from newrelic.packages.opentelemetry_proto.common_pb2 import AnyValue, KeyValue
         from newrelic.packages.opentelemetry_proto.logs_pb2 import (
+            LogRecord,
             LogsData,
             ResourceLogs,
             ScopeLogs,
@@ -50,6 +75,13 @@ if not otlp_content_setting or otlp_content_setting == "protobuf":
             SummaryDataPoint,
         )
         from newrelic.packages.opentelemetry_proto.resource_pb2 import Resource
+        from newrelic.packages.opentelemetry_proto.trace_pb2 import (
+            ResourceSpans,
+            ScopeSpans,
+            Span,
+            Status,
+            TracesData,
+        )
 
         ValueAtQuantile = SummaryDataPoint.ValueAtQuantile
         AGGREGATION_TEMPORALITY_DELTA = AggregationTemporality.AGGREGATION_TEMPORALITY_DELTA
@@ -79,6 +111,12 @@ if otlp_content_setting == "json":
     ResourceLogs = dict
     ScopeLogs = dict
     LogsData = dict
+    LogRecord = dict
+    ResourceSpans = dict
+    ScopeSpans = dict
+    Span = dict
+    Status = dict
+    TracesData = dict
 
     AGGREGATION_TEMPORALITY_DELTA = 1
     OTLP_CONTENT_TYPE = "application/json"
@@ -266,3 +304,170 @@ def encode_ml_event_data(custom_event_data, agent_run_id):
         resource_logs.append(ResourceLogs(resource=apm_resource, scope_logs=[ScopeLogs(log_records=ml_apm_events)]))
 
     return LogsData(resource_logs=resource_logs)
+
+
+def _event_log_record(event, event_domain):
+    # Events are recorded either as [intrinsics, user attributes, agent
+    # attributes] or as [intrinsics, user attributes] for custom events.
+    # They are flattened into the attributes of a single log record with
+    # the intrinsics taking precedence over any conflicting attributes.
+    intrinsics = event[0]
+    attributes = {}
+    for attrs in reversed(event[1:]):
+        if attrs:
+            attributes.update(attrs)
+    attributes.update(intrinsics)
+    attributes["event.domain"] = event_domain
+    attributes["event.name"] = intrinsics.get("type")
+
+    timestamp = attributes.pop("timestamp", None) or 0
+    return LogRecord(
+        time_unix_nano=int(timestamp * 1e6),
+        attributes=create_key_values_from_iterable((k, v) for k, v in attributes.items() if v is not None),
+    )
+
+
+def _encode_event_data(event_data, event_domain, agent_run_id=None):
+    log_records = [_event_log_record(event, event_domain) for event in event_data]
+
+    resource_attributes = {"instrumentation.provider": "newrelic-opentelemetry-python"}
+    if agent_run_id is not None:
+        resource_attributes["real_agent_id"] = agent_run_id
+
+    resource = create_resource(resource_attributes)
+    return LogsData(resource_logs=[ResourceLogs(resource=resource, scope_logs=[ScopeLogs(log_records=log_records)])])
+
+
+def encode_transaction_event_data(transaction_event_data, agent_run_id=None):
+    return _encode_event_data(transaction_event_data, "newrelic.transaction_events", agent_run_id)
+
+
+def _otlp_id(value, length):
+    # Trace and span ids are bytes fields in protobuf, and hex strings in
+    # the JSON encoding of OTLP. Ids shorter than the OTLP id length, such
+    # as 16 character trace ids, are left padded with zeros.
+    if not value or not isinstance(value, str):
+        return None
+    value = value.lower().rjust(length * 2, "0")
+    id_bytes = _hex_to_bytes(value)
+    if not id_bytes or len(id_bytes) != length:
+        return None
+    if otlp_content_setting == "protobuf":
+        return id_bytes
+    return value
+
+
+def _span(event):
+    intrinsics = event[0]
+    attributes = {}
+    for attrs in reversed(event[1:]):
+        if attrs:
+            attributes.update(attrs)
+    attributes.update(intrinsics)
+
+    # The fields which have a native OTLP representation are removed from
+    # the attributes. Everything else, including the category and the
+    # entry point flag, is kept as an attribute of the span.
+    for key in ("type", "name", "guid", "traceId", "parentId", "timestamp", "duration"):
+        attributes.pop(key, None)
+
+    start_time_unix_nano = int((intrinsics.get("timestamp") or 0) * 1e6)
+    end_time_unix_nano = start_time_unix_nano + int((intrinsics.get("duration") or 0) * 1e9)
+
+    span = {
+        "name": intrinsics.get("name") or "",
+        "kind": SPAN_KINDS.get(intrinsics.get("span.kind"), SPAN_KIND_INTERNAL),
+        "start_time_unix_nano": start_time_unix_nano,
+        "end_time_unix_nano": end_time_unix_nano,
+        "attributes": create_key_values_from_iterable((k, v) for k, v in attributes.items() if v is not None),
+    }
+
+    trace_id = _otlp_id(intrinsics.get("traceId"), 16)
+    if trace_id:
+        span["trace_id"] = trace_id
+    span_id = _otlp_id(intrinsics.get("guid"), 8)
+    if span_id:
+        span["span_id"] = span_id
+    parent_span_id = _otlp_id(intrinsics.get("parentId"), 8)
+    if parent_span_id:
+        span["parent_span_id"] = parent_span_id
+
+    if attributes.get("error.class"):
+        span["status"] = Status(code=STATUS_CODE_ERROR, message=str(attributes.get("error.message") or ""))
+
+    return Span(**span)
+
+
+def encode_span_event_data(span_event_data, agent_run_id=None):
+    """Encodes span events as OTLP spans, to be sent to the traces endpoint."""
+    spans = [_span(event) for event in span_event_data]
+
+    resource_attributes = {"instrumentation.provider": "newrelic-opentelemetry-python"}
+    if agent_run_id is not None:
+        resource_attributes["real_agent_id"] = agent_run_id
+
+    resource = create_resource(resource_attributes)
+    return TracesData(resource_spans=[ResourceSpans(resource=resource, scope_spans=[ScopeSpans(spans=spans)])])
+
+
+def encode_error_event_data(error_event_data, agent_run_id=None):
+    return _encode_event_data(error_event_data, "newrelic.error_events", agent_run_id)
+
+
+def encode_custom_event_data(custom_event_data, agent_run_id=None):
+    return _encode_event_data(custom_event_data, "newrelic.custom_events", agent_run_id)
+
+
+def _log_timestamp_to_unix_nano(timestamp):
+    # Log events may carry a timestamp in either seconds (when defaulted
+    # by record_log_event) or milliseconds (when supplied by the logging
+    # framework hooks). Anything too large to be seconds is taken to be
+    # milliseconds.
+    if timestamp < 1e11:
+        return int(timestamp * 1e9)
+    return int(timestamp * 1e6)
+
+
+def _hex_to_bytes(value):
+    try:
+        return bytes.fromhex(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_log_event_data(log_event_data, common_attributes=None, agent_run_id=None):
+    log_records = []
+    for log in log_event_data:
+        attributes = dict(log.attributes)
+        level = log.level or "UNKNOWN"
+
+        record = {
+            "time_unix_nano": _log_timestamp_to_unix_nano(log.timestamp),
+            "severity_text": level,
+            "severity_number": SEVERITY_NUMBERS.get(level.upper(), 0),
+            "attributes": create_key_values_from_iterable((k, v) for k, v in attributes.items() if v is not None),
+        }
+        if log.message is not None:
+            record["body"] = AnyValue(string_value=log.message)
+
+        # Logs-in-context linking metadata maps on to the native OTLP
+        # fields when the ids are valid hex. These are bytes fields so are
+        # only populated when encoding as protobuf.
+        if otlp_content_setting == "protobuf":
+            trace_id = _hex_to_bytes(attributes.get("trace.id"))
+            if trace_id:
+                record["trace_id"] = trace_id
+            span_id = _hex_to_bytes(attributes.get("span.id"))
+            if span_id:
+                record["span_id"] = span_id
+
+        log_records.append(LogRecord(**record))
+
+    resource_attributes = {"instrumentation.provider": "newrelic-opentelemetry-python"}
+    if common_attributes:
+        resource_attributes.update(common_attributes)
+    if agent_run_id is not None:
+        resource_attributes["real_agent_id"] = agent_run_id
+
+    resource = create_resource(resource_attributes)
+    return LogsData(resource_logs=[ResourceLogs(resource=resource, scope_logs=[ScopeLogs(log_records=log_records)])])
@@ -24,6 +24,7 @@ from sys import intern
 import newrelic
 from newrelic.common.encoding_utils import json_encode
 from newrelic.core.config import global_settings
+from newrelic.core.stats_engine import CustomMetrics
 from newrelic.core.trace_cache import trace_cache
 
 
@@ -31,14 +32,62 @@ _logger = logging.getLogger(__name__)
 
 AGENT_PACKAGE_DIRECTORY = os.path.dirname(newrelic.__file__) + os.sep
 
+# The maximum number of code objects for which the formatted method tuples
+# are cached during a profile session. The cache is cleared when the limit
+# is reached, so that code objects created dynamically cannot grow it
+# without bound.
+
+CODE_CACHE_LIMIT = 10000
+
 
 class SessionState():
     RUNNING = 1
     FINISHED = 2
 
 
-def format_stack_trace(frame, thread_category):
-    """Formats the frame obj into a list of stack trace tuples."""
+class _CodeMethods():
+    """The formatted method tuples for a single code object. These are
+    created once per code object and line number, rather than each time a
+    frame for the code object is seen in a sample.
+
+    """
+
+    __slots__ = ("filename", "func_name", "first_line", "agent_code", "lines")
+
+    def __init__(self, code):
+        self.filename = intern(code.co_filename)
+        self.func_name = intern(code.co_name)
+        self.first_line = code.co_firstlineno
+        self.agent_code = self.filename.startswith(AGENT_PACKAGE_DIRECTORY)
+        self.lines = {}
+
+    def methods(self, real_line):
+        """Returns the tuples for the node of the function being called
+        and for the fake leaf node, when executing the given line.
+
+        """
+
+        try:
+            return self.lines[real_line]
+        except KeyError:
+            methods = self.lines[real_line] = (
+                (self.filename, self.func_name, self.first_line, real_line),
+                (self.filename, self.func_name, real_line, real_line),
+            )
+            return methods
+
+
+def format_stack_trace(frame, thread_category, code_cache=None):
+    """Formats the frame obj into a list of stack trace tuples. The
+    formatting for each code object is kept in code_cache when supplied,
+    so that it can be reused across samples.
+
+    """
+
+    if code_cache is None:
+        code_cache = {}
+
+    include_agent_code = thread_category == "AGENT"
 
     stack_trace = deque()
 
@@ -49,13 +98,13 @@ def format_stack_trace(frame, thread_category):
         # at the time the stack frame was being viewed.
 
         code = frame.f_code
-
-        filename = intern(code.co_filename)
-        func_name = intern(code.co_name)
-        first_line = code.co_firstlineno
-
         real_line = frame.f_lineno
 
+        try:
+            code_methods = code_cache[code]
+        except KeyError:
+            code_methods = code_cache[code] = _CodeMethods(code)
+
         # Set ourselves up to process next frame back up the stack.
 
         frame = frame.f_back
@@ -66,9 +115,11 @@ def format_stack_trace(frame, thread_category):
         # though as we still need to seem them in that case so can
         # debug what the agent itself is doing.
 
-        if thread_category != "AGENT" and filename.startswith(AGENT_PACKAGE_DIRECTORY):
+        if code_methods.agent_code and not include_agent_code:
             continue
 
+        method, leaf = code_methods.methods(real_line)
+
         if not stack_trace:
             # Add the fake leaf node with line number of where the
             # code was executing at the point of the sample. This
@@ -78,20 +129,30 @@ def format_stack_trace(frame, thread_category):
             # latter can occur because we will not see stack frames
             # when calling into C functions.
 
-            stack_trace.appendleft((filename, func_name, real_line, real_line))
+            stack_trace.appendleft(leaf)
 
         # Add the actual node for the function being called at this
         # level in the stack frames.
 
-        stack_trace.appendleft((filename, func_name, first_line, real_line))
+        stack_trace.appendleft(method)
 
     return stack_trace
 
 
-def collect_stack_traces(include_nr_threads=False):
+def collect_stack_traces(include_nr_threads=False, code_cache=None):
     """Generator that yields the (thread category, stack trace) of all the
     python threads.
 
+    """
+    for _, thread_category, stack_trace in collect_transaction_stack_traces(include_nr_threads, code_cache):
+        yield thread_category, stack_trace
+
+
+def collect_transaction_stack_traces(include_nr_threads=False, code_cache=None):
+    """Generator that yields the (transaction, thread category, stack trace)
+    of all the python threads. The transaction is None for a thread which
+    is not running a transaction.
+
     """
     for (txn, thread_id, thread_category, frame) in trace_cache().active_threads():
 
@@ -100,7 +161,7 @@ def collect_stack_traces(include_nr_threads=False):
         if (thread_category == "AGENT") and (not include_nr_threads):
             continue
 
-        stack_trace = format_stack_trace(frame, thread_category)
+        stack_trace = format_stack_trace(frame, thread_category, code_cache)
 
         # Skip over empty stack traces. This is merely for optimization.
         #
@@ -110,7 +171,7 @@ def collect_stack_traces(include_nr_threads=False):
         if not stack_trace:
             continue
 
-        yield thread_category, stack_trace
+        yield txn, thread_category, stack_trace
 
 
 class ProfileSessionManager():
@@ -145,6 +206,8 @@ class ProfileSessionManager():
         self._lock = threading.Lock()
         self.profile_agent_code = False
         self.sample_period_s = 0.1
+        self.current_sample_period_s = 0.1
+        self._code_cache = {}
 
     def start_profile_session(self, app_name, profile_id, stop_time, sample_period_s=0.1, profile_agent_code=False):
         """Start a new profiler session. If a full_profiler is already
@@ -170,6 +233,7 @@ class ProfileSessionManager():
 
             self.profile_agent_code = profile_agent_code
             self.sample_period_s = sample_period_s
+            self.current_sample_period_s = sample_period_s
             self.full_profile_session = ProfileSession(profile_id, stop_time)
             self.full_profile_app = app_name
 
@@ -201,6 +265,7 @@ class ProfileSessionManager():
                 self.full_profile_session.state = SessionState.FINISHED
                 self.full_profile_session.actual_stop_time_s = time.time()
                 self.finished_sessions[app_name].append(self.full_profile_session)
+                self._code_cache = {}
                 self.full_profile_session = None
                 self.full_profile_app = None
 
@@ -232,6 +297,45 @@ class ProfileSessionManager():
 
             self.finished_sessions.pop(app_name)
 
+    def overhead_metrics(self, app_name):
+        """Returns the metrics recorded about the overhead of the profile
+        sessions for the given app_name since they were last returned.
+
+        """
+
+        metrics = []
+
+        with self._lock:
+            sessions = list(self.finished_sessions.get(app_name, ()))
+            if self.full_profile_session is not None and app_name == self.full_profile_app:
+                sessions.append(self.full_profile_session)
+
+            for session in sessions:
+                metrics.extend(session.overhead_metrics.metrics())
+                session.overhead_metrics = CustomMetrics()
+
+        return metrics
+
+    def adapt_sample_period(self, sample_time_s):
+        """Returns the period to wait before taking the next sample. The
+        requested sample period is backed off when taking a sample uses
+        more than the budgeted share of the sample period, and restored
+        once the cost of a sample drops again.
+
+        """
+
+        settings = global_settings().thread_profiler
+
+        # A budget of 0 disables the adaptive sample period.
+
+        if not settings.overhead_budget:
+            return self.sample_period_s
+
+        period = sample_time_s / settings.overhead_budget
+        period = min(period, max(settings.max_sample_period, self.sample_period_s))
+
+        return max(period, self.sample_period_s)
+
     def _profiler_loop(self):
         """Infinite loop that wakes up periodically to collect stack traces,
         merge it into call tree if necessary, finally update the state of all
@@ -241,7 +345,15 @@ class ProfileSessionManager():
 
         while True:
 
-            for category, stack in collect_stack_traces(self.profile_agent_code):
+            start_time = time.time()
+            thread_count = 0
+
+            if len(self._code_cache) > CODE_CACHE_LIMIT:
+                self._code_cache = {}
+
+            for category, stack in collect_stack_traces(self.profile_agent_code, self._code_cache):
+
+                thread_count += 1
 
                 # Merge the stack_trace to the call tree only for
                 # full_profile_session.
@@ -249,15 +361,41 @@ class ProfileSessionManager():
                 if self.full_profile_session:
                     self.full_profile_session.update_call_tree(category, stack)
 
+            sample_time_s = time.time() - start_time
+
+            self.current_sample_period_s = self.adapt_sample_period(sample_time_s)
+
+            self.record_overhead(sample_time_s, thread_count)
+
             self.update_profile_sessions()
 
             # Stop the profiler thread if there are no profile sessions.
 
             if self.full_profile_session is None:
                 self._profiler_thread_running = False
+                self._code_cache = {}
                 return
 
-            self._profiler_shutdown.wait(self.sample_period_s)
+            self._profiler_shutdown.wait(self.current_sample_period_s)
+
+    def record_overhead(self, sample_time_s, thread_count):
+        """Records the cost of taking a sample against the running profile
+        session.
+
+        """
+
+        with self._lock:
+            session = self.full_profile_session
+            if session is None:
+                return
+
+            metrics = session.overhead_metrics
+            metrics.record_custom_metric("Supportability/Python/Profiler/SampleTime", sample_time_s)
+            metrics.record_custom_metric("Supportability/Python/Profiler/SamplePeriod", self.current_sample_period_s)
+            metrics.record_custom_metric("Supportability/Python/Profiler/Threads", thread_count)
+
+            if self.current_sample_period_s > self.sample_period_s:
+                metrics.record_custom_metric("Supportability/Python/Profiler/BackOff", {"count": 1})
 
     def update_profile_sessions(self):
         """Check the current time and decide if any of the profile sessions
@@ -289,6 +427,7 @@ class ProfileSession():
         self.stop_time_s = stop_time
         self.actual_stop_time_s = 0
         self.state = SessionState.RUNNING
+        self.overhead_metrics = CustomMetrics()
         self.reset_profile_data()
 
     def reset_profile_data(self):
@@ -0,0 +1,163 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a store for each application of the event loop
+callbacks which ran for longer than the blocking threshold, so blocking the
+event loop from running any other callback.
+
+The callbacks are recorded by the asyncio instrumentation as they complete,
+against the application of the transaction the callback ran for, or else the
+default application. They are harvested by the event loop blocking data
+source of the application, which registers the store for the application.
+
+"""
+
+import threading
+
+from newrelic.common.object_names import callable_name
+from newrelic.core.config import global_settings
+from newrelic.core.trace_cache import trace_cache
+
+# The maximum number of slow callbacks kept with their details between
+# harvests. The time spent blocked is still counted in the metrics for any
+# further callbacks.
+
+MAX_SLOW_CALLBACKS = 100
+
+
+class SlowCallback():
+    __slots__ = ("loop", "duration", "callback", "coroutine", "transaction_name")
+
+    def __init__(self, loop, duration, callback, coroutine=None, transaction_name=None):
+        self.loop = loop
+        self.duration = duration
+        self.callback = callback
+        self.coroutine = coroutine
+        self.transaction_name = transaction_name
+
+
+def _callback_task(callback):
+    # The steps of an asyncio task, and the callback which wakes up a task
+    # when a future it is waiting on completes, are methods of the task.
+
+    task = getattr(callback, "__self__", None)
+    if task is not None and hasattr(task, "get_coro"):
+        return task
+
+
+def _coroutine_name(task):
+    coro = task.get_coro()
+    name = getattr(coro, "__qualname__", None)
+    return name or callable_name(coro)
+
+
+class SlowCallbacks():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.loops = {}
+        self.callbacks = []
+
+    def record(self, slow_callback):
+        with self._lock:
+            # The stats for the time blocked are kept in the form of
+            # [count, total, min, max, sum of squares].
+
+            stats = self.loops.get(slow_callback.loop)
+            duration = slow_callback.duration
+
+            if stats is None:
+                self.loops[slow_callback.loop] = [1, duration, duration, duration, duration**2]
+            else:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = min(stats[2], duration)
+                stats[3] = max(stats[3], duration)
+                stats[4] += duration**2
+
+            if len(self.callbacks) < MAX_SLOW_CALLBACKS:
+                self.callbacks.append(slow_callback)
+
+    def harvest(self):
+        """Returns the stats for the time each event loop was blocked and
+        the details of the slow callbacks since the last harvest.
+
+        """
+
+        with self._lock:
+            result = (self.loops, self.callbacks)
+            self.reset()
+
+        return result
+
+
+_slow_callbacks = {}
+
+
+def slow_callbacks(application):
+    return _slow_callbacks.get(application)
+
+
+def register_slow_callbacks(application):
+    store = _slow_callbacks[application] = SlowCallbacks()
+    return store
+
+
+def unregister_slow_callbacks(application, store):
+    # A store registered since for the same application is left in place.
+    if _slow_callbacks.get(application) is store:
+        del _slow_callbacks[application]
+
+
+def record_handle(handle, duration):
+    """Records a slow callback from the asyncio handle which ran it. This
+    is called from the thread running the event loop, once the callback has
+    completed.
+
+    """
+
+    callback = handle._callback
+    task = _callback_task(callback)
+
+    coroutine = None
+    transaction = None
+
+    if task is not None:
+        coroutine = _coroutine_name(task)
+
+        trace = trace_cache().get(id(task))
+        transaction = trace and trace.transaction
+
+    if transaction is not None:
+        application = transaction.application.name
+        transaction_name = transaction.path
+    else:
+        application = global_settings().app_name
+        transaction_name = None
+
+    # Callbacks for an application without a registered store, as it has
+    # no event loop blocking data source, are not recorded.
+
+    store = _slow_callbacks.get(application)
+    if store is None:
+        return
+
+    # An event loop is named after the thread running it, so that the
+    # name is the same for each loop run by the thread.
+
+    loop = threading.current_thread().name
+
+    store.record(SlowCallback(loop, duration, callable_name(callback), coroutine, transaction_name))
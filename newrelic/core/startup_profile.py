@@ -0,0 +1,143 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements the profile of the time the agent adds to the
+startup of a process, as reported by the newrelic-admin startup-profile
+command.
+
+The profile records the duration of each phase of the agent startup, the
+time taken by each instrumentation hook run when the module it targets is
+imported, and the modules which were imported while agent code was being
+run. When the process exits, the profile is written out as JSON.
+
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+REPORT_VERSION = 1
+
+_profile = None
+
+
+class StartupProfile:
+    def __init__(self, output, start=None, baseline_modules=None):
+        self.output = output
+        self.start = start if start is not None else time.perf_counter()
+        self.phases = []
+        self.hooks = []
+        self.agent_modules = set()
+        self._baseline_modules = set(sys.modules if baseline_modules is None else baseline_modules)
+        self._lock = threading.Lock()
+
+    def add_phase(self, name, start, end):
+        with self._lock:
+            self.phases.append((name, start - self.start, end - start))
+
+    def add_modules(self, before):
+        with self._lock:
+            self.agent_modules.update(set(sys.modules) - before - self._baseline_modules)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, start, time.perf_counter())
+            self.add_modules(before)
+
+    @contextlib.contextmanager
+    def hook(self, target, module, function):
+        before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.hooks.append((target, module, function, start - self.start, end - start))
+            self.add_modules(before)
+
+    def report(self):
+        from newrelic import version
+
+        with self._lock:
+            phases = list(self.phases)
+            hooks = list(self.hooks)
+            agent_modules = sorted(self.agent_modules)
+
+        return {
+            "version": REPORT_VERSION,
+            "agent_version": version,
+            "python_version": ".".join(map(str, sys.version_info[:3])),
+            "pid": os.getpid(),
+            "argv": list(sys.argv),
+            "phases": [{"name": name, "start": start, "duration": duration} for name, start, duration in phases],
+            "hooks": [
+                {"target": target, "module": module, "function": function, "start": start, "duration": duration}
+                for target, module, function, start, duration in hooks
+            ],
+            "instrumentation_time": sum(hook[4] for hook in hooks),
+            "agent_modules": [name for name in agent_modules if name.split(".")[0] == "newrelic"],
+            "imported_by_agent": [name for name in agent_modules if name.split(".")[0] != "newrelic"],
+        }
+
+    def write(self):
+        report = json.dumps(self.report(), indent=2, sort_keys=True)
+
+        if self.output == "-":
+            sys.stderr.write(report + "\n")
+            return
+
+        with open(self.output.format(pid=os.getpid()), "w") as fh:
+            fh.write(report + "\n")
+
+
+def enable(output, start=None, baseline_modules=None):
+    """Starts profiling the agent startup, writing the profile to the
+    output path when the process exits. The path may contain "{pid}" to
+    be replaced with the process ID, and "-" writes to stderr.
+
+    """
+
+    global _profile
+
+    if _profile is None:
+        _profile = StartupProfile(output, start, baseline_modules)
+        atexit.register(_profile.write)
+
+    return _profile
+
+
+def startup_profile():
+    return _profile
+
+
+def startup_phase(name):
+    if _profile is None:
+        return contextlib.nullcontext()
+    return _profile.phase(name)
+
+
+def instrumentation_hook(target, module, function):
+    if _profile is None:
+        return contextlib.nullcontext()
+    return _profile.hook(target, module, function)
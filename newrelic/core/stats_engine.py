@@ -47,7 +47,7 @@ from newrelic.core.attribute import (
 )
 from newrelic.core.attribute_filter import DST_ALL, DST_ERROR_COLLECTOR
 from newrelic.core.code_level_metrics import extract_code_from_traceback
-from newrelic.core.config import is_expected_error, should_ignore_error
+from newrelic.core.config import hot_flags, is_expected_error, should_ignore_error
 from newrelic.core.database_utils import explain_plan
 from newrelic.core.error_collector import TracedError
 from newrelic.core.log_event_node import LogEventNode
@@ -422,6 +422,18 @@ class SampledDataSet():
         # Always sample if under capacity
         return True
 
+    def skip_sample(self, priority):
+        """Returns True if a sample with the priority would not be kept
+        when added, in which case it is counted as seen. This allows the
+        caller to avoid building samples which would be discarded.
+
+        """
+
+        if self.capacity <= 0 or (self.heap and priority <= self.pq[0][0]):
+            self.num_seen += 1
+            return True
+        return False
+
     def add(self, sample, priority=None):  # pylint: disable=E0202
         self.num_seen += 1
 
@@ -501,6 +513,18 @@ class LimitedDataSet(list):
         self.num_seen += other_data_set.num_seen - other_data_set.num_samples
 
 
+AGGREGATED_STATS_TYPES = {stats_type.__name__: stats_type for stats_type in (ApdexStats, CountStats, TimeStats)}
+
+AGGREGATED_EVENT_DATA_SETS = (
+    "transaction_events",
+    "error_events",
+    "custom_events",
+    "ml_events",
+    "span_events",
+    "log_events",
+)
+
+
 class StatsEngine():
 
     """The stats engine object holds the accumulated transactions metrics,
@@ -1138,25 +1162,21 @@ class StatsEngine():
         # Capture any errors if error collection is enabled.
         # Only retain maximum number allowed per harvest.
 
-        error_collector = settings.error_collector
+        flags = hot_flags(settings)
 
-        if (
-            error_collector.enabled
-            and settings.collect_errors
-            and len(self.__transaction_errors) < settings.agent_limits.errors_per_harvest
-        ):
+        if flags.collect_errors and len(self.__transaction_errors) < settings.agent_limits.errors_per_harvest:
             self.__transaction_errors.extend(transaction.error_details())
 
             self.__transaction_errors = self.__transaction_errors[: settings.agent_limits.errors_per_harvest]
 
-        if error_collector.capture_events and error_collector.enabled and settings.collect_error_events:
+        if flags.collect_error_events:
             events = transaction.error_events(self.__stats_table)
             for event in events:
                 self._error_events.add(event, priority=transaction.priority)
 
         # Capture any sql traces if transaction tracer enabled.
 
-        if settings.slow_sql.enabled and settings.collect_traces:
+        if flags.collect_slow_sql:
             for node in transaction.slow_sql_nodes(self):
                 self.record_slow_sql_node(node)
 
@@ -1167,15 +1187,13 @@ class StatsEngine():
         # recording of transaction trace for this transaction
         # has not been suppressed.
 
-        transaction_tracer = settings.transaction_tracer
-
-        if not transaction.suppress_transaction_trace and transaction_tracer.enabled and settings.collect_traces:
+        if not transaction.suppress_transaction_trace and flags.collect_transaction_traces:
             # Transactions saved for Synthetics transactions
             # do not depend on the transaction threshold.
 
             self._update_synthetics_transaction(transaction)
 
-            threshold = transaction_tracer.transaction_threshold
+            threshold = settings.transaction_tracer.transaction_threshold
 
             if threshold is None:
                 threshold = transaction.apdex_t * 4
@@ -1191,50 +1209,51 @@ class StatsEngine():
             event = transaction.transaction_event(self.__stats_table)
             self._synthetics_events.add(event)
 
-        elif settings.collect_analytics_events and settings.transaction_events.enabled:
+        elif flags.collect_transaction_events:
             event = transaction.transaction_event(self.__stats_table)
             self._transaction_events.add(event, priority=transaction.priority)
 
         # Merge in custom events
 
-        if settings.collect_custom_events and settings.custom_insights_events.enabled:
+        if flags.collect_custom_events:
             self.custom_events.merge(transaction.custom_events)
 
         # Merge in machine learning events
 
-        if settings.ml_insights_events.enabled:
+        if flags.collect_ml_events:
             self.ml_events.merge(transaction.ml_events)
 
         # Merge in span events
 
-        if settings.distributed_tracing.enabled and settings.span_events.enabled and settings.collect_span_events:
-            if settings.infinite_tracing.enabled:
-                for event in transaction.span_protos(settings):
-                    self._span_stream.put(event)
+        if flags.collect_span_events:
+            if flags.infinite_tracing:
+                # Skip building the span protos entirely if the stream
+                # buffer is applying back-pressure as most would be
+                # dropped before being sent anyway.
+                if self._span_stream.should_sample():
+                    for event in transaction.span_protos(settings):
+                        self._span_stream.put(event)
             elif transaction.sampled:
                 for event in transaction.span_events(self.__settings):
                     self._span_events.add(event, priority=transaction.priority)
 
         # Merge in log events
 
-        if (
-            settings
-            and settings.application_logging
-            and settings.application_logging.enabled
-            and settings.application_logging.forwarding
-            and settings.application_logging.forwarding.enabled
-        ):
+        if flags.log_forwarding:
             self._log_events.merge(transaction.log_events, priority=transaction.priority)
 
     def record_log_event(self, message, level=None, timestamp=None, attributes=None, priority=None):
         settings = self.__settings
-        if not (
-            settings
-            and settings.application_logging
-            and settings.application_logging.enabled
-            and settings.application_logging.forwarding
-            and settings.application_logging.forwarding.enabled
-        ):
+        flags = settings and hot_flags(settings)
+        if not (flags and flags.log_forwarding):
+            return
+
+        if priority is None:
+            # Base priority for log events outside transactions is below those inside transactions
+            priority = random.random() - 1  # nosec
+
+        # Skip processing log events which would be discarded by the reservoir.
+        if self._log_events.skip_sample(priority):
             return
 
         timestamp = timestamp if timestamp is not None else time.time()
@@ -1265,7 +1284,7 @@ class StatsEngine():
 
         # Collect attributes from linking metadata, context data, and message attributes
         collected_attributes = {}
-        if settings and settings.application_logging.forwarding.context_data.enabled:
+        if flags.log_context_data:
             if context_attributes:
                 context_attributes = resolve_logging_context_attributes(
                     context_attributes, settings.attribute_filter, "context."
@@ -1297,10 +1316,6 @@ class StatsEngine():
             attributes=collected_attributes,
         )
 
-        if priority is None:
-            # Base priority for log events outside transactions is below those inside transactions
-            priority = random.random() - 1  # nosec
-
         self._log_events.add(event, priority=priority)
 
         return event
@@ -1715,8 +1730,15 @@ class StatsEngine():
         self.reset_synthetics_events()
         # streams are never reset after instantiation
         if reset_stream:
+            infinite_tracing = settings.infinite_tracing
             self._span_stream = StreamBuffer(
-                settings.infinite_tracing.span_queue_size, batching=settings.infinite_tracing.batching
+                infinite_tracing.span_queue_size,
+                batching=infinite_tracing.batching,
+                backpressure_threshold=(
+                    infinite_tracing.backpressure.drop_threshold if infinite_tracing.backpressure.enabled else None
+                ),
+                backpressure_window=infinite_tracing.backpressure.window,
+                minimum_sampling_rate=infinite_tracing.backpressure.minimum_sampling_rate,
             )
 
     def reset_metric_stats(self):
@@ -1726,7 +1748,12 @@ class StatsEngine():
         """
 
         self.__stats_table = {}
-        self.__dimensional_stats_table.reset_metric_stats()
+
+        # A new table is created rather than the existing one being reset,
+        # as a work area created by copying the stats engine would
+        # otherwise share the table with it.
+
+        self.__dimensional_stats_table = DimensionalMetrics()
 
     def reset_transaction_events(self):
         """Resets the accumulated statistics back to initial state for
@@ -1887,6 +1914,7 @@ class StatsEngine():
             return
 
         self.merge_metric_stats(snapshot)
+        self.merge_dimensional_metrics(snapshot.__dimensional_stats_table.metrics())
         self._merge_transaction_events(snapshot)
         self._merge_synthetics_events(snapshot)
         self._merge_error_events(snapshot)
@@ -1922,6 +1950,118 @@ class StatsEngine():
         self._merge_span_events(snapshot, rollback=True)
         self._merge_log_events(snapshot, rollback=True)
 
+    def merge_buffered(self, snapshot):
+        """Merges all of the data recorded into a separate stats engine
+        while the application was not yet reporting, such as before the
+        session was registered. The event data sets are sampled down as for
+        a rollback. The error traces, slow SQL and transaction traces are
+        only kept where the current settings collect them.
+
+        """
+
+        if not self.__settings:
+            return
+
+        self.rollback(snapshot)
+        self.merge_dimensional_metrics(snapshot.__dimensional_stats_table.metrics())
+
+        flags = hot_flags(self.__settings)
+
+        if flags.collect_errors:
+            self._merge_error_traces(snapshot)
+        if flags.collect_slow_sql:
+            self._merge_sql(snapshot)
+        if flags.collect_transaction_traces:
+            self._merge_traces(snapshot)
+
+    def aggregation_snapshot(self):
+        """Returns the metric data, the event data sets and the error traces
+        as a JSON serializable dict. This is used to send a harvest snapshot
+        to the process aggregating data for a group of worker processes,
+        which merges it into its own stats engine using
+        merge_aggregation_snapshot(). Slow SQL and transaction traces are
+        not included, as these are reported by the worker process itself.
+
+        """
+
+        metrics = [
+            [name, scope, type(stats).__name__, list(stats)] for (name, scope), stats in self.__stats_table.items()
+        ]
+
+        # The tags of dimensional metrics are a frozenset of key and value
+        # pairs, or None, so are sent as a list of pairs.
+
+        dimensional_metrics = [
+            [name, tags and [list(tag) for tag in tags], type(stats).__name__, list(stats)]
+            for name, stats_container in self.__dimensional_stats_table.metrics()
+            for tags, stats in stats_container.items()
+        ]
+
+        events = {}
+        for attr in AGGREGATED_EVENT_DATA_SETS:
+            data_set = getattr(self, attr)
+            if data_set.num_seen:
+                events[attr] = [data_set.capacity, data_set.num_seen, data_set.pq]
+
+        return {
+            "metrics": metrics,
+            "dimensional_metrics": dimensional_metrics,
+            "events": events,
+            "synthetics_events": [self._synthetics_events.num_seen, list(self._synthetics_events)],
+            "errors": [list(error) for error in self.__transaction_errors],
+        }
+
+    def merge_aggregation_snapshot(self, snapshot):
+        """Merges the data returned by aggregation_snapshot() in another
+        process. Event data is merged in the same way as for a rollback.
+
+        """
+
+        if not self.__settings:
+            return
+
+        for name, scope, stats_type, values in snapshot["metrics"]:
+            other = AGGREGATED_STATS_TYPES.get(stats_type, TimeStats)()
+            other[:] = values
+
+            stats = self.__stats_table.get((name, scope))
+            if not stats:
+                self.__stats_table[(name, scope)] = other
+            else:
+                stats.merge_stats(other)
+
+        for name, tags, stats_type, values in snapshot.get("dimensional_metrics", ()):
+            other = AGGREGATED_STATS_TYPES.get(stats_type, TimeStats)()
+            other[:] = values
+
+            if tags is not None:
+                tags = frozenset(tuple(tag) for tag in tags)
+
+            self.merge_dimensional_metrics([(name, {tags: other})])
+
+        for attr, (capacity, num_seen, pq) in snapshot["events"].items():
+            if attr not in AGGREGATED_EVENT_DATA_SETS:
+                continue
+
+            if attr == "log_events":
+                pq = [(priority, seen_at, LogEventNode(*sample)) for priority, seen_at, sample in pq]
+
+            other = SampledDataSet(capacity)
+            other.pq = [tuple(entry) for entry in pq]
+            other.num_seen = num_seen
+            getattr(self, attr).merge(other)
+
+        num_seen, samples = snapshot["synthetics_events"]
+        if num_seen:
+            other = LimitedDataSet(len(samples))
+            other.extend(samples)
+            other.num_seen = num_seen
+            self._synthetics_events.merge(other)
+
+        maximum = self.__settings.agent_limits.errors_per_harvest
+        self.__transaction_errors.extend(TracedError(*error) for error in snapshot["errors"])
+        self.__transaction_errors = self.__transaction_errors[:maximum]
+
     def merge_metric_stats(self, snapshot):
         """Merges metric data from a snapshot. This is used both when merging
         data from a single transaction into the main stats engine, and for
@@ -0,0 +1,185 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements per thread accumulators for the custom metrics
+and events recorded against an application outside of a transaction.
+
+Each thread records into its own accumulator without taking a lock. At
+harvest time the accumulator of each thread is swapped for an empty one and
+the data is merged into the stats engines of the application.
+
+The event reservoirs of the threads share the harvest limits between them,
+so beyond a small reservoir for each thread, the events held are bounded by
+the harvest limits however many threads record them.
+
+"""
+
+import threading
+import time
+
+from newrelic.core.stats_engine import CustomMetrics, DimensionalMetrics, SampledDataSet
+from newrelic.core.thread_counters import ThreadEntry, ThreadLocalEntries
+
+# The smallest event reservoir given to a thread, no matter how many
+# threads the harvest limits are shared between.
+
+MIN_THREAD_RESERVOIR_SIZE = 10
+
+
+class ThreadAccumulator:
+    """The custom metrics and events recorded by a single thread since the
+    last harvest.
+
+    """
+
+    __slots__ = ("custom_metrics", "dimensional_metrics", "custom_events", "ml_events", "events_account")
+
+    def __init__(self, custom_event_capacity, ml_event_capacity):
+        self.custom_metrics = CustomMetrics()
+        self.dimensional_metrics = DimensionalMetrics()
+        self.custom_events = SampledDataSet(custom_event_capacity)
+        self.ml_events = SampledDataSet(ml_event_capacity)
+        self.events_account = 0
+
+    def record_custom_metric(self, name, value):
+        self.events_account += 1
+        self.custom_metrics.record_custom_metric(name, value)
+
+    def record_custom_metrics(self, metrics):
+        for name, value in metrics:
+            self.events_account += 1
+            self.custom_metrics.record_custom_metric(name, value)
+
+    def record_dimensional_metric(self, name, value, tags=None):
+        self.events_account += 1
+        self.dimensional_metrics.record_dimensional_metric(name, value, tags)
+
+    def record_dimensional_metrics(self, metrics):
+        for metric in metrics:
+            name, value = metric[:2]
+            tags = metric[2] if len(metric) >= 3 else None
+
+            self.events_account += 1
+            self.dimensional_metrics.record_dimensional_metric(name, value, tags)
+
+    def record_custom_event(self, event):
+        self.events_account += 1
+        self.custom_events.add(event)
+
+    def count_event(self):
+        # An event which is not collected is still counted against the
+        # events account, as for events recorded into the stats engine.
+        self.events_account += 1
+
+    def record_ml_event(self, event):
+        self.events_account += 1
+        self.ml_events.add(event)
+
+
+def _reservoir_size(limit, threads):
+    return min(limit, max(limit // threads, MIN_THREAD_RESERVOIR_SIZE))
+
+
+class _AccumulatorEntry(ThreadEntry):
+    __slots__ = ("accumulator", "started", "finished")
+
+    def __init__(self, accumulator):
+        super().__init__()
+        self.accumulator = accumulator
+        self.started = 0
+        self.finished = 0
+
+
+class ThreadAccumulators(ThreadLocalEntries):
+    def __init__(self, settings):
+        super().__init__()
+
+        harvest_limits = settings.event_harvest_config.harvest_limits
+        self._custom_event_limit = harvest_limits.custom_event_data
+        self._ml_event_limit = harvest_limits.ml_event_data
+
+    def _accumulator(self, threads):
+        return ThreadAccumulator(
+            _reservoir_size(self._custom_event_limit, threads), _reservoir_size(self._ml_event_limit, threads)
+        )
+
+    def _create_entry(self):
+        threads = sum(not entry.released for entry in self._entries) + 1
+        return _AccumulatorEntry(self._accumulator(threads))
+
+    def record(self, method, *args):
+        """Calls the method of the accumulator for the current thread with
+        the supplied arguments.
+
+        """
+
+        try:
+            entry = self._local.entry
+        except AttributeError:
+            entry = self._thread_entry()
+
+        # The counts of the calls started and finished let a harvest wait
+        # for a call which is still recording into the accumulator it has
+        # just swapped out.
+
+        entry.started += 1
+        try:
+            method(entry.accumulator, *args)
+        finally:
+            entry.finished += 1
+
+    def harvest(self):
+        """Returns the accumulators of all threads, replacing each with an
+        empty accumulator.
+
+        """
+
+        swapped = []
+
+        def _harvest(entries):
+            # The event reservoirs for the next harvest are shared between
+            # the threads whose entries have not been released.
+
+            threads = max(sum(not released for entry, released in entries), 1)
+
+            for entry, released in entries:
+                accumulator = entry.accumulator
+                entry.accumulator = self._accumulator(threads)
+
+                # The count of calls started is read after the swap, so any
+                # later call records into the new accumulator.
+
+                swapped.append((entry, accumulator, entry.started, released))
+
+        self._harvest_entries(_harvest)
+
+        current_ident = threading.get_ident()
+        accumulators = []
+
+        for entry, accumulator, started, released in swapped:
+            # Wait for any call which may have read the accumulator before
+            # it was swapped out. This is done without holding the lock, so
+            # that threads recording for the first time are not held up. A
+            # harvest run by a thread while it is recording data, such as
+            # from a signal handler, cannot wait on itself. A released entry
+            # cannot record any more data.
+
+            if not released and entry.ident != current_ident:
+                while entry.finished < started:
+                    time.sleep(0)
+
+            if accumulator.events_account:
+                accumulators.append(accumulator)
+
+        return accumulators
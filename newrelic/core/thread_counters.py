@@ -0,0 +1,151 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements data which is recorded by each thread without
+taking a lock. Each thread records into its own entry, which is only ever
+written by that thread, and the entries of all threads are visited when the
+data is harvested.
+
+An entry is released once the thread local storage of its thread has been
+cleared, which covers threads not started through the threading module and
+greenlets when threading has been monkey patched by gevent, as well as
+threads which have exited.
+
+"""
+
+import threading
+import weakref
+
+
+class ThreadEntry:
+    """The data recorded by a single thread. Subclasses add the data."""
+
+    __slots__ = ("ident", "released")
+
+    def __init__(self):
+        self.ident = threading.get_ident()
+        self.released = False
+
+
+class _ThreadToken:
+    # Held only by the thread local storage, so that it is collected when
+    # the storage for the thread is cleared.
+
+    __slots__ = ("__weakref__",)
+
+
+def _release_entry(entry):
+    entry.released = True
+
+
+class ThreadLocalEntries:
+    """Holds an entry for each thread which has recorded data. Subclasses
+    create the entry for a thread and define how the entries are harvested.
+
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._entries = []
+
+    def _create_entry(self):
+        raise NotImplementedError
+
+    def _thread_entry(self):
+        # Registering the entry for a thread is the only time a lock is
+        # taken when recording data.
+
+        with self._lock:
+            entry = self._create_entry()
+            self._entries.append(entry)
+
+        token = self._local.token = _ThreadToken()
+        weakref.finalize(token, _release_entry, entry)
+
+        self._local.entry = entry
+
+        return entry
+
+    def _harvest_entries(self, harvest):
+        """Calls harvest with the entries of all threads, each paired with
+        whether the entry has been released, while holding the lock. The
+        entries which were released are then dropped.
+
+        """
+
+        with self._lock:
+            # Check whether each entry has been released before it is
+            # harvested, so that the entry of a thread which has gone away
+            # is only dropped once its final data has been harvested.
+
+            entries = [(entry, entry.released) for entry in self._entries]
+
+            harvest(entries)
+
+            self._entries = [entry for entry, released in entries if not released]
+
+
+class _CounterEntry(ThreadEntry):
+    __slots__ = ("counts", "harvested")
+
+    def __init__(self):
+        super().__init__()
+        self.counts = {}
+        self.harvested = {}
+
+
+class ThreadLocalCounters(ThreadLocalEntries):
+    """Counters which are summed up across all threads when they are
+    harvested.
+
+    """
+
+    def _create_entry(self):
+        return _CounterEntry()
+
+    def increment(self, key, value=1):
+        try:
+            counts = self._local.entry.counts
+        except AttributeError:
+            counts = self._thread_entry().counts
+
+        counts[key] = counts.get(key, 0) + value
+
+    def harvest(self):
+        """Returns the amount each counter was incremented by since the
+        previous harvest, summed across all threads.
+
+        """
+
+        # The counts for a thread are never reset, as the thread may be
+        # incrementing a counter while they are being harvested. Instead
+        # the totals seen at the prior harvest are kept and subtracted.
+
+        result = {}
+
+        def _harvest(entries):
+            for entry, released in entries:
+                current = entry.counts.copy()
+
+                for key, value in current.items():
+                    delta = value - entry.harvested.get(key, 0)
+                    if delta:
+                        result[key] = result.get(key, 0) + delta
+
+                entry.harvested = current
+
+        self._harvest_entries(_harvest)
+
+        return result
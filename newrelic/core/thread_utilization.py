@@ -21,6 +21,22 @@ try:
 except ImportError:
     ThreadUtilization = None
 
+try:
+    from newrelic.core._thread_utilization import thread_cpu_time
+except ImportError:
+    # Without the extension the same clock is read through the time
+    # module, where the platform provides one.
+    thread_cpu_time = getattr(time, 'thread_time', None)
+
+# Check that the clock can actually be read on this platform, so it
+# needn't be checked each time it is read.
+
+try:
+    if thread_cpu_time:
+        thread_cpu_time()
+except (NotImplementedError, OSError):
+    thread_cpu_time = None
+
 _utilization_trackers = {}
 
 def utilization_tracker(application):
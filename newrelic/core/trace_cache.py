@@ -392,6 +392,22 @@ class TraceCache(MutableMapping):
             root.increment_child_count()
             root.add_child(node)
 
+    def record_gc_pause(self, duration):
+        """Adds the time the garbage collector paused the current thread to
+        the transaction running in it. This is called from within the
+        garbage collector callback, so only the total is updated.
+
+        """
+
+        transaction = self.current_transaction()
+        if not transaction or not transaction.settings:
+            return
+
+        if not transaction.settings.gc_runtime_metrics.transaction_attribution:
+            return
+
+        transaction._gc_pause_time += duration
+
     # MutableMapping methods
 
     def items(self):
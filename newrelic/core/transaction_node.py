@@ -103,6 +103,7 @@ _TransactionNode = namedtuple(
         "root_span_guid",
         "trace_id",
         "loop_time",
+        "gc_pause_time",
     ],
 )
 
@@ -210,6 +211,30 @@ class TransactionNode(_TransactionNode):
 
         yield TimeMetric(name=metric_prefix, scope="", duration=self.total_time, exclusive=self.total_time)
 
+        # Generate the metrics for the time spent paused by the garbage
+        # collector within the transaction.
+
+        if self.gc_pause_time:
+            if self.type == "WebTransaction":
+                gc_metric_prefix = "WebTransactionGCPauseTime"
+            else:
+                gc_metric_prefix = "OtherTransactionGCPauseTime"
+
+            yield TimeMetric(
+                name=f"{gc_metric_prefix}/{self.name_for_metric}",
+                scope="",
+                duration=self.gc_pause_time,
+                exclusive=self.gc_pause_time,
+            )
+
+            yield TimeMetric(name=gc_metric_prefix, scope="", duration=self.gc_pause_time, exclusive=self.gc_pause_time)
+
+        # Generate the rollup metric for the CPU time used by the thread
+        # running the transaction.
+
+        if self.cpu_time:
+            yield TimeMetric(name="CPU/User/Transaction", scope="", duration=self.cpu_time, exclusive=self.cpu_time)
+
         # Generate Distributed Tracing metrics
 
         if self.settings.distributed_tracing.enabled:
@@ -626,6 +651,10 @@ class TransactionNode(_TransactionNode):
 
         if self.loop_time:
             intrinsics["eventLoopTime"] = self.loop_time
+        if self.gc_pause_time:
+            intrinsics["gcPauseTime"] = self.gc_pause_time
+        if self.cpu_time:
+            intrinsics["cpuTime"] = self.cpu_time
         _add_call_time("EventLoop/Wait/all", "eventLoopWait")
 
         self._event_intrinsics_cache = intrinsics.copy()
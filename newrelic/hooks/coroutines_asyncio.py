@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
 from newrelic.common.object_wrapper import (
         wrap_out_function, wrap_function_wrapper)
+from newrelic.core.config import global_settings
+from newrelic.core.slow_callbacks import record_handle
 from newrelic.core.trace_cache import trace_cache
 
 
@@ -51,8 +55,33 @@ def instrument_asyncio_base_events(module):
         propagate_task_context)
 
 
+def _wrap_handle_run(settings):
+    def wrap_handle_run(wrapped, instance, args, kwargs):
+        start_time = time.time()
+        try:
+            return wrapped(*args, **kwargs)
+        finally:
+            duration = time.time() - start_time
+            if duration >= settings.blocking_threshold:
+                record_handle(instance, duration)
+
+    return wrap_handle_run
+
+
 def instrument_asyncio_events(module):
     wrap_function_wrapper(
         module,
         'BaseDefaultEventLoopPolicy.set_event_loop',
         wrap_create_task)
+
+    # Timing every callback run by the event loop is only done when it has
+    # been enabled, as the callbacks are run so often. The settings are
+    # looked up once, rather than for each callback.
+
+    settings = global_settings().event_loop_visibility
+
+    if settings.callback_timing:
+        wrap_function_wrapper(
+            module,
+            'Handle._run',
+            _wrap_handle_run(settings))
@@ -12,17 +12,65 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections.abc import Mapping
 from urllib.parse import quote
 
 from newrelic.api.application import application_instance
 from newrelic.api.time_trace import get_linking_metadata
 from newrelic.api.transaction import current_transaction, record_log_event
 from newrelic.common.object_wrapper import function_wrapper, wrap_function_wrapper
-from newrelic.core.config import global_settings
+from newrelic.core.config import global_settings, hot_flags
 
 
 IGNORED_LOG_RECORD_KEYS = set(["message", "msg"])
 
+# Whether a logger belongs to the agent and the metric names for each log
+# level are only worked out once. The loggers themselves are kept by the
+# logging module for the life of the process, so these do not grow without
+# bound.
+_agent_loggers = {}
+_level_metric_names = {}
+
+
+def _is_agent_logger(logger_name):
+    try:
+        return _agent_loggers[logger_name]
+    except KeyError:
+        result = _agent_loggers[logger_name] = bool(logger_name) and logger_name.split(".")[0] == "newrelic"
+        return result
+
+
+def _level_metric_name(level_name):
+    try:
+        return _level_metric_names[level_name]
+    except KeyError:
+        result = _level_metric_names[level_name] = f"Logging/lines/{level_name}"
+        return result
+
+
+class LogRecordAttributes(Mapping):
+    """The context attributes of a log record. These are read from the
+    record only if they are used, which they are not when context data is
+    disabled or the log event is not sampled.
+
+    """
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record):
+        self._record = record
+
+    def __getitem__(self, key):
+        if key in IGNORED_LOG_RECORD_KEYS:
+            raise KeyError(key)
+        return vars(self._record)[key]
+
+    def __iter__(self):
+        return (key for key in vars(self._record) if key not in IGNORED_LOG_RECORD_KEYS)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
 
 def add_nr_linking_metadata(message):
     available_metadata = get_linking_metadata()
@@ -50,8 +98,7 @@ def wrap_callHandlers(wrapped, instance, args, kwargs):
     transaction = current_transaction()
     record = bind_callHandlers(*args, **kwargs)
 
-    logger_name = getattr(instance, "name", None)
-    if logger_name and logger_name.split(".")[0] == "newrelic":
+    if _is_agent_logger(getattr(instance, "name", None)):
         return wrapped(*args, **kwargs)
 
     if transaction:
@@ -59,29 +106,32 @@ def wrap_callHandlers(wrapped, instance, args, kwargs):
     else:
         settings = global_settings()
 
+    flags = settings and hot_flags(settings)
+
     # Return early if application logging not enabled
-    if settings and settings.application_logging and settings.application_logging.enabled:
+    if flags and flags.application_logging:
         level_name = str(getattr(record, "levelname", "UNKNOWN"))
-        if settings.application_logging.metrics and settings.application_logging.metrics.enabled:
+        if flags.log_metrics:
             if transaction:
                 transaction.record_custom_metric("Logging/lines", {"count": 1})
-                transaction.record_custom_metric(f"Logging/lines/{level_name}", {"count": 1})
+                transaction.record_custom_metric(_level_metric_name(level_name), {"count": 1})
             else:
+                # Outside of a transaction the log lines are counted per
+                # thread and only recorded as metrics at harvest time.
                 application = application_instance(activate=False)
                 if application and application.enabled:
-                    application.record_custom_metric("Logging/lines", {"count": 1})
-                    application.record_custom_metric(f"Logging/lines/{level_name}", {"count": 1})
+                    application.record_log_line(level_name)
 
-        if settings.application_logging.forwarding and settings.application_logging.forwarding.enabled:
+        if flags.log_forwarding:
             try:
                 message = record.msg
                 if not isinstance(message, dict):
                     # Allow python to convert the message to a string and template it with args.
                     message = record.getMessage()
 
-                # Grab and filter context attributes from log record
-                record_attrs = vars(record)
-                context_attrs = {k: record_attrs[k] for k in record_attrs if k not in IGNORED_LOG_RECORD_KEYS}
+                # Context attributes are only extracted from the log record if
+                # they are used.
+                context_attrs = LogRecordAttributes(record) if flags.log_context_data else None
 
                 record_log_event(
                     message=message, level=level_name, timestamp=int(record.created * 1000), attributes=context_attrs
@@ -89,7 +139,7 @@ def wrap_callHandlers(wrapped, instance, args, kwargs):
             except Exception:
                 pass
 
-        if settings.application_logging.local_decorating and settings.application_logging.local_decorating.enabled:
+        if flags.log_local_decorating:
             record._nr_original_message = record.getMessage
             record.getMessage = wrap_getMessage(record.getMessage)
 
@@ -20,7 +20,7 @@ from newrelic.api.transaction import current_transaction, record_log_event
 from newrelic.common.object_wrapper import wrap_function_wrapper
 from newrelic.common.package_version_utils import get_package_version_tuple
 from newrelic.common.signature import bind_args
-from newrelic.core.config import global_settings
+from newrelic.core.config import global_settings, hot_flags
 from newrelic.hooks.logger_logging import add_nr_linking_metadata
 
 _logger = logging.getLogger(__name__)
@@ -47,22 +47,23 @@ def _nr_log_forwarder(message_instance):
     else:
         settings = global_settings()
 
+    flags = settings and hot_flags(settings)
+
     # Return early if application logging not enabled
-    if settings and settings.application_logging and settings.application_logging.enabled:
+    if flags and flags.application_logging:
         level = record["level"]
         level_name = "UNKNOWN" if not level else (level.name or "UNKNOWN")
 
-        if settings.application_logging.metrics and settings.application_logging.metrics.enabled:
+        if flags.log_metrics:
             if transaction:
                 transaction.record_custom_metric("Logging/lines", {"count": 1})
                 transaction.record_custom_metric(f"Logging/lines/{level_name}", {"count": 1})
             else:
                 application = application_instance(activate=False)
                 if application and application.enabled:
-                    application.record_custom_metric("Logging/lines", {"count": 1})
-                    application.record_custom_metric(f"Logging/lines/{level_name}", {"count": 1})
+                    application.record_log_line(level_name)
 
-        if settings.application_logging.forwarding and settings.application_logging.forwarding.enabled:
+        if flags.log_forwarding:
             attrs = _filter_record_attributes(record)
 
             try:
@@ -110,10 +111,9 @@ def nr_log_patcher(original_patcher=None):
         else:
             settings = global_settings()
 
-        if settings and settings.application_logging and settings.application_logging.enabled:
-            if settings.application_logging.local_decorating and settings.application_logging.local_decorating.enabled:
-                record["_nr_original_message"] = message = record["message"]
-                record["message"] = add_nr_linking_metadata(message)
+        if settings and hot_flags(settings).log_local_decorating:
+            record["_nr_original_message"] = message = record["message"]
+            record["message"] = add_nr_linking_metadata(message)
 
     if original_patcher is not None:
         patchers = [p for p in original_patcher]  # Consumer iterable into list so we can modify
@@ -18,7 +18,7 @@ from newrelic.api.application import application_instance
 from newrelic.api.transaction import current_transaction, record_log_event
 from newrelic.common.object_wrapper import wrap_function_wrapper
 from newrelic.common.signature import bind_args
-from newrelic.core.config import global_settings
+from newrelic.core.config import global_settings, hot_flags
 from newrelic.hooks.logger_logging import add_nr_linking_metadata
 
 
@@ -46,8 +46,10 @@ def new_relic_event_consumer(logger, level, event):
     else:
         settings = global_settings()
 
+    flags = settings and hot_flags(settings)
+
     # Return early if application logging not enabled
-    if settings and settings.application_logging.enabled:
+    if flags and flags.application_logging:
         if isinstance(event, (str, bytes, bytearray)):
             message = original_message = event
             event_attrs = {}
@@ -58,7 +60,7 @@ def new_relic_event_consumer(logger, level, event):
             # Unclear how to proceed, ignore log. Avoid logging an error message or we may incur an infinite loop.
             return event
 
-        if settings.application_logging.local_decorating.enabled:
+        if flags.log_local_decorating:
             message = add_nr_linking_metadata(message)
             if isinstance(event, (str, bytes, bytearray)):
                 event = message
@@ -67,17 +69,16 @@ def new_relic_event_consumer(logger, level, event):
 
         level_name = normalize_level_name(level)
 
-        if settings.application_logging.metrics.enabled:
+        if flags.log_metrics:
             if transaction:
                 transaction.record_custom_metric("Logging/lines", {"count": 1})
                 transaction.record_custom_metric(f"Logging/lines/{level_name}", {"count": 1})
             else:
                 application = application_instance(activate=False)
                 if application and application.enabled:
-                    application.record_custom_metric("Logging/lines", {"count": 1})
-                    application.record_custom_metric(f"Logging/lines/{level_name}", {"count": 1})
+                    application.record_log_line(level_name)
 
-        if settings.application_logging.forwarding.enabled:
+        if flags.log_forwarding:
             try:
                 record_log_event(original_message, level_name, attributes=event_attrs)
 
@@ -96,7 +97,7 @@ def wrap__process_event(wrapped, instance, args, kwargs):
         settings = global_settings()
 
     # Return early if application logging not enabled
-    if settings and settings.application_logging.enabled:
+    if settings and hot_flags(settings).application_logging:
         processors = instance._processors
         if not processors:
             instance._processors = [new_relic_event_consumer]
@@ -24,3 +24,4 @@ class ForceAgentRestart(NetworkInterfaceException): pass
 class ForceAgentDisconnect(NetworkInterfaceException): pass
 class DiscardDataForRequest(NetworkInterfaceException): pass
 class RetryDataForRequest(NetworkInterfaceException): pass
+class PayloadTooLargeForRequest(DiscardDataForRequest): pass
@@ -0,0 +1,385 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a data source for continuously profiling the
+stack traces of all threads at a low sample rate.
+
+Samples are aggregated as folded stacks, tagged with the name of the
+transaction the thread was running, over each harvest period. At each
+harvest the profile is exported as a gzipped pprof file to a local directory
+and/or posted to an endpoint, so that hot paths can be investigated after
+the fact. The export is done by a separate thread so that it never delays
+the harvest.
+
+"""
+
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from newrelic.core.config import global_settings
+from newrelic.samplers.decorators import data_source_factory
+
+_logger = logging.getLogger(__name__)
+
+# The maximum number of profiles waiting to be exported. A profile harvested
+# while this many are waiting, such as when the endpoint is slow to respond,
+# is dropped.
+
+MAX_PENDING_EXPORTS = 2
+
+
+@data_source_factory(name="Continuous Profiler")
+class _ContinuousProfilerDataSource:
+    def __init__(self, settings, environ):
+        self.app_name = environ.get("consumer.name")
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._shutdown = threading.Event()
+        self._thread = None
+        self._code_cache = {}
+
+        self._export_queue = None
+        self._export_thread = None
+        self._export_metrics = {}
+
+        self.reset_profile()
+
+    @property
+    def settings(self):
+        settings = global_settings()
+        if not settings:
+            return None
+        return settings.continuous_profiler
+
+    @property
+    def enabled(self):
+        settings = self.settings
+        return bool(settings and settings.enabled)
+
+    def reset_profile(self):
+        # The folded stacks are keyed by the transaction name, the thread
+        # category and the stack trace, with the count of samples for each.
+
+        self.folded_stacks = {}
+        self.sample_count = 0
+        self.sample_time = 0.0
+        self.start_time = time.time()
+
+    def check_fork(self):
+        # The threads of the parent process do not exist in a forked child
+        # process, and any lock they held would never be released. The
+        # samples taken in the parent are not reported by the child.
+
+        pid = os.getpid()
+        if pid == self.pid:
+            return
+
+        self.pid = pid
+        self._lock = threading.Lock()
+        self._shutdown = threading.Event()
+        self._thread = None
+        self._export_queue = None
+        self._export_thread = None
+        self._export_metrics = {}
+
+        self.reset_profile()
+
+    def running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self):
+        self.check_fork()
+
+        if not self.enabled or self.running():
+            return
+
+        self._shutdown.clear()
+
+        self._thread = threading.Thread(target=self._profiler_loop, name="NR-Continuous-Profiler-Thread")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        export_thread = self._export_thread
+        if export_thread is not None:
+            # Any profiles already queued are exported before the thread
+            # exits, for as long as the shutdown timeout allows.
+
+            self._export_queue.put(None)
+            settings = global_settings()
+            export_thread.join(settings.shutdown_timeout if settings else 1.0)
+            self._export_queue = None
+            self._export_thread = None
+
+        if self._thread is None:
+            return
+
+        self._shutdown.set()
+        self._thread.join(1.0)
+        self._thread = None
+
+    def _profiler_loop(self):
+        while not self._shutdown.is_set():
+            settings = self.settings
+            if settings is None or not settings.enabled:
+                break
+
+            self.take_sample(settings.profile_agent_code)
+
+            self._shutdown.wait(settings.sample_period)
+
+    def take_sample(self, profile_agent_code=False):
+        from newrelic.core.profile_sessions import CODE_CACHE_LIMIT, collect_transaction_stack_traces
+
+        start_time = time.time()
+
+        if len(self._code_cache) > CODE_CACHE_LIMIT:
+            self._code_cache = {}
+
+        samples = []
+
+        for txn, category, stack_trace in collect_transaction_stack_traces(profile_agent_code, self._code_cache):
+            # The transaction name is read from another thread, so can
+            # change while it is being read. The last node in the stack
+            # trace is the fake leaf node added for the call tree of the
+            # thread profiler, which is not needed for a folded stack.
+
+            transaction_name = txn and getattr(txn, "path", None)
+            stack_trace.pop()
+
+            samples.append((transaction_name, category, tuple(stack_trace)))
+
+        with self._lock:
+            folded_stacks = self.folded_stacks
+            for key in samples:
+                folded_stacks[key] = folded_stacks.get(key, 0) + 1
+
+            self.sample_count += 1
+            self.sample_time += time.time() - start_time
+
+    def harvest_profile(self):
+        """Returns the folded stacks sampled since the last harvest, along
+        with the count of samples, the time spent sampling and the start
+        time of the harvest period.
+
+        """
+
+        with self._lock:
+            result = (self.folded_stacks, self.sample_count, self.sample_time, self.start_time)
+            self.reset_profile()
+
+        return result
+
+    def pprof_profile(self, folded_stacks, start_time, end_time, sample_period):
+        from newrelic.common.pprof import Profile
+
+        period = int(sample_period * 1e9)
+
+        profile = Profile(
+            sample_types=(("samples", "count"), ("wall", "nanoseconds")),
+            period_type=("wall", "nanoseconds"),
+            period=period,
+            time_nanos=int(start_time * 1e9),
+            duration_nanos=int((end_time - start_time) * 1e9),
+        )
+
+        for (transaction_name, category, stack_trace), count in folded_stacks.items():
+            labels = {"thread category": category}
+            if transaction_name:
+                labels["transaction"] = transaction_name
+
+            profile.add_sample(stack_trace, (count, count * period), labels)
+
+        return profile.to_bytes()
+
+    def export_file(self, directory, payload, start_time, max_files=0):
+        app_name = re.sub(r"[^\w.-]", "_", self.app_name or "")
+        filename = f"{app_name}-{self.pid}-{int(start_time)}.pb.gz"
+        path = os.path.join(directory, filename)
+
+        os.makedirs(directory, exist_ok=True)
+
+        with open(path, "wb") as fp:
+            fp.write(payload)
+
+        if max_files:
+            self.remove_old_files(directory, app_name, max_files)
+
+        return path
+
+    def remove_old_files(self, directory, app_name, max_files):
+        # Only the oldest profiles written for the application, by this or
+        # any prior process, are removed to keep within the limit.
+
+        pattern = re.compile(rf"{re.escape(app_name)}-\d+-\d+\.pb\.gz")
+
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if pattern.fullmatch(name)]
+        if len(paths) <= max_files:
+            return
+
+        paths.sort(key=os.path.getmtime)
+
+        for path in paths[:-max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def export_endpoint(self, endpoint, payload):
+        from newrelic.common import agent_http
+
+        settings = global_settings()
+
+        url = urlparse(endpoint)
+        client_cls = agent_http.InsecureHttpClient if url.scheme == "http" else agent_http.HttpClient
+
+        client = client_cls(
+            host=url.hostname,
+            port=url.port or (80 if url.scheme == "http" else 443),
+            proxy_scheme=settings.proxy_scheme,
+            proxy_host=settings.proxy_host,
+            proxy_port=settings.proxy_port,
+            proxy_user=settings.proxy_user,
+            proxy_pass=settings.proxy_pass,
+            timeout=settings.agent_limits.data_collector_timeout,
+            ca_bundle_path=settings.ca_bundle_path,
+            disable_certificate_validation=settings.debug.disable_certificate_validation,
+            max_payload_size_in_bytes=settings.max_payload_size_in_bytes,
+            # The payload is already compressed as a pprof file.
+            compression_threshold=len(payload) + 1,
+        )
+
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+
+        headers = {"Content-Type": "application/octet-stream"}
+
+        with client:
+            status_code, _ = client.send_request("POST", path, headers=headers, payload=payload)
+
+        if status_code < 200 or status_code >= 300:
+            raise RuntimeError(f"An unexpected HTTP response of {status_code!r} was received.")
+
+    def record_export_metric(self, name, value):
+        with self._lock:
+            self._export_metrics[name] = self._export_metrics.get(name, 0) + value
+
+    def harvest_export_metrics(self):
+        with self._lock:
+            metrics, self._export_metrics = self._export_metrics, {}
+
+        return metrics
+
+    def export(self, folded_stacks, start_time, end_time, settings):
+        export_start = time.time()
+
+        payload = self.pprof_profile(folded_stacks, start_time, end_time, settings.sample_period)
+
+        if settings.output_directory:
+            try:
+                self.export_file(settings.output_directory, payload, start_time, settings.max_files)
+            except Exception:
+                _logger.exception("Unable to write continuous profile to %r.", settings.output_directory)
+                self.record_export_metric("Failed", 1)
+
+        if settings.endpoint:
+            try:
+                self.export_endpoint(settings.endpoint, payload)
+            except Exception:
+                _logger.exception("Unable to send continuous profile to %r.", settings.endpoint)
+                self.record_export_metric("Failed", 1)
+
+        self.record_export_metric("Bytes", len(payload))
+        self.record_export_metric("Time", time.time() - export_start)
+
+    def _export_loop(self, export_queue):
+        while True:
+            item = export_queue.get()
+            try:
+                if item is None:
+                    return
+                self.export(*item)
+            except Exception:
+                _logger.exception("Unable to export continuous profile.")
+            finally:
+                export_queue.task_done()
+
+    def submit_export(self, *args):
+        """Queues a profile to be exported by the export thread, which is
+        started on first use and again if it is no longer running.
+
+        """
+
+        thread = self._export_thread
+        if thread is None or not thread.is_alive():
+            self._export_queue = queue.Queue()
+            self._export_thread = threading.Thread(
+                target=self._export_loop, args=(self._export_queue,), name="NR-Continuous-Profiler-Export-Thread"
+            )
+            self._export_thread.daemon = True
+            self._export_thread.start()
+
+        if self._export_queue.qsize() >= MAX_PENDING_EXPORTS:
+            return False
+
+        self._export_queue.put(args)
+        return True
+
+    def __call__(self):
+        if not self.enabled:
+            self.stop()
+            return
+
+        # Sampling is started at the first harvest after it is enabled, and
+        # again if the profiler thread is no longer running.
+
+        if not self.running():
+            self.start()
+            return
+
+        settings = self.settings
+
+        folded_stacks, sample_count, sample_time, start_time = self.harvest_profile()
+        end_time = time.time()
+
+        yield ("Supportability/Python/ContinuousProfiler/Samples", {"count": sample_count})
+        yield ("Supportability/Python/ContinuousProfiler/SampleTime", sample_time)
+
+        # The metrics for the profiles exported since the prior harvest.
+
+        export_metrics = self.harvest_export_metrics()
+
+        if export_metrics.get("Failed"):
+            yield ("Supportability/Python/ContinuousProfiler/Export/Failed", {"count": export_metrics["Failed"]})
+        if "Bytes" in export_metrics:
+            yield ("Supportability/Python/ContinuousProfiler/Export/Bytes", export_metrics["Bytes"])
+            yield ("Supportability/Python/ContinuousProfiler/Export/Time", export_metrics["Time"])
+
+        if not folded_stacks or not (settings.output_directory or settings.endpoint):
+            return
+
+        if not self.submit_export(folded_stacks, start_time, end_time, settings):
+            _logger.debug("Dropping continuous profile as the prior profiles are still being exported.")
+            yield ("Supportability/Python/ContinuousProfiler/Export/Dropped", {"count": 1})
+
+
+continuous_profiler_data_source = _ContinuousProfilerDataSource
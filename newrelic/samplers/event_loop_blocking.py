@@ -0,0 +1,106 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a data source for generating metrics and custom
+events about the asyncio event loop callbacks which blocked the event loop
+for longer than the blocking threshold.
+
+The callbacks are timed by the asyncio instrumentation when the
+event_loop_visibility.callback_timing setting is enabled.
+
+"""
+
+from newrelic.core.config import global_settings
+from newrelic.core.slow_callbacks import register_slow_callbacks, unregister_slow_callbacks
+from newrelic.samplers.decorators import data_source_factory
+
+SLOW_CALLBACK_EVENT_TYPE = "EventLoopBlocked"
+
+
+@data_source_factory(name="Event Loop Blocking")
+class _EventLoopBlockingDataSource:
+    def __init__(self, settings, environ):
+        self.app_name = environ.get("consumer.name")
+        self.slow_callbacks = None
+
+    @property
+    def enabled(self):
+        settings = global_settings()
+        return bool(settings and settings.event_loop_visibility.callback_timing)
+
+    def start(self):
+        self.slow_callbacks = register_slow_callbacks(self.app_name)
+
+    def stop(self):
+        unregister_slow_callbacks(self.app_name, self.slow_callbacks)
+        self.slow_callbacks = None
+
+    def record_events(self, callbacks):
+        from newrelic.api.application import application_instance
+
+        application = application_instance(self.app_name, activate=False)
+        if application is None:
+            return
+
+        for callback in callbacks:
+            params = {
+                "loop": callback.loop,
+                "callback": callback.callback,
+                "duration": callback.duration,
+            }
+
+            if callback.coroutine:
+                params["coroutine"] = callback.coroutine
+            if callback.transaction_name:
+                params["transactionName"] = callback.transaction_name
+
+            application.record_custom_event(SLOW_CALLBACK_EVENT_TYPE, params)
+
+    def __call__(self):
+        if not self.enabled or self.slow_callbacks is None:
+            return
+
+        loops, callbacks = self.slow_callbacks.harvest()
+
+        total = [0, 0.0, 0.0, 0.0, 0.0]
+
+        for loop, (count, duration, min_duration, max_duration, sum_of_squares) in loops.items():
+            yield (
+                f"EventLoop/Blocked/{loop}",
+                {
+                    "count": count,
+                    "total": duration,
+                    "min": min_duration,
+                    "max": max_duration,
+                    "sum_of_squares": sum_of_squares,
+                },
+            )
+
+            total[2] = min(total[2], min_duration) if total[0] else min_duration
+            total[0] += count
+            total[1] += duration
+            total[3] = max(total[3], max_duration)
+            total[4] += sum_of_squares
+
+        if total[0]:
+            yield (
+                "EventLoop/Blocked/all",
+                {"count": total[0], "total": total[1], "min": total[2], "max": total[3], "sum_of_squares": total[4]},
+            )
+
+        if callbacks:
+            self.record_events(callbacks)
+
+
+event_loop_blocking_data_source = _EventLoopBlockingDataSource
@@ -13,17 +13,73 @@
 # limitations under the License.
 
 import gc
+import math
 import os
 import platform
+import random
 import time
 from collections import Counter
 
 from newrelic.common.object_names import callable_name
 from newrelic.core.config import global_settings
 from newrelic.core.stats_engine import CustomMetrics
+from newrelic.core.trace_cache import trace_cache
 from newrelic.samplers.decorators import data_source_factory
 
 
+# The number of sampled objects counted between checks of the time budget.
+CENSUS_SLICE_SIZE = 1000
+
+# The z-score for the 95% confidence interval of an extrapolated count.
+CENSUS_CONFIDENCE_Z = 1.96
+
+
+def _object_type_census(objects, limit, sample_size=0, time_budget=0.0):
+    """Returns the types with the highest count among the objects, as a
+    list of tuples of the type, the count and the margin of error of the
+    count.
+
+    If a sample size is supplied and there are more objects than that, only
+    a random sample of the objects is counted. The sample is counted in
+    slices until the time budget runs out, and the counts are extrapolated
+    to all of the objects, with the margin of error at a 95% confidence
+    level. Otherwise every object is counted and the margin is always 0.
+
+    """
+
+    population = len(objects)
+
+    if sample_size <= 0 or population <= sample_size:
+        return [(obj_type, count, 0) for obj_type, count in Counter(map(type, objects)).most_common(limit)]
+
+    # The objects are sampled with replacement, one slice at a time, so that
+    # if the time budget runs out the objects counted so far are still a
+    # random sample.
+
+    counts = Counter()
+    sampled = 0
+
+    deadline = time.time() + time_budget
+
+    while sampled < sample_size:
+        slice_size = min(CENSUS_SLICE_SIZE, sample_size - sampled)
+        counts.update(map(type, random.choices(objects, k=slice_size)))  # nosec
+        sampled += slice_size
+
+        if time_budget > 0 and time.time() >= deadline:
+            break
+
+    scale = population / sampled
+
+    census = []
+    for obj_type, count in counts.most_common(limit):
+        proportion = count / sampled
+        margin = CENSUS_CONFIDENCE_Z * population * math.sqrt(proportion * (1 - proportion) / sampled)
+        census.append((obj_type, round(count * scale), round(margin)))
+
+    return census
+
+
 @data_source_factory(name="Garbage Collector Metrics")
 class _GCDataSource():
     def __init__(self, settings, environ):
@@ -45,6 +101,16 @@ class _GCDataSource():
         settings = global_settings()
         return settings.gc_runtime_metrics.top_object_count_limit
 
+    @property
+    def census_sample_size(self):
+        settings = global_settings()
+        return settings.gc_runtime_metrics.census_sample_size
+
+    @property
+    def census_time_budget(self):
+        settings = global_settings()
+        return settings.gc_runtime_metrics.census_time_budget
+
     def record_gc(self, phase, info):
         if not self.enabled:
             return
@@ -56,6 +122,7 @@ class _GCDataSource():
         elif phase == "stop":
             total_time = time.time() - self.start_time
             self.gc_time_metrics.record_custom_metric(f"GC/time/{self.pid}/all", total_time)
+            trace_cache().record_gc_pause(total_time)
             for gen in range(0, 3):
                 if gen <= current_generation:
                     self.gc_time_metrics.record_custom_metric(f"GC/time/{self.pid}/{gen}", total_time)
@@ -90,16 +157,24 @@ class _GCDataSource():
                     {"count": count},
                 )
 
-        # Record object count for top five types with highest count
+        # Record object count for top five types with highest count. When
+        # the census is sampled, the counts are estimates and the margin of
+        # error of each is also recorded.
         if hasattr(gc, "get_objects"):
-            object_types = map(type, gc.get_objects())
             if self.top_object_count_limit > 0:
-                highest_types = Counter(object_types).most_common(self.top_object_count_limit)
-                for obj_type, count in highest_types:
+                highest_types = _object_type_census(
+                    gc.get_objects(), self.top_object_count_limit, self.census_sample_size, self.census_time_budget
+                )
+                for obj_type, count, margin in highest_types:
                     yield (
                         f"GC/objects/{self.pid}/type/{callable_name(obj_type)}",
                         {"count": count},
                     )
+                    if margin:
+                        yield (
+                            f"GC/objects/{self.pid}/type/{callable_name(obj_type)}/margin",
+                            {"count": margin},
+                        )
 
         if hasattr(gc, "get_stats"):
             stats_by_gen = gc.get_stats()
@@ -0,0 +1,214 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module implements a data source for generating metrics and custom
+events about the allocation sites where memory usage is growing, using the
+tracemalloc module.
+
+A snapshot of the traced memory blocks is taken at each harvest and compared
+with the snapshot from the prior harvest. The allocation sites which grew
+the most are reported as custom events. Only the total growth of those sites
+is reported as a metric, so that the number of metric names is bounded.
+
+"""
+
+import logging
+import os
+import platform
+import sys
+import time
+
+from newrelic.core.config import global_settings
+from newrelic.samplers.decorators import data_source_factory
+
+_logger = logging.getLogger(__name__)
+
+ALLOCATION_EVENT_TYPE = "MemoryAllocationGrowth"
+
+
+@data_source_factory(name="Memory Allocations")
+class _MemoryAllocationDataSource:
+    def __init__(self, settings, environ):
+        self.app_name = environ.get("consumer.name")
+        self.pid = os.getpid()
+        self.tracemalloc = None
+        self.owns_tracing = False
+        self.previous_snapshot = None
+        self.previous_time = 0.0
+
+    @property
+    def settings(self):
+        settings = global_settings()
+        if platform.python_implementation() == "PyPy" or not settings:
+            return None
+        return settings.memory_allocations
+
+    @property
+    def enabled(self):
+        settings = self.settings
+        return bool(settings and settings.enabled)
+
+    def start_tracing(self):
+        if self.tracemalloc is None:
+            import tracemalloc
+
+            self.tracemalloc = tracemalloc
+
+        # Tracing which was started by the application itself is used as
+        # is, and is never stopped by the data source.
+
+        if not self.tracemalloc.is_tracing():
+            self.tracemalloc.start(self.settings.frame_depth)
+            self.owns_tracing = True
+
+        self.previous_snapshot = None
+        self.previous_time = time.time()
+
+    def stop_tracing(self):
+        if self.owns_tracing and self.tracemalloc.is_tracing():
+            self.tracemalloc.stop()
+
+        self.owns_tracing = False
+        self.previous_snapshot = None
+
+    def start(self):
+        if self.enabled:
+            self.start_tracing()
+
+    def stop(self):
+        if self.tracemalloc is not None:
+            self.stop_tracing()
+
+    def take_snapshot(self):
+        tracemalloc = self.tracemalloc
+
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    def record_events(self, statistics):
+        from newrelic.api.application import application_instance
+
+        application = application_instance(self.app_name, activate=False)
+        if application is None:
+            return
+
+        search_paths = self.search_paths()
+
+        for stat in statistics:
+            application.record_custom_event(
+                ALLOCATION_EVENT_TYPE,
+                {
+                    "pid": self.pid,
+                    "site": self.site_name(stat.traceback, search_paths),
+                    "traceback": "\n".join(stat.traceback.format(most_recent_first=True)),
+                    "size": stat.size,
+                    "sizeDiff": stat.size_diff,
+                    "count": stat.count,
+                    "countDiff": stat.count_diff,
+                },
+            )
+
+    @staticmethod
+    def search_paths():
+        # The longest paths are checked first, so that a file is named
+        # relative to the most specific entry of sys.path containing it.
+        paths = {os.path.join(os.path.abspath(path), "") for path in sys.path if isinstance(path, str)}
+        return sorted(paths, key=len, reverse=True)
+
+    @staticmethod
+    def site_name(traceback, search_paths):
+        # The most recent frame is the last one in the traceback. A file
+        # under sys.path is named relative to it, as for the module it is
+        # imported as, rather than by where it is installed.
+        frame = traceback[-1]
+        filename = frame.filename
+
+        for path in search_paths:
+            if filename.startswith(path):
+                filename = filename[len(path) :]
+                break
+
+        return f"{filename}:{frame.lineno}"
+
+    def __call__(self):
+        if not self.enabled:
+            if self.tracemalloc is not None:
+                self.stop_tracing()
+            return
+
+        settings = self.settings
+
+        if self.tracemalloc is None or not self.tracemalloc.is_tracing():
+            # Tracing is started at the first harvest after it is enabled,
+            # and resumed at the harvest after it was paused. There is then
+            # nothing to compare until the next harvest.
+            self.start_tracing()
+            return
+
+        start_time = time.time()
+
+        snapshot = self.take_snapshot()
+        previous_snapshot, self.previous_snapshot = self.previous_snapshot, snapshot
+
+        previous_time, self.previous_time = self.previous_time, start_time
+
+        statistics = []
+        if previous_snapshot is not None:
+            key_type = "traceback" if settings.frame_depth > 1 else "lineno"
+            statistics = [
+                stat for stat in snapshot.compare_to(previous_snapshot, key_type) if stat.size_diff > 0
+            ][: settings.top_n]
+
+        traced_size, _ = self.tracemalloc.get_traced_memory()
+        tracemalloc_memory = self.tracemalloc.get_tracemalloc_memory()
+
+        yield (f"Memory/Allocations/{self.pid}/traced", traced_size)
+        yield (f"Memory/Allocations/{self.pid}/overhead", tracemalloc_memory)
+
+        if statistics:
+            yield (f"Memory/Allocations/{self.pid}/growth", sum(stat.size_diff for stat in statistics))
+
+        if statistics and settings.custom_events:
+            self.record_events(statistics)
+
+        # Tracing is paused when taking and comparing the snapshots uses more
+        # than the budgeted share of the time since the prior harvest, or
+        # when the memory used by tracemalloc itself is over its limit. A
+        # budget or limit of 0 is unlimited.
+
+        snapshot_time = time.time() - start_time
+        yield (f"Memory/Allocations/{self.pid}/snapshotTime", snapshot_time)
+
+        over_budget = settings.overhead_budget and snapshot_time > settings.overhead_budget * (start_time - previous_time)
+        over_memory = settings.max_overhead_memory and tracemalloc_memory > settings.max_overhead_memory
+
+        if self.owns_tracing and (over_budget or over_memory):
+            _logger.debug(
+                "Pausing memory allocation tracing as it has exceeded its overhead budget. "
+                "Snapshot took %.3f seconds and tracemalloc is using %d bytes.",
+                snapshot_time,
+                tracemalloc_memory,
+            )
+            self.stop_tracing()
+            yield ("Supportability/Python/MemoryAllocations/Paused", {"count": 1})
+
+
+memory_allocations_data_source = _MemoryAllocationDataSource
@@ -219,7 +219,11 @@ def run_setup(with_extensions):
                 Extension(
                     "newrelic.common._monotonic", ["newrelic/common/_monotonic.c"], libraries=monotonic_libraries
                 ),
-                Extension("newrelic.core._thread_utilization", ["newrelic/core/_thread_utilization.c"]),
+                Extension(
+                    "newrelic.core._thread_utilization",
+                    ["newrelic/core/_thread_utilization.c"],
+                    libraries=monotonic_libraries,
+                ),
             ]
             kwargs_tmp["cmdclass"] = dict(build_ext=optional_build_ext)
 
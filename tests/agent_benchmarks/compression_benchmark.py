@@ -0,0 +1,111 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compression ratio versus time for harvest payloads.
+
+Recorded payloads, for example request bodies captured with the audit log,
+may be passed as file arguments. Without arguments, representative span and
+log event payloads are generated instead.
+
+    python tests/agent_benchmarks/compression_benchmark.py [payload ...]
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from newrelic.common.agent_http import AdaptiveCompressionLevel, _compression_codecs
+from newrelic.common.encoding_utils import json_encode
+
+
+def span_event_payload(count):
+    events = []
+    for i in range(count):
+        intrinsics = {
+            "type": "Span",
+            "traceId": uuid.uuid4().hex,
+            "guid": uuid.uuid4().hex[:16],
+            "transactionId": uuid.uuid4().hex[:16],
+            "sampled": True,
+            "priority": random.random() + 1,
+            "timestamp": int(time.time() * 1000) + i,
+            "duration": random.random(),
+            "name": random.choice(("Function/app:index", "Datastore/statement/Postgres/users/select")),
+            "category": random.choice(("generic", "datastore", "http")),
+            "nr.entryPoint": i % 10 == 0,
+        }
+        events.append([intrinsics, {}, {"db.instance": "users", "peer.hostname": "db.internal"}])
+    return json_encode(["run-id", {"reservoir_size": count, "events_seen": count}, events]).encode("utf-8")
+
+
+def log_event_payload(count):
+    logs = []
+    for i in range(count):
+        logs.append(
+            {
+                "timestamp": int(time.time() * 1000) + i,
+                "level": random.choice(("INFO", "WARNING", "ERROR")),
+                "message": f"Processed request {uuid.uuid4()} in {random.random():.6f}s",
+                "trace.id": uuid.uuid4().hex,
+                "span.id": uuid.uuid4().hex[:16],
+            }
+        )
+    return json_encode([{"common": {"attributes": {"entity.name": "app"}}, "logs": logs}]).encode("utf-8")
+
+
+def measure(codec, level, payload, repeat):
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compressed = codec.compress(payload, level)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return float(len(payload)) / len(compressed), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("payloads", nargs="*", help="files containing recorded uncompressed payloads")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per level")
+    parser.add_argument("--target-ratio", type=float, default=4.0, help="target ratio for adaptive selection")
+    args = parser.parse_args()
+
+    payloads = []
+    for path in args.payloads:
+        with open(path, "rb") as f:
+            payloads.append((path, f.read()))
+    if not payloads:
+        random.seed(0)
+        payloads = [("span_event_data", span_event_payload(2000)), ("log_event_data", log_event_payload(5000))]
+
+    print(f"{'payload':<24} {'codec':<8} {'level':>5} {'bytes':>10} {'ratio':>7} {'ms':>9} {'MB/s':>8}")
+    for name, payload in payloads:
+        for codec in _compression_codecs.values():
+            for level in codec.levels:
+                ratio, elapsed = measure(codec, level, payload, args.repeat)
+                throughput = len(payload) / elapsed / 1e6
+                print(
+                    f"{name[-24:]:<24} {codec.name:<8} {level:>5} {len(payload):>10} "
+                    f"{ratio:>7.2f} {elapsed * 1000:>9.2f} {throughput:>8.1f}"
+                )
+
+            adaptive = AdaptiveCompressionLevel(codec, args.target_ratio)
+            for _ in range(len(codec.levels) * 2):
+                level = adaptive.level(len(payload))
+                adaptive.update(len(payload), len(codec.compress(payload, level)))
+            print(f"{name[-24:]:<24} {codec.name:<8} adaptive level for ratio {args.target_ratio}: {level}")
+
+
+if __name__ == "__main__":
+    main()
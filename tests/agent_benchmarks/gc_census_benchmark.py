@@ -0,0 +1,82 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Time taken by the garbage collector object type census.
+
+A synthetic heap of cached records is built, and the full census is
+compared with sampled censuses of a number of sizes, along with the
+accuracy of the extrapolated counts. The time of each census includes
+listing the objects with gc.get_objects(), which is not sampled.
+
+    python tests/agent_benchmarks/gc_census_benchmark.py [--records N] [--sample-sizes N,N]
+"""
+
+import argparse
+import gc
+import time
+
+from newrelic.samplers.gc_data import _object_type_census
+
+
+class CachedRecord:
+    def __init__(self, index):
+        self.index = index
+        self.tags = [index]
+        self.fields = {"index": index}
+
+
+def build_heap(records):
+    return [CachedRecord(index) for index in range(records)]
+
+
+def measure(limit, sample_size, time_budget):
+    start = time.perf_counter()
+    census = _object_type_census(gc.get_objects(), limit, sample_size, time_budget)
+    return time.perf_counter() - start, census
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--sample-sizes", default="10000,100000")
+    parser.add_argument("--time-budget", type=float, default=0.05)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    heap = build_heap(args.records)  # noqa: F841
+    gc.collect()
+
+    population = len(gc.get_objects())
+    full_time, full_census = measure(args.limit, 0, 0.0)
+    exact = {obj_type: count for obj_type, count, _ in full_census}
+
+    # The errors and margins of error are shown as a percentage of all of
+    # the objects, as the types with few objects have wide relative errors.
+    print(f"{population} objects tracked by the garbage collector")
+    print(f"{'census':<16}{'time ms':>10}{'max error %':>14}{'max margin %':>14}")
+    print(f"{'full':<16}{full_time * 1e3:>10.1f}{0.0:>14.3f}{0.0:>14.3f}")
+
+    for sample_size in (int(size) for size in args.sample_sizes.split(",")):
+        sampled_time, census = measure(args.limit, sample_size, args.time_budget)
+
+        errors = [abs(count - exact[obj_type]) for obj_type, count, _ in census if obj_type in exact]
+        margins = [margin for _, _, margin in census]
+
+        print(
+            f"{f'sample {sample_size}':<16}{sampled_time * 1e3:>10.1f}"
+            f"{max(errors, default=0) / population * 100:>14.3f}{max(margins, default=0) / population * 100:>14.3f}"
+        )
+
+if __name__ == "__main__":
+    main()
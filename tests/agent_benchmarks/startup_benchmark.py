@@ -0,0 +1,61 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Time taken by newrelic.agent.initialize() in a fresh interpreter.
+
+Each run starts a new Python process, so that the module imports and the
+registration of the import hooks are measured as they are at application
+startup. An agent configuration file may be given to include the processing
+of its settings.
+
+    python tests/agent_benchmarks/startup_benchmark.py [--runs N] [config_file]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import newrelic.agent
+imported = time.perf_counter()
+newrelic.agent.initialize(sys.argv[1] or None)
+initialized = time.perf_counter()
+print(imported - start, initialized - imported)
+"""
+
+
+def measure(config_file):
+    output = subprocess.check_output([sys.executable, "-c", SCRIPT, config_file or ""], text=True)
+    return [float(value) for value in output.split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config_file", nargs="?")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    results = [measure(args.config_file) for _ in range(args.runs)]
+
+    print(f"{'phase':<24}{'median ms':>12}{'min ms':>12}")
+    for index, phase in enumerate(("import newrelic.agent", "initialize()")):
+        values = [result[index] * 1000.0 for result in results]
+        print(f"{phase:<24}{statistics.median(values):>12.2f}{min(values):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
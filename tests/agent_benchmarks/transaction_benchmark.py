@@ -0,0 +1,80 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per transaction overhead of the agent.
+
+Each transaction is a background task with a number of function traces, a
+noticed error and a log record, recorded by an application registered in
+developer mode so that no data is sent.
+
+    python tests/agent_benchmarks/transaction_benchmark.py [--transactions N] [--traces N]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("NEW_RELIC_DEVELOPER_MODE", "true")
+os.environ.setdefault("NEW_RELIC_APP_NAME", "Transaction Benchmark")
+
+import newrelic.agent  # noqa: E402
+
+_logger = logging.getLogger("transaction_benchmark")
+
+
+def run_transaction(application, traces):
+    with newrelic.agent.BackgroundTask(application, "benchmark"):
+        for index in range(traces):
+            with newrelic.agent.FunctionTrace(f"trace-{index}"):
+                pass
+
+        try:
+            raise ValueError("benchmark")
+        except ValueError:
+            newrelic.agent.notice_error()
+
+        _logger.warning("Recorded a benchmark transaction.")
+
+
+def measure(application, transactions, traces):
+    start = time.perf_counter()
+    for _ in range(transactions):
+        run_transaction(application, traces)
+    return (time.perf_counter() - start) / transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--traces", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(stream=open(os.devnull, "w"))
+
+    newrelic.agent.initialize()
+    application = newrelic.agent.register_application(timeout=10.0)
+
+    measure(application, args.transactions // 10 or 1, args.traces)
+
+    results = [measure(application, args.transactions, args.traces) * 1e6 for _ in range(args.runs)]
+
+    print(f"{'per transaction':<24}{'median us':>12}{'min us':>12}")
+    print(f"{'':<24}{statistics.median(results):>12.2f}{min(results):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import os
+import re
+import threading
+
+import pytest
+from testing_support.fixtures import override_generic_settings
+
+from newrelic.api.background_task import background_task
+from newrelic.core.config import global_settings
+from newrelic.samplers.continuous_profiler import continuous_profiler_data_source
+
+APP_NAME = "Python Agent Test (agent_features)"
+
+
+@pytest.fixture
+def continuous_profiler():
+    sampler = continuous_profiler_data_source(settings=())["factory"](environ={"consumer.name": APP_NAME})
+    yield sampler
+    sampler.stop()
+
+
+def _read_varint(data, offset):
+    result = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, offset
+
+
+def decode_message(data):
+    """Decodes a protocol buffer message into a dict of field number to the
+    list of raw values for the field.
+
+    """
+
+    fields = {}
+    offset = 0
+    while offset < len(data):
+        key, offset = _read_varint(data, offset)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, offset = _read_varint(data, offset)
+        else:
+            length, offset = _read_varint(data, offset)
+            value, offset = data[offset : offset + length], offset + length
+        fields.setdefault(field, []).append(value)
+    return fields
+
+
+def decode_packed(data):
+    values = []
+    offset = 0
+    while offset < len(data):
+        value, offset = _read_varint(data, offset)
+        values.append(value)
+    return values
+
+
+def decode_profile(payload):
+    profile = decode_message(gzip.decompress(payload))
+    strings = [value.decode("utf-8") for value in profile[6]]
+
+    functions = {}
+    for function in profile[5]:
+        function = decode_message(function)
+        functions[function[1][0]] = strings[function[2][0]]
+
+    locations = {}
+    for location in profile[4]:
+        location = decode_message(location)
+        line = decode_message(location[4][0])
+        locations[location[1][0]] = functions[line[1][0]]
+
+    samples = []
+    for sample in profile[2]:
+        sample = decode_message(sample)
+        stack = [locations[location_id] for location_id in decode_packed(sample[1][0])]
+        values = decode_packed(sample[2][0])
+        labels = {}
+        for label in sample.get(3, ()):
+            label = decode_message(label)
+            labels[strings[label[1][0]]] = strings[label[2][0]]
+        samples.append((stack, values, labels))
+
+    return samples
+
+
+def sample_transaction(sampler, samples):
+    started = threading.Event()
+    finished = threading.Event()
+
+    @background_task(name="profiled_task")
+    def profiled_task():
+        started.set()
+        finished.wait(5.0)
+
+    thread = threading.Thread(target=profiled_task)
+    thread.start()
+
+    started.wait(5.0)
+    try:
+        for _ in range(samples):
+            sampler.take_sample()
+    finally:
+        finished.set()
+        thread.join(5.0)
+
+
+def test_continuous_profiler_folded_stacks(continuous_profiler):
+    sample_transaction(continuous_profiler, 3)
+
+    folded_stacks, sample_count, _, _ = continuous_profiler.harvest_profile()
+
+    assert sample_count == 3
+
+    stacks = [
+        (stack, count)
+        for (transaction_name, category, stack), count in folded_stacks.items()
+        if transaction_name == "OtherTransaction/Function/profiled_task"
+    ]
+
+    assert stacks
+    for stack, count in stacks:
+        assert count == 3
+        # The folded stacks are ordered from the root of the stack.
+        assert stack[0][1] == "_bootstrap"
+        assert "profiled_task" in [method[1] for method in stack]
+
+    # The folded stacks are reset by a harvest.
+
+    assert continuous_profiler.harvest_profile()[0] == {}
+
+
+def test_continuous_profiler_export(continuous_profiler, tmp_path):
+    @override_generic_settings(
+        global_settings(),
+        {
+            "continuous_profiler.enabled": True,
+            "continuous_profiler.sample_period": 60.0,
+            "continuous_profiler.output_directory": str(tmp_path),
+        },
+    )
+    def _test():
+        # The first harvest starts the profiler thread.
+
+        assert list(continuous_profiler() or ()) == []
+
+        sample_transaction(continuous_profiler, 2)
+
+        metrics = dict(continuous_profiler() or ())
+        assert metrics["Supportability/Python/ContinuousProfiler/Samples"]["count"] >= 2
+
+        # The profile is exported by the export thread, and the metrics for
+        # the export are reported at the next harvest.
+
+        continuous_profiler._export_queue.join()
+
+        return dict(continuous_profiler() or ())
+
+    metrics = _test()
+
+    assert metrics["Supportability/Python/ContinuousProfiler/Export/Bytes"] > 0
+    assert "Supportability/Python/ContinuousProfiler/Export/Failed" not in metrics
+
+    (path,) = tmp_path.iterdir()
+    assert path.name.endswith(".pb.gz")
+
+    samples = decode_profile(path.read_bytes())
+
+    transaction_samples = [
+        (stack, values)
+        for stack, values, labels in samples
+        if labels.get("transaction") == "OtherTransaction/Function/profiled_task"
+    ]
+
+    assert transaction_samples
+    for stack, values in transaction_samples:
+        # The function being executed is first in a pprof sample.
+        assert stack[0] == "wait"
+        assert "profiled_task" in stack
+        assert values[0] >= 2
+        assert values[1] == values[0] * 60 * 10**9
+
+
+def test_continuous_profiler_disabled(continuous_profiler):
+    assert list(continuous_profiler() or ()) == []
+    assert continuous_profiler._thread is None
+
+
+def test_continuous_profiler_max_files(continuous_profiler, tmp_path):
+    app_name = re.sub(r"[^\w.-]", "_", APP_NAME)
+
+    for index in range(3):
+        path = tmp_path / f"{app_name}-1-{index}.pb.gz"
+        path.write_bytes(b"")
+        os.utime(path, (index, index))
+
+    other = tmp_path / "other.pb.gz"
+    other.write_bytes(b"")
+
+    path = continuous_profiler.export_file(str(tmp_path), b"profile", 1000.0, max_files=2)
+
+    # Only the oldest profiles for the application are removed.
+    assert sorted(tmp_path.iterdir()) == sorted([tmp_path / f"{app_name}-1-2.pb.gz", tmp_path / path, other])
+
+
+def test_continuous_profiler_restarted_after_fork(continuous_profiler):
+    @override_generic_settings(global_settings(), {"continuous_profiler.enabled": True})
+    def _test():
+        continuous_profiler.start()
+        parent_thread = continuous_profiler._thread
+
+        # In a forked child process the profiler thread of the parent is
+        # no longer running.
+
+        continuous_profiler.stop()
+        continuous_profiler._thread = parent_thread
+        continuous_profiler.pid = -1
+
+        assert list(continuous_profiler() or ()) == []
+        assert continuous_profiler.running()
+        assert continuous_profiler._thread is not parent_thread
+        assert continuous_profiler.pid == os.getpid()
+
+    _test()
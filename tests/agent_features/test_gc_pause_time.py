@@ -0,0 +1,75 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import platform
+
+import pytest
+from testing_support.fixtures import override_application_settings, override_generic_settings
+from testing_support.validators.validate_transaction_event_attributes import (
+    validate_transaction_event_attributes,
+)
+from testing_support.validators.validate_transaction_metrics import (
+    validate_transaction_metrics,
+)
+
+from newrelic.api.background_task import background_task
+from newrelic.api.transaction import current_transaction
+from newrelic.core.config import global_settings
+from newrelic.samplers.gc_data import garbage_collector_data_source
+
+pytestmark = pytest.mark.skipif(
+    platform.python_implementation() == "PyPy",
+    reason="GC Metrics are always disabled on PyPy",
+)
+
+
+@pytest.fixture
+def gc_data_source():
+    sampler = garbage_collector_data_source(settings=())["factory"](environ=())
+    sampler.start()
+    yield sampler
+    sampler.stop()
+
+
+@pytest.mark.parametrize("transaction_attribution", (True, False))
+def test_gc_pause_time(gc_data_source, transaction_attribution):
+    metric_count = 1 if transaction_attribution else None
+    rollup = (
+        ("OtherTransactionGCPauseTime/Function/collect", metric_count),
+        ("OtherTransactionGCPauseTime", metric_count),
+    )
+
+    attributes = {"intrinsic": ("gcPauseTime",), "agent": (), "user": ()}
+    if transaction_attribution:
+        attributes = {"required_params": attributes}
+    else:
+        attributes = {"forgone_params": attributes}
+
+    @override_generic_settings(global_settings(), {"gc_runtime_metrics.enabled": True})
+    @override_application_settings({"gc_runtime_metrics.transaction_attribution": transaction_attribution})
+    @validate_transaction_event_attributes(**attributes)
+    @validate_transaction_metrics("collect", rollup_metrics=rollup, background_task=True)
+    @background_task(name="collect")
+    def _test():
+        gc.collect()
+        gc.collect()
+
+        gc_pause_time = current_transaction()._gc_pause_time
+        if transaction_attribution:
+            assert gc_pause_time > 0.0
+        else:
+            assert gc_pause_time == 0.0
+
+    _test()
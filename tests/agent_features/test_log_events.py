@@ -501,3 +501,48 @@ def test_global_custom_attribute_forwarding_max_num_attrs():
     common = session.get_log_events_common_block()
     # Should be truncated to the max number of user attributes
     assert common == {f"custom_attr_{i+1}": "value" for i in range(128)}
+
+
+class CountingMessage():
+    conversions = 0
+
+    def __str__(self):
+        CountingMessage.conversions += 1
+        return "discarded"
+
+
+def exercise_record_log_event_full_reservoir():
+    CountingMessage.conversions = 0
+
+    transaction = current_transaction()
+    _record_log_event = transaction.record_log_event if transaction else record_log_event
+
+    _record_log_event("kept", priority=1.0)
+
+    # Log events which would be discarded by the full reservoir are not
+    # processed.
+    _record_log_event(CountingMessage(), attributes={"key": "value"}, priority=0.5)
+    assert CountingMessage.conversions == 0
+
+    _record_log_event(CountingMessage(), priority=2.0)
+    assert CountingMessage.conversions == 1
+
+
+@override_application_settings(
+    {"application_logging.forwarding.enabled": True, "event_harvest_config.harvest_limits.log_event_data": 1}
+)
+@validate_log_events([{"message": "discarded"}])
+@validate_log_event_count(1)
+@background_task()
+def test_record_log_event_full_reservoir_inside_transaction():
+    exercise_record_log_event_full_reservoir()
+
+
+@override_application_settings(
+    {"application_logging.forwarding.enabled": True, "event_harvest_config.harvest_limits.log_event_data": 1}
+)
+@reset_core_stats_engine()
+@validate_log_events_outside_transaction([{"message": "discarded"}])
+@validate_log_event_count_outside_transaction(1)
+def test_record_log_event_full_reservoir_outside_transaction():
+    exercise_record_log_event_full_reservoir()
@@ -25,6 +25,7 @@ from newrelic.agent import get_linking_metadata
 from newrelic.api.background_task import background_task
 from newrelic.api.function_trace import FunctionTrace
 from newrelic.api.log import NewRelicContextFormatter
+from newrelic.api.time_trace import current_trace
 
 
 _logger = logging.getLogger(__name__)
@@ -415,3 +416,36 @@ def test_get_linking_metadata_api_inside_transaction():
 def test_get_linking_metadata_api_outside_transaction():
     metadata = get_linking_metadata()
     validate_metadata(metadata, EXPECTED_KEYS_NO_TXN)
+
+
+@background_task(name="test_get_linking_metadata_cached")
+def test_get_linking_metadata_cached(monkeypatch):
+    import platform
+
+    uname_calls = []
+    uname = platform.uname
+
+    def _uname():
+        uname_calls.append(True)
+        return uname()
+
+    monkeypatch.setattr(platform, "uname", _uname)
+
+    first = get_linking_metadata()
+    with FunctionTrace("test_linking_metadata_cached") as trace:
+        second = get_linking_metadata()
+
+    # The service linking metadata is only built once for the settings.
+    assert len(uname_calls) <= 1
+
+    # Each caller receives its own copy with the current trace.
+    assert first is not second
+    assert second["span.id"] == trace.guid
+    assert first["span.id"] == current_trace().guid
+    assert {k: v for k, v in first.items() if k != "span.id"} == {
+        k: v for k, v in second.items() if k != "span.id"
+    }
+
+    settings = current_trace().transaction.settings
+    monkeypatch.setattr(settings, "entity_guid", "CHANGEDENTITYGUID")
+    assert get_linking_metadata()["entity.guid"] == "CHANGEDENTITYGUID"
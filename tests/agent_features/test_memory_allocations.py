@@ -0,0 +1,81 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import platform
+
+import pytest
+from testing_support.fixtures import core_application_stats_engine, override_generic_settings, reset_core_stats_engine
+
+from newrelic.api.application import application_instance
+from newrelic.core.config import global_settings
+from newrelic.samplers.memory_allocations import ALLOCATION_EVENT_TYPE, memory_allocations_data_source
+
+pytestmark = pytest.mark.skipif(
+    platform.python_implementation() == "PyPy",
+    reason="tracemalloc is not available on PyPy",
+)
+
+
+@pytest.fixture
+def memory_allocations_sampler():
+    environ = {"consumer.name": application_instance().name}
+    sampler = memory_allocations_data_source(settings=())["factory"](environ=environ)
+    sampler.start()
+    yield sampler
+    sampler.stop()
+
+
+def allocate_blocks():
+    return [bytearray(1024) for _ in range(1000)]
+
+
+@pytest.mark.parametrize("custom_events", (True, False))
+@reset_core_stats_engine()
+def test_memory_allocations_custom_events(memory_allocations_sampler, custom_events):
+    @override_generic_settings(
+        global_settings(),
+        {
+            "memory_allocations.enabled": True,
+            "memory_allocations.custom_events": custom_events,
+            "memory_allocations.overhead_budget": 0.0,
+        },
+    )
+    def _test():
+        list(memory_allocations_sampler() or ())
+        list(memory_allocations_sampler() or ())
+
+        blocks = allocate_blocks()  # noqa: F841
+
+        list(memory_allocations_sampler() or ())
+
+    _test()
+
+    events = [
+        params
+        for intrinsics, params in core_application_stats_engine().custom_events
+        if intrinsics["type"] == ALLOCATION_EVENT_TYPE
+    ]
+
+    if not custom_events:
+        assert not events
+        return
+
+    # The sites are named relative to the entry of sys.path containing
+    # the file rather than by its full path.
+    sites = [event["site"] for event in events]
+    assert any(site.startswith(f"{os.path.basename(__file__)}:") for site in sites), sites
+    for event in events:
+        assert event["sizeDiff"] > 0
+        assert event["traceback"]
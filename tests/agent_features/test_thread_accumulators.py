@@ -0,0 +1,206 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import _thread
+import threading
+import time
+
+import pytest
+from testing_support.fixtures import override_application_settings, reset_core_stats_engine
+
+from newrelic.api.application import application_instance
+from newrelic.core.thread_accumulators import MIN_THREAD_RESERVOIR_SIZE, ThreadAccumulators
+
+THREADS = 8
+CALLS = 500
+
+
+@pytest.fixture
+def core_application():
+    api_application = application_instance()
+    core_application = api_application._agent.application(api_application.name)
+
+    original = core_application._thread_accumulators
+    core_application._thread_accumulators = ThreadAccumulators(core_application._stats_engine.settings)
+    yield core_application
+    core_application._thread_accumulators = original
+
+
+def run_threads(target):
+    threads = [threading.Thread(target=target) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@reset_core_stats_engine()
+def test_thread_accumulators_metrics(core_application):
+    application = application_instance()
+
+    def _record():
+        for _ in range(CALLS):
+            application.record_custom_metric("Custom/Accumulated", 1)
+            application.record_custom_metrics([("Custom/Accumulated/Many", {"count": 2})])
+            application.record_dimensional_metric("Dimensional/Accumulated", 1, tags={"thread": "worker"})
+
+    run_threads(_record)
+
+    # Nothing is recorded against the stats engines until a harvest.
+    assert ("Custom/Accumulated", "") not in core_application._stats_custom_engine.stats_table
+    assert "Dimensional/Accumulated" not in core_application._stats_engine.dimensional_stats_table
+
+    core_application._merge_thread_accumulators()
+
+    stats_table = core_application._stats_custom_engine.stats_table
+    assert stats_table[("Custom/Accumulated", "")].call_count == THREADS * CALLS
+    assert stats_table[("Custom/Accumulated/Many", "")].call_count == 2 * THREADS * CALLS
+
+    (dimensional_stats,) = core_application._stats_engine.dimensional_stats_table.get("Dimensional/Accumulated").values()
+    assert dimensional_stats.call_count == THREADS * CALLS
+
+    # The accumulators are empty after a harvest.
+    assert core_application._thread_accumulators.harvest() == []
+
+
+@reset_core_stats_engine()
+def test_thread_accumulators_events(core_application):
+    application = application_instance()
+
+    def _record():
+        for index in range(CALLS):
+            application.record_custom_event("AccumulatedEvent", {"index": index})
+            application.record_ml_event("AccumulatedMLEvent", {"index": index})
+
+    run_threads(_record)
+    core_application._merge_thread_accumulators()
+
+    settings = core_application._stats_engine.settings
+    custom_events = core_application._stats_engine.custom_events
+    ml_events = core_application._stats_engine.ml_events
+
+    assert custom_events.num_seen == THREADS * CALLS
+    assert custom_events.num_samples == min(
+        THREADS * CALLS, settings.event_harvest_config.harvest_limits.custom_event_data
+    )
+    assert ml_events.num_seen == THREADS * CALLS
+    assert ml_events.num_samples == min(THREADS * CALLS, settings.event_harvest_config.harvest_limits.ml_event_data)
+
+
+@reset_core_stats_engine()
+def test_thread_accumulators_concurrent_harvest(core_application):
+    application = application_instance()
+    done = threading.Event()
+
+    def _harvest():
+        # Merge while the metrics are being recorded to check that no data
+        # is lost when the accumulators are swapped out.
+        while not done.is_set():
+            core_application._merge_thread_accumulators()
+
+    harvester = threading.Thread(target=_harvest)
+    harvester.start()
+
+    def _record():
+        for _ in range(CALLS * 10):
+            application.record_custom_metric("Custom/Concurrent", 1)
+
+    run_threads(_record)
+
+    done.set()
+    harvester.join()
+    core_application._merge_thread_accumulators()
+
+    stats_table = core_application._stats_custom_engine.stats_table
+    assert stats_table[("Custom/Concurrent", "")].call_count == THREADS * CALLS * 10
+
+
+@reset_core_stats_engine()
+def test_thread_accumulators_reservoir_shared(core_application):
+    application = application_instance()
+    recorded = threading.Barrier(THREADS + 1)
+    finished = threading.Event()
+
+    def _record():
+        application.record_custom_event("AccumulatedEvent", {})
+        recorded.wait(5.0)
+        finished.wait(5.0)
+
+    threads = [threading.Thread(target=_record) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        recorded.wait(5.0)
+        core_application._merge_thread_accumulators()
+
+        # The reservoirs for the next harvest share the harvest limit
+        # between the threads which are still running.
+
+        limit = core_application._stats_engine.settings.event_harvest_config.harvest_limits.custom_event_data
+        capacity = min(limit, max(limit // THREADS, MIN_THREAD_RESERVOIR_SIZE))
+
+        entries = core_application._thread_accumulators._entries
+        assert len(entries) == THREADS
+        for entry in entries:
+            assert entry.accumulator.custom_events.capacity == capacity
+    finally:
+        finished.set()
+        for thread in threads:
+            thread.join()
+
+
+@override_application_settings({"collect_custom_events": False})
+@reset_core_stats_engine()
+def test_thread_accumulators_events_not_collected(core_application):
+    application = application_instance()
+    events_account = core_application._global_events_account
+
+    run_threads(lambda: application.record_custom_event("AccumulatedEvent", {}))
+    core_application._merge_thread_accumulators()
+
+    # Events which are not collected are still counted, as they are when
+    # recorded directly into the stats engine.
+
+    assert core_application._stats_engine.custom_events.num_seen == 0
+    assert core_application._global_events_account == events_account + THREADS
+
+
+@reset_core_stats_engine()
+def test_thread_accumulators_released_without_threading(core_application):
+    application = application_instance()
+    done = threading.Semaphore(0)
+
+    def _record():
+        application.record_custom_metric("Custom/Released", 1)
+        done.release()
+
+    for _ in range(THREADS):
+        _thread.start_new_thread(_record, ())
+    for _ in range(THREADS):
+        assert done.acquire(timeout=5.0)
+
+    # The entries for threads not started through the threading module are
+    # released once the thread local storage of the thread is cleared.
+
+    entries = core_application._thread_accumulators._entries
+    deadline = time.time() + 5.0
+    while not all(entry.released for entry in entries) and time.time() < deadline:
+        time.sleep(0.01)
+
+    core_application._merge_thread_accumulators()
+
+    stats_table = core_application._stats_custom_engine.stats_table
+    assert stats_table[("Custom/Released", "")].call_count == THREADS
+    assert core_application._thread_accumulators._entries == []
@@ -0,0 +1,97 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+from testing_support.validators.validate_transaction_event_attributes import (
+    validate_transaction_event_attributes,
+)
+from testing_support.validators.validate_transaction_metrics import (
+    validate_transaction_metrics,
+)
+
+from newrelic.api.background_task import background_task
+from newrelic.api.transaction import current_transaction
+from newrelic.core.thread_utilization import thread_cpu_time
+from newrelic.core.trace_cache import trace_cache
+
+pytestmark = pytest.mark.skipif(thread_cpu_time is None, reason="Thread CPU time is not available")
+
+
+def burn_cpu(seconds):
+    start = thread_cpu_time()
+    while thread_cpu_time() - start < seconds:
+        pass
+
+
+@validate_transaction_event_attributes(required_params={"intrinsic": ("cpuTime",), "agent": (), "user": ()})
+@validate_transaction_metrics("cpu_bound", rollup_metrics=(("CPU/User/Transaction", 1),), background_task=True)
+@background_task(name="cpu_bound")
+def test_transaction_cpu_time():
+    burn_cpu(0.02)
+
+
+def test_transaction_cpu_time_excludes_io():
+    @background_task(name="io_bound")
+    def _test():
+        burn_cpu(0.02)
+        time.sleep(0.2)
+        return current_transaction()
+
+    transaction = _test()
+
+    assert 0.02 <= transaction._cpu_user_time_value < 0.2
+
+
+@validate_transaction_event_attributes(forgone_params={"intrinsic": ("cpuTime",), "agent": (), "user": ()})
+@validate_transaction_metrics("coroutine", rollup_metrics=(("CPU/User/Transaction", None),), background_task=True)
+def test_transaction_cpu_time_not_in_coroutine():
+    # The CPU time of the thread running an event loop is shared by all
+    # of the tasks it runs, so is not attributed to a transaction.
+
+    @background_task(name="coroutine")
+    async def _test():
+        burn_cpu(0.02)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(loop.create_task(_test()))
+    finally:
+        loop.close()
+
+
+class Greenlet:
+    # A greenlet other than the root greenlet of a thread has a parent.
+    parent = object()
+
+
+@validate_transaction_event_attributes(forgone_params={"intrinsic": ("cpuTime",), "agent": (), "user": ()})
+@validate_transaction_metrics("greenlet", rollup_metrics=(("CPU/User/Transaction", None),), background_task=True)
+def test_transaction_cpu_time_not_in_greenlet(monkeypatch):
+    # When threading is monkey patched by gevent, the ID of the current
+    # thread is that of the current greenlet.
+
+    greenlet = Greenlet()
+    monkeypatch.setitem(trace_cache().__dict__, "greenlet", types.SimpleNamespace(getcurrent=lambda: greenlet))
+    monkeypatch.setattr(threading, "get_ident", lambda: id(greenlet))
+
+    @background_task(name="greenlet")
+    def _test():
+        burn_cpu(0.02)
+
+    _test()
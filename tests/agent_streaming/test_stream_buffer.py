@@ -85,3 +85,47 @@ def test_stream_buffer_queue_size():
     assert len(stream_buffer) == 1
     assert stream_buffer._dropped == 1
     assert stream_buffer._seen == 2
+
+
+def test_stream_buffer_backpressure_disabled():
+    stream_buffer = StreamBuffer(1)
+
+    assert all(stream_buffer.should_sample() for _ in range(100))
+    assert stream_buffer.sampling_stats() == (0, 0)
+
+
+def test_stream_buffer_backpressure_lowers_sampling_rate():
+    stream_buffer = StreamBuffer(1, backpressure_threshold=0.05, backpressure_window=0.0, minimum_sampling_rate=0.1)
+
+    # Overflow the queue so that three of the four spans seen are dropped
+    for _ in range(4):
+        stream_buffer.put(Span(intrinsics={}, agent_attributes={}, user_attributes={}))
+
+    stream_buffer.should_sample()
+    assert stream_buffer.sampling_rate == 0.25
+
+    # Further drops will not take the sampling rate below the minimum
+    for _ in range(4):
+        stream_buffer.put(Span(intrinsics={}, agent_attributes={}, user_attributes={}))
+
+    stream_buffer.should_sample()
+    assert stream_buffer.sampling_rate == 0.1
+
+    seen, sampled = stream_buffer.sampling_stats()
+    assert seen == 2
+    assert sampled <= seen
+    assert stream_buffer.sampling_stats() == (0, 0)
+
+
+def test_stream_buffer_backpressure_recovers():
+    stream_buffer = StreamBuffer(10, backpressure_threshold=0.05, backpressure_window=0.0)
+    stream_buffer.sampling_rate = 0.25
+
+    # No spans dropped within the window so the rate should recover
+    stream_buffer.put(Span(intrinsics={}, agent_attributes={}, user_attributes={}))
+    stream_buffer.should_sample()
+    assert stream_buffer.sampling_rate == 0.5
+
+    stream_buffer.should_sample()
+    stream_buffer.should_sample()
+    assert stream_buffer.sampling_rate == 1.0
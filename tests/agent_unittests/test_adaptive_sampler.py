@@ -0,0 +1,100 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import statistics
+import threading
+import types
+
+import pytest
+
+from newrelic.core import adaptive_sampler
+from newrelic.core.adaptive_sampler import AdaptiveSampler, LockFreeAdaptiveSampler
+
+SAMPLING_TARGET = 10
+SAMPLING_PERIOD = 60.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(adaptive_sampler, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def sampled_counts(sampler, clock, transactions_per_period, periods, threads=1):
+    counts = []
+
+    def _compute(count, results):
+        for _ in range(count):
+            results.append(sampler.compute_sampled())
+
+    for _ in range(periods):
+        results = []
+        workers = [
+            threading.Thread(target=_compute, args=(transactions_per_period // threads, results))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        counts.append(sum(results))
+        clock[0] += SAMPLING_PERIOD
+
+    return counts
+
+
+@pytest.mark.parametrize("transactions_per_period", (5, 50, 1000))
+def test_lock_free_sampler_same_decisions(clock, transactions_per_period):
+    decisions = []
+    for sampler_cls in (AdaptiveSampler, LockFreeAdaptiveSampler):
+        random.seed(1234)
+        clock[0] = 1000.0
+        sampler = sampler_cls(SAMPLING_TARGET, SAMPLING_PERIOD)
+
+        results = []
+        for period in range(5):
+            # Skip a whole period to exercise the double reset.
+            if period == 3:
+                clock[0] += SAMPLING_PERIOD
+            for _ in range(transactions_per_period):
+                results.append(sampler.compute_sampled())
+            clock[0] += SAMPLING_PERIOD
+
+        decisions.append(results)
+
+    assert decisions[0] == decisions[1]
+
+
+def test_lock_free_sampler_distribution(clock):
+    random.seed(5678)
+
+    periods = 200
+    locked = sampled_counts(AdaptiveSampler(SAMPLING_TARGET, SAMPLING_PERIOD), clock, 800, periods)
+    lock_free = sampled_counts(LockFreeAdaptiveSampler(SAMPLING_TARGET, SAMPLING_PERIOD), clock, 800, periods, 8)
+
+    # The first period samples at most the target, and the following periods
+    # at most twice the target.
+    assert lock_free[0] <= SAMPLING_TARGET
+    assert max(lock_free[1:]) <= 2 * SAMPLING_TARGET
+
+    locked_mean = statistics.mean(locked[1:])
+    lock_free_mean = statistics.mean(lock_free[1:])
+    assert abs(locked_mean - lock_free_mean) < 0.1 * locked_mean
+
+    locked_stdev = statistics.stdev(locked[1:])
+    lock_free_stdev = statistics.stdev(lock_free[1:])
+    assert abs(locked_stdev - lock_free_stdev) < 0.5 * locked_stdev
@@ -15,7 +15,9 @@
 import logging
 import os
 import ssl
+import stat
 import tempfile
+import time
 from collections import namedtuple
 
 import pytest
@@ -26,6 +28,12 @@ from newrelic.common.encoding_utils import json_decode, serverless_payload_decod
 from newrelic.common.utilization import CommonUtilization
 from newrelic.core.agent_protocol import AgentProtocol, ServerlessModeProtocol
 from newrelic.core.config import finalize_application_settings, global_settings
+from newrelic.core.connect_cache import (
+    connect_cache_path,
+    default_cache_directory,
+    load_connect_cache,
+    save_connect_cache,
+)
 from newrelic.core.internal_metrics import InternalTraceContext
 from newrelic.core.stats_engine import CustomMetrics
 from newrelic.network.exceptions import (
@@ -33,6 +41,7 @@ from newrelic.network.exceptions import (
     ForceAgentDisconnect,
     ForceAgentRestart,
     NetworkInterfaceException,
+    PayloadTooLargeForRequest,
     RetryDataForRequest,
 )
 
@@ -222,7 +231,7 @@ def test_send(status_code):
         (409, ForceAgentRestart, "INFO"),
         (410, ForceAgentDisconnect, "CRITICAL"),
         (411, DiscardDataForRequest, "WARNING"),
-        (413, DiscardDataForRequest, "WARNING"),
+        (413, PayloadTooLargeForRequest, "WARNING"),
         (414, DiscardDataForRequest, "WARNING"),
         (415, DiscardDataForRequest, "WARNING"),
         (417, DiscardDataForRequest, "WARNING"),
@@ -517,6 +526,94 @@ def test_connect_metadata(monkeypatch):
     assert connect_payload["metadata"] == {"NEW_RELIC_METADATA_FOOBAR": "foobar"}
 
 
+def test_connect_cache(tmp_path):
+    global AWS
+    settings = finalize_application_settings(
+        {
+            "connect_cache.enabled": True,
+            "connect_cache.directory": str(tmp_path),
+            "utilization.detect_aws": True,
+        }
+    )
+    AgentProtocol.connect(APP_NAME, LINKED_APPS, ENVIRONMENT, settings, client_cls=HttpClientRecorder)
+
+    entry = load_connect_cache(settings, PAYLOAD_APP_NAME)
+    assert entry["environment"] == ENVIRONMENT
+    assert entry["utilization"]["aws"] == AWS
+    assert "agent_run_id" in entry["configuration"]
+
+    # The cached utilization data is used rather than probing again.
+    expected_aws, AWS = AWS, Exception
+    HttpClientRecorder.SENT[:] = []
+
+    AgentProtocol.connect(APP_NAME, LINKED_APPS, ENVIRONMENT, settings, client_cls=HttpClientRecorder)
+
+    connect_payload = json_decode(HttpClientRecorder.SENT[1].payload.decode("utf-8"))[0]
+    assert connect_payload["utilization"]["vendors"]["aws"] == expected_aws
+    assert load_connect_cache(settings, PAYLOAD_APP_NAME)["created"] == entry["created"]
+
+    # Entries for other applications, and expired entries, are ignored.
+    assert load_connect_cache(settings, [APP_NAME]) is None
+
+    settings.connect_cache.ttl = 0.0
+    assert load_connect_cache(settings, PAYLOAD_APP_NAME) is None
+
+
+def test_connect_parent_protocol():
+    global AWS
+    settings = finalize_application_settings({"utilization.detect_aws": True})
+    parent = AgentProtocol.connect(APP_NAME, LINKED_APPS, ENVIRONMENT, settings, client_cls=HttpClientRecorder)
+    assert parent.redirect_host
+    assert parent.utilization["aws"] == AWS
+
+    # The redirect host and utilization data of the parent are reused,
+    # skipping the preconnect, but a new run is started.
+    expected_aws, AWS = AWS, Exception
+    HttpClientRecorder.SENT[:] = []
+
+    protocol = AgentProtocol.connect(
+        APP_NAME, LINKED_APPS, ENVIRONMENT, settings, client_cls=HttpClientRecorder, parent=parent
+    )
+
+    assert [request.params["method"] for request in HttpClientRecorder.SENT] == ["connect", "agent_settings"]
+    connect_payload = json_decode(HttpClientRecorder.SENT[0].payload.decode("utf-8"))[0]
+    assert connect_payload["utilization"]["vendors"]["aws"] == expected_aws
+    assert protocol.redirect_host == parent.redirect_host
+    assert protocol.configuration is not parent.configuration
+
+
+def test_connect_cache_default_directory_private(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    settings = finalize_application_settings({"connect_cache.enabled": True})
+
+    assert save_connect_cache(settings, [APP_NAME], {"created": 0})
+    assert stat.S_IMODE(os.stat(default_cache_directory()).st_mode) == 0o700
+
+
+def test_connect_cache_untrusted_directory(tmp_path):
+    settings = finalize_application_settings({"connect_cache.directory": str(tmp_path)})
+    assert save_connect_cache(settings, [APP_NAME], {"created": 0})
+
+    # A directory which other users can write to is not used.
+    tmp_path.chmod(0o777)
+    try:
+        assert not save_connect_cache(settings, [APP_NAME], {"created": 0})
+        assert load_connect_cache(settings, [APP_NAME]) is None
+    finally:
+        tmp_path.chmod(0o700)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid") or os.getuid() != 0, reason="Requires changing the owner of a file.")
+def test_connect_cache_untrusted_entry(tmp_path):
+    settings = finalize_application_settings({"connect_cache.directory": str(tmp_path)})
+    assert save_connect_cache(settings, [APP_NAME], {"created": time.time()})
+    assert load_connect_cache(settings, [APP_NAME]) is not None
+
+    # An entry written by another user is ignored.
+    os.chown(connect_cache_path(settings, [APP_NAME]), 1, 1)
+    assert load_connect_cache(settings, [APP_NAME]) is None
+
+
 def test_serverless_protocol_connect():
     settings = global_settings()
     protocol = ServerlessModeProtocol.connect(
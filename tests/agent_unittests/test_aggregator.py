@@ -0,0 +1,163 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import socket
+import stat
+import tempfile
+
+import pytest
+
+from newrelic.common.encoding_utils import json_decode, json_encode
+from newrelic.core.aggregator import Aggregator, default_socket_path
+from newrelic.core.config import finalize_application_settings
+from newrelic.core.stats_engine import StatsEngine
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Requires Unix domain sockets.")
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "aggregator.sock")
+
+
+@pytest.fixture
+def aggregators():
+    created = []
+
+    def _aggregator(path, callback=None):
+        aggregator = Aggregator(path, callback or (lambda app_name, snapshot: True), timeout=1.0)
+        created.append(aggregator)
+        return aggregator
+
+    yield _aggregator
+
+    for aggregator in created:
+        aggregator.close()
+
+
+def test_aggregator_election_and_send(socket_path, aggregators):
+    received = []
+
+    def callback(app_name, snapshot):
+        received.append((app_name, snapshot))
+        return True
+
+    harvester = aggregators(socket_path, callback)
+    worker = aggregators(socket_path)
+
+    assert harvester.elect()
+    assert harvester.is_harvester
+    assert not worker.elect()
+    assert not worker.is_harvester
+
+    assert worker.send("app", {"metrics": []})
+    assert received == [("app", {"metrics": []})]
+
+
+def test_aggregator_snapshot_not_merged(socket_path, aggregators):
+    harvester = aggregators(socket_path, lambda app_name, snapshot: False)
+    worker = aggregators(socket_path)
+
+    assert harvester.elect()
+
+    assert not worker.send("app", {})
+    assert not worker.is_harvester
+
+
+def test_aggregator_harvester_exits(socket_path, aggregators):
+    harvester = aggregators(socket_path)
+    worker = aggregators(socket_path)
+
+    assert harvester.elect()
+    harvester.close()
+
+    # The failed send triggers an election which the worker wins.
+    assert not worker.send("app", {})
+    assert worker.is_harvester
+
+
+def test_aggregator_directory_not_private(tmp_path, aggregators):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    directory.chmod(0o777)
+
+    assert not aggregators(str(directory / "aggregator.sock")).elect()
+
+
+def test_aggregator_default_socket_path_private(monkeypatch, tmp_path, aggregators):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    path = default_socket_path()
+    assert aggregators(path).elect()
+    assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+
+def test_aggregator_stale_socket_taken_over(socket_path, aggregators):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    assert aggregators(socket_path).elect()
+
+
+def test_stats_engine_aggregation_snapshot():
+    settings = finalize_application_settings(
+        {"application_logging.forwarding.enabled": True, "error_collector.enabled": True}
+    )
+
+    worker = StatsEngine()
+    worker.reset_stats(settings)
+    worker.record_custom_metric("Custom/Value", 2.0)
+    worker.record_dimensional_metric("Dimensional/Value", 2.0, tags={"tag": "value"})
+    worker.record_dimensional_metric("Dimensional/Count", {"count": 3})
+    worker.record_custom_event([{"type": "Event", "timestamp": 1}, {"key": "value"}])
+    worker.record_log_event("hello", "INFO", timestamp=1.0, priority=1.5)
+    try:
+        raise ValueError("oops")
+    except ValueError:
+        worker.notice_error()
+
+    harvester = StatsEngine()
+    harvester.reset_stats(settings)
+    harvester.record_custom_metric("Custom/Value", 4.0)
+    harvester.record_dimensional_metric("Dimensional/Value", 4.0, tags={"tag": "value"})
+
+    # The snapshot is sent between processes as JSON.
+    snapshot = json_decode(json_encode(worker.aggregation_snapshot()))
+    harvester.merge_aggregation_snapshot(snapshot)
+
+    stats = harvester.stats_table[("Custom/Value", "")]
+    assert stats.call_count == 2
+    assert stats.total_call_time == 6.0
+
+    dimensional_stats = harvester.dimensional_stats_table
+    stats = dimensional_stats.get("Dimensional/Value")[frozenset({("tag", "value")})]
+    assert stats.call_count == 2
+    assert stats.total_call_time == 6.0
+
+    stats = dimensional_stats.get("Dimensional/Count")[None]
+    assert type(stats).__name__ == "CountStats"
+    assert stats.call_count == 3
+
+    assert list(harvester.custom_events) == [[{"type": "Event", "timestamp": 1}, {"key": "value"}]]
+    assert harvester.custom_events.num_seen == 1
+
+    (log_event,) = list(harvester.log_events)
+    assert log_event.message == "hello"
+    assert log_event.level == "INFO"
+
+    assert harvester.error_events.num_seen == 1
+    (error,) = harvester.error_data()
+    assert error[2] == "oops"
@@ -0,0 +1,68 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import newrelic
+
+# Optional subsystems which are only imported once they are used, rather
+# than when the agent is imported and initialized.
+LAZY_MODULES = (
+    "grpc",
+    "newrelic.common.agent_http",
+    "newrelic.common.utilization",
+    "newrelic.console",
+    "newrelic.core.agent_protocol",
+    "newrelic.core.agent_streaming",
+    "newrelic.core.connect_cache",
+    "newrelic.core.data_collector",
+    "newrelic.core.otlp_utils",
+    "newrelic.core.profile_sessions",
+    "newrelic.hooks.mlmodel_sklearn",
+    "newrelic.packages.urllib3",
+)
+
+
+@pytest.fixture(scope="module")
+def imported_modules(tmp_path_factory):
+    root_directory = os.path.dirname(os.path.dirname(newrelic.__file__))
+
+    env = dict(os.environ)
+    env.pop("NEW_RELIC_CONFIG_FILE", None)
+    env["PYTHONPATH"] = root_directory
+
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import newrelic.agent; newrelic.agent.initialize()"],
+        env=env,
+        cwd=str(tmp_path_factory.mktemp("bootstrap")),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    return {line.split("|")[-1].strip() for line in output.splitlines() if line.startswith("import time:")}
+
+
+def test_bootstrap_imports_agent(imported_modules):
+    assert "newrelic.agent" in imported_modules
+    assert "newrelic.core.application" in imported_modules
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_bootstrap_lazy_imports(imported_modules, module):
+    assert module not in imported_modules
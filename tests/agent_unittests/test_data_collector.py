@@ -0,0 +1,118 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from newrelic.common.agent_http import DeveloperModeClient
+from newrelic.common.encoding_utils import json_decode
+from newrelic.core.config import finalize_application_settings
+from newrelic.core.data_collector import DeveloperModeSession
+from newrelic.core.internal_metrics import InternalTraceContext
+from newrelic.core.stats_engine import CustomMetrics
+from newrelic.network.exceptions import (
+    DiscardDataForRequest,
+    PayloadTooLargeForRequest,
+)
+
+
+class PayloadLimitClient(DeveloperModeClient):
+    MAX_EVENTS = None
+    FAIL_AFTER = None
+    SENT = []
+
+    def send_request(
+        self,
+        method="POST",
+        path="/agent_listener/invoke_raw_method",
+        params=None,
+        headers=None,
+        payload=None,
+    ):
+        agent_method = params["method"]
+        if agent_method.endswith("_event_data"):
+            decoded = json_decode(payload.decode("utf-8"))
+            if agent_method == "log_event_data":
+                sampling_info, events = None, decoded[0]["logs"]
+            else:
+                sampling_info, events = decoded[1], decoded[2]
+
+            if len(events) > self.MAX_EVENTS:
+                return 413, b""
+            if self.FAIL_AFTER is not None and len(self.SENT) >= self.FAIL_AFTER:
+                return 503, b""
+
+            self.SENT.append((sampling_info, events))
+
+        return super(PayloadLimitClient, self).send_request(method, path, params, headers, payload)
+
+
+class PayloadLimitSession(DeveloperModeSession):
+    CLIENT = PayloadLimitClient
+
+
+@pytest.fixture
+def session():
+    PayloadLimitClient.MAX_EVENTS = 2
+    PayloadLimitClient.FAIL_AFTER = None
+    PayloadLimitClient.SENT = []
+
+    settings = finalize_application_settings({"developer_mode": True, "license_key": "123LICENSEKEY"})
+    return PayloadLimitSession("app", [], {}, settings)
+
+
+@pytest.mark.parametrize(
+    "send_method",
+    ("send_transaction_events", "send_custom_events", "send_span_events", "send_error_events"),
+)
+def test_event_payload_split_on_413(session, send_method):
+    samples = [[{"index": i}, {}, {}] for i in range(5)]
+    sampling_info = {"reservoir_size": 10, "events_seen": 7}
+
+    internal_metrics = CustomMetrics()
+    with InternalTraceContext(internal_metrics):
+        getattr(session, send_method)(sampling_info, samples)
+
+    sent = PayloadLimitClient.SENT
+    assert [events for _, events in sent] == [samples[:2], samples[2:3], samples[3:]]
+    assert sum(info["reservoir_size"] for info, _ in sent) == 10
+    assert sum(info["events_seen"] for info, _ in sent) == 7
+
+    # One split of all five samples, then one of the larger half.
+    metrics = dict(internal_metrics.metrics())
+    method = {"send_transaction_events": "analytic_event_data"}.get(send_method, send_method[5:-1] + "_data")
+    assert metrics[f"Supportability/Python/Collector/{method}/Split"][0] == 2
+
+
+def test_log_event_payload_split_on_413(session):
+    log = type("Log", (), {"_asdict": lambda self: {"message": "hello"}})()
+
+    session.send_log_events({"reservoir_size": 10, "events_seen": 3}, [log] * 3)
+
+    assert [len(events) for _, events in PayloadLimitClient.SENT] == [1, 2]
+
+
+def test_event_payload_single_sample_too_large(session):
+    PayloadLimitClient.MAX_EVENTS = 0
+
+    with pytest.raises(PayloadTooLargeForRequest):
+        session.send_span_events({"reservoir_size": 10, "events_seen": 1}, [[{}, {}, {}]])
+
+
+def test_event_payload_split_retry_after_partial_send_discards(session):
+    PayloadLimitClient.FAIL_AFTER = 1
+
+    with pytest.raises(DiscardDataForRequest):
+        session.send_span_events({"reservoir_size": 10, "events_seen": 4}, [[{}, {}, {}]] * 4)
+
+    assert len(PayloadLimitClient.SENT) == 1
@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import random
 import tempfile
+import threading
 import time
 
 import pytest
@@ -25,8 +27,10 @@ from testing_support.fixtures import (
 
 from newrelic.common.agent_http import DeveloperModeClient
 from newrelic.common.object_wrapper import function_wrapper, transient_function_wrapper
+from newrelic.core.aggregator import Aggregator
 from newrelic.core.application import Application
 from newrelic.core.config import finalize_application_settings, global_settings
+from newrelic.core.connect_cache import save_connect_cache
 from newrelic.core.custom_event import create_custom_event
 from newrelic.core.error_node import ErrorNode
 from newrelic.core.function_node import FunctionNode
@@ -168,6 +172,7 @@ def transaction_node(request):
         root_span_guid=None,
         trace_id="4485b89db608aece",
         loop_time=0.0,
+        gc_pause_time=0.0,
     )
     return node
 
@@ -296,6 +301,105 @@ def test_application_harvest():
         assert f.read()
 
 
+aggregated_endpoints_called = []
+
+
+@validate_metric_payload(metrics=[("Custom/Worker", 1)], endpoints_called=aggregated_endpoints_called)
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+        "license_key": "**NOT A LICENSE KEY**",
+        "feature_flag": set(),
+    },
+)
+def test_application_forward_harvest(transaction_node):
+    path = os.path.join(tempfile.mkdtemp(), "aggregator.sock")
+
+    harvester_app = Application("Python Agent Test (Harvest Loop)")
+    harvester_app.connect_to_data_collector(None)
+    worker_app = Application("Python Agent Test (Harvest Loop)")
+    worker_app.connect_to_data_collector(None)
+
+    def merge(app_name, snapshot):
+        harvester_app.merge_aggregation_snapshot(snapshot)
+        return True
+
+    harvester = Aggregator(path, merge)
+    worker = Aggregator(path, merge)
+    try:
+        assert harvester.elect()
+
+        worker_app.record_custom_metric("Custom/Worker", 1)
+        worker_app.record_dimensional_metric("Dimensional/Worker", 1, tags={"tag": "value"})
+        node = transaction_node._replace(settings=worker_app.configuration, apdex_t=0.0)
+        node.include_transaction_trace_request_uri = False
+        worker_app.record_transaction(node)
+        del aggregated_endpoints_called[:]
+
+        # Only the transaction traces are reported by the worker itself.
+        assert worker_app.forward_harvest(worker)
+        assert aggregated_endpoints_called == ["transaction_sample_data"]
+        assert ("Dimensional/Worker", {"tag": "value"}) in harvester_app._stats_engine.dimensional_stats_table
+
+        harvester_app.harvest()
+        assert "metric_data" in aggregated_endpoints_called
+    finally:
+        harvester.close()
+
+
+@pytest.mark.parametrize("thread_local_accumulators", (False, True))
+def test_application_after_fork_in_child(thread_local_accumulators):
+    @validate_metric_payload(metrics=[("Custom/BeforeFork", None), ("Custom/AfterFork", 1)])
+    @override_generic_settings(
+        settings,
+        {
+            "developer_mode": True,
+            "license_key": "**NOT A LICENSE KEY**",
+            "feature_flag": set(),
+            "thread_local_accumulators.enabled": thread_local_accumulators,
+        },
+    )
+    def _test():
+        _application_after_fork_in_child()
+
+    _test()
+
+
+def _application_after_fork_in_child():
+    app = DelayedConnectApplication("Python Agent Test (Harvest Loop)")
+    app.allow_connect.set()
+    app.connect_to_data_collector(None)
+    app.record_custom_metric("Custom/BeforeFork", 1)
+    parent_session = app._active_session
+
+    app.allow_connect.clear()
+    app.after_fork_in_child()
+
+    # Data is recorded straight away using the parent's configuration, but
+    # is only reported once this process has registered its own session.
+    assert app.configuration is parent_session.configuration
+    app.record_custom_metric("Custom/AfterFork", 1)
+    app.record_dimensional_metric("Dimensional/AfterFork", 1)
+    try:
+        raise ValueError("After fork")
+    except ValueError:
+        app.notice_error()
+
+    app.allow_connect.set()
+    assert app._connected_event.wait(5.0)
+    assert app._active_session is not parent_session
+    assert app._active_session._protocol.redirect_host == parent_session._protocol.redirect_host
+    assert app._harvest_enabled
+
+    # The error traces and dimensional metrics recorded while the session
+    # was being registered are kept along with the metrics.
+    assert app._stats_engine.error_data()
+    assert "Dimensional/AfterFork" in app._stats_engine.dimensional_stats_table
+
+    app.harvest()
+
+
 @override_generic_settings(
     settings,
     {
@@ -421,6 +525,47 @@ def test_application_harvest_with_span_streaming(
     _test()
 
 
+@pytest.mark.parametrize("otlp_export", (set(), {"span_event_data"}))
+def test_application_harvest_with_otlp_span_export(otlp_export):
+    protocols_called = []
+
+    @transient_function_wrapper("newrelic.core.agent_protocol", "AgentProtocol.send")
+    def send_request_wrapper(wrapped, instance, args, kwargs):
+        def _bind_params(method, payload=(), *args, **kwargs):
+            return method, payload
+
+        method, payload = _bind_params(*args, **kwargs)
+        if method == "span_event_data":
+            protocols_called.append(type(instance).__name__)
+
+        return wrapped(*args, **kwargs)
+
+    @send_request_wrapper
+    @override_generic_settings(
+        settings,
+        {
+            "developer_mode": True,
+            "license_key": "**NOT A LICENSE KEY**",
+            "distributed_tracing.enabled": True,
+            "span_events.enabled": True,
+            "otlp_export": otlp_export,
+        },
+    )
+    def _test():
+        app = Application("Python Agent Test (Harvest Loop)")
+        app.connect_to_data_collector(None)
+
+        app._stats_engine.span_events.add([{"type": "Span", "timestamp": 0}, {}, {}])
+        app.harvest()
+
+    _test()
+
+    if otlp_export:
+        assert protocols_called == ["OtlpProtocol"]
+    else:
+        assert protocols_called == ["AgentProtocol"]
+
+
 @failing_endpoint("metric_data")
 @pytest.mark.parametrize("span_events_enabled", (True, False))
 def test_failed_spans_harvest(span_events_enabled):
@@ -483,6 +628,118 @@ def test_transaction_count(transaction_node):
     assert app._transaction_count == 0
 
 
+class DelayedConnectApplication(Application):
+    def __init__(self, *args, **kwargs):
+        super(DelayedConnectApplication, self).__init__(*args, **kwargs)
+        self.allow_connect = threading.Event()
+
+    def connect_to_data_collector(self, activate_agent):
+        self.allow_connect.wait(5.0)
+        return super(DelayedConnectApplication, self).connect_to_data_collector(activate_agent)
+
+
+@pytest.mark.parametrize("max_transactions,buffered,dropped", ((2, 2, 1), (0, 0, 3)))
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+        "license_key": "**NOT A LICENSE KEY**",
+        "feature_flag": set(),
+        "preconnect_buffer.enabled": True,
+    },
+)
+def test_preconnect_buffer(transaction_node, max_transactions, buffered, dropped):
+    settings.preconnect_buffer.max_transactions = max_transactions
+
+    app = DelayedConnectApplication("Python Agent Test (Harvest Loop)")
+    app.activate_session(None, timeout=0)
+
+    # Transactions are recorded using the local settings until the session
+    # is active, without the application being treated as registered.
+    preconnect_settings = app.preconnect_configuration
+    assert preconnect_settings is not None
+    assert app.configuration is None
+    assert not app.active
+
+    dimensional_metrics = DimensionalMetrics()
+    dimensional_metrics.record_dimensional_metric("Dimensional/Preconnect", 1)
+
+    node = transaction_node._replace(settings=preconnect_settings, dimensional_metrics=dimensional_metrics)
+    for _ in range(3):
+        app.record_transaction(node)
+
+    # Transactions started using other settings are not buffered.
+    app.record_transaction(transaction_node)
+
+    app.allow_connect.set()
+    assert app._connected_event.wait(5.0)
+    assert app.configuration is not preconnect_settings
+    assert app.preconnect_configuration is None
+    assert app._transaction_count == buffered
+
+    # The error traces and dimensional metrics of the buffered transactions
+    # are kept along with the metrics and events.
+    assert bool(app._stats_engine.error_data()) == bool(buffered)
+    assert ("Dimensional/Preconnect" in app._stats_engine.dimensional_stats_table) == bool(buffered)
+
+    @validate_metric_payload(
+        metrics=[
+            ("OtherTransaction/Function/main", buffered or None),
+            ("Supportability/Python/PreconnectBuffer/Transactions", buffered),
+            ("Supportability/Python/PreconnectBuffer/Dropped", dropped),
+        ]
+    )
+    def _harvest():
+        app.harvest()
+
+    _harvest()
+
+
+@override_generic_settings(
+    settings,
+    {
+        "developer_mode": True,
+        "license_key": "**NOT A LICENSE KEY**",
+        "feature_flag": set(),
+        "connect_cache.enabled": True,
+    },
+)
+def test_connect_cache_preconnect_configuration(tmp_path):
+    settings.connect_cache.directory = str(tmp_path)
+
+    app = DelayedConnectApplication("Python Agent Test (Harvest Loop)")
+    save_connect_cache(
+        settings,
+        [app.name],
+        {
+            "created": time.time(),
+            "configuration": {
+                "agent_run_id": "cached",
+                "apdex_t": 0.25,
+                "transaction_name_rules": [{"match_expression": "/cached/.*", "replacement": "/cached/*"}],
+            },
+            "utilization": {},
+            "environment": [["Cached", "environment"]],
+        },
+    )
+
+    app.activate_session(None, timeout=0)
+
+    # The cached server side configuration is used until the session is
+    # registered in the background.
+    assert app._active_session is None
+    assert app.preconnect_configuration.apdex_t == 0.25
+    assert app.normalize_name("WebTransaction/Uri/cached/path", "transaction") == (
+        "WebTransaction/Uri/cached/*",
+        False,
+    )
+
+    app.allow_connect.set()
+    assert app._connected_event.wait(5.0)
+    assert app._environment == [["Cached", "environment"]]
+    assert app.configuration.agent_run_id != "cached"
+
+
 @override_generic_settings(
     settings,
     {
@@ -0,0 +1,54 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from testing_support.fixtures import override_generic_settings
+
+from newrelic.core.config import HotFlags, finalize_application_settings, global_settings, hot_flags
+
+
+@pytest.mark.parametrize(
+    "server_side_config,flag,expected",
+    (
+        ({}, "collect_span_events", True),
+        ({"collect_span_events": False}, "collect_span_events", False),
+        ({"span_events.enabled": False}, "collect_span_events", False),
+        ({"distributed_tracing.enabled": False}, "collect_span_events", False),
+        ({"collect_error_events": False}, "collect_error_events", False),
+        ({"error_collector.capture_events": False}, "collect_error_events", False),
+        ({"error_collector.enabled": False}, "observe_errors", False),
+        ({"collect_traces": False}, "collect_transaction_traces", False),
+        ({"application_logging.forwarding.enabled": False}, "log_forwarding", False),
+        ({"application_logging.enabled": False}, "log_metrics", False),
+    ),
+)
+def test_hot_flags_finalized(server_side_config, flag, expected):
+    settings = finalize_application_settings(server_side_config)
+
+    assert isinstance(settings.hot_flags, HotFlags)
+    assert hot_flags(settings) is settings.hot_flags
+    assert getattr(settings.hot_flags, flag) is expected
+
+
+def test_hot_flags_global_settings():
+    settings = global_settings()
+    assert settings.hot_flags is None
+
+    @override_generic_settings(settings, {"application_logging.local_decorating.enabled": True})
+    def _test():
+        # Settings which have not been finalized are always checked as is.
+        assert hot_flags(settings).log_local_decorating
+
+    _test()
+    assert not hot_flags(settings).log_local_decorating
@@ -26,11 +26,13 @@ from testing_support.mock_external_http_server import MockExternalHTTPServer
 
 from newrelic.common import certs
 from newrelic.common.agent_http import (
+    AdaptiveCompressionLevel,
     ApplicationModeClient,
     DeveloperModeClient,
     HttpClient,
     InsecureHttpClient,
     ServerlessModeClient,
+    compression_codec,
 )
 from newrelic.common.encoding_utils import ensure_str
 from newrelic.common.object_names import callable_name
@@ -349,6 +351,70 @@ def test_http_payload_compression(server, client_cls, method, threshold):
     assert sent_payload == payload
 
 
+@pytest.mark.parametrize("compression_target_ratio", (None, 4.0))
+def test_http_payload_compression_options(server, compression_target_ratio):
+    payload = b"abcdefghij" * 1000
+
+    with HttpClient(
+        "localhost",
+        server.port,
+        disable_certificate_validation=True,
+        compression_threshold=0,
+        compression_target_ratio=compression_target_ratio,
+    ) as client:
+        for _ in range(3):
+            status, data = client.send_request(payload=payload)
+            assert status == 200
+
+            content_length = int(data.split(b"content-length: ", 1)[1].split(b"\n", 1)[0])
+            sent_payload = data[-content_length:]
+            decompressor = zlib.decompressobj(31)
+            assert decompressor.decompress(sent_payload) + decompressor.flush() == payload
+
+
+def test_adaptive_compression_level():
+    codec = compression_codec("gzip")
+    adaptive = AdaptiveCompressionLevel(codec, target_ratio=10.0)
+    size = 100000
+
+    assert adaptive.level(size) == 1
+
+    # Missing the target steps up one level at a time, up to the maximum.
+    for expected in range(2, 10):
+        adaptive.update(size, size // 2)
+        assert adaptive.level(size) == expected
+    adaptive.update(size, size // 2)
+    assert adaptive.level(size) == 9
+
+    # Payloads of a different size are tracked independently.
+    assert adaptive.level(size * 4) == 1
+
+    # Meeting the target without headroom holds the level.
+    adaptive.update(size, size // 10)
+    assert adaptive.level(size) == 9
+
+    # Clearing the target with headroom steps back down.
+    adaptive.update(size, size // 20)
+    assert adaptive.level(size) == 8
+
+
+def test_unknown_compression_method_falls_back_to_gzip(server, caplog):
+    payload = b"*" * 20
+
+    with HttpClient(
+        "localhost",
+        server.port,
+        disable_certificate_validation=True,
+        compression_method="unknown",
+        compression_threshold=0,
+    ) as client:
+        status, data = client.send_request(payload=payload)
+
+    assert status == 200
+    assert b"content-encoding: gzip" in data
+    assert "'unknown' is not available" in caplog.text
+
+
 def test_cert_path(server):
     with HttpClient("localhost", server.port, ca_bundle_path=CERT_PATH) as client:
         status, data = client.send_request()
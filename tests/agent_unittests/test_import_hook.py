@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import configparser
+
 import newrelic.api.import_hook as import_hook
+import newrelic.config
 import pytest
 
 from newrelic.config import _module_function_glob
@@ -54,6 +57,72 @@ def test_import_hook_finder(monkeypatch):
     assert module is not None
 
 
+def test_lazy_import_hooks(monkeypatch):
+    monkeypatch.setattr(import_hook, "_import_hooks", {})
+    monkeypatch.setattr(import_hook, "_lazy_import_hooks", {})
+
+    fired = []
+
+    def factory(name, label):
+        def _hook(module):
+            fired.append((name, label))
+
+        return _hook
+
+    import_hook.register_lazy_import_hooks(
+        {"newrelic.api": ("imported",), "lazy_module_does_not_exist": ("lazy",)}, factory
+    )
+
+    # Hooks for modules already imported are fired immediately, while those
+    # for other modules are only registered when the module is imported.
+    assert fired == [("newrelic.api", "imported")]
+    assert "lazy_module_does_not_exist" not in import_hook._import_hooks
+    assert "lazy_module_does_not_exist" in import_hook._lazy_import_hooks
+
+    finder = import_hook.ImportHookFinder()
+    assert finder.find_spec("lazy_module_does_not_exist") is None
+
+    assert "lazy_module_does_not_exist" not in import_hook._lazy_import_hooks
+    assert import_hook._import_hooks["lazy_module_does_not_exist"]
+
+    # Registering a further hook for a module keeps the lazy hook first.
+    import_hook.register_lazy_import_hooks({"other_lazy_module": ("lazy",)}, factory)
+    import_hook.register_import_hook("other_lazy_module", hook)
+    assert len(import_hook._import_hooks["other_lazy_module"]) == 2
+    assert import_hook._import_hooks["other_lazy_module"][1] is hook
+
+
+def test_builtin_module_hooks(monkeypatch):
+    config_object = configparser.RawConfigParser()
+    config_object.read_string("[import-hook:disabled_module]\nenabled = false\n")
+
+    monkeypatch.setattr(newrelic.config, "_config_object", config_object)
+    monkeypatch.setattr(newrelic.config, "_module_import_hook_registry", {"registered_module": ("hooks", "instrument")})
+    monkeypatch.setattr(newrelic.config, "_module_import_hook_results", {})
+    monkeypatch.setattr(import_hook, "_import_hooks", {})
+    monkeypatch.setattr(import_hook, "_lazy_import_hooks", {})
+    monkeypatch.setattr(
+        newrelic.config,
+        "_BUILTIN_MODULE_HOOKS",
+        (
+            ("lazy_module", "hooks", "instrument_lazy"),
+            ("lazy_module", "hooks", "instrument_duplicate"),
+            ("disabled_module", "hooks", "instrument_disabled"),
+            ("registered_module", "hooks", "instrument_registered"),
+        ),
+    )
+
+    newrelic.config._process_module_builtin_defaults()
+
+    assert newrelic.config._module_import_hook_registry == {
+        "registered_module": ("hooks", "instrument"),
+        "lazy_module": ("hooks", "instrument_lazy"),
+    }
+    assert newrelic.config._module_import_hook_results == {("lazy_module", "hooks", "instrument_lazy"): None}
+    assert list(import_hook._lazy_import_hooks) == ["lazy_module"]
+    assert import_hook._import_hooks == {}
+
+
 @pytest.mark.parametrize("input,expected", [
     ("*", {"run", "A.run", "B.run"}),
     ("NotFound.*", set()),
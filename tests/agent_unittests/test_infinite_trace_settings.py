@@ -80,3 +80,32 @@ def test_infinite_tracing_span_queue_size(ini, env, expected_size, global_settin
 
     settings = global_settings()
     assert settings.infinite_tracing.span_queue_size == expected_size
+
+
+INI_FILE_INFINITE_TRACING_BACKPRESSURE = b"""
+[newrelic]
+infinite_tracing.backpressure.enabled = true
+infinite_tracing.backpressure.drop_threshold = 0.25
+"""
+
+
+# Tests for loading Infinite Tracing back-pressure settings
+# and testing values precedence
+@pytest.mark.parametrize(
+    "ini,env,expected_enabled,expected_threshold",
+    (
+        (INI_FILE_EMPTY, {}, False, 0.05),
+        (INI_FILE_EMPTY, {"NEW_RELIC_INFINITE_TRACING_BACKPRESSURE_ENABLED": "true"}, True, 0.05),
+        (INI_FILE_EMPTY, {"NEW_RELIC_INFINITE_TRACING_BACKPRESSURE_DROP_THRESHOLD": "0.5"}, False, 0.5),
+        (
+            INI_FILE_INFINITE_TRACING_BACKPRESSURE,
+            {"NEW_RELIC_INFINITE_TRACING_BACKPRESSURE_DROP_THRESHOLD": "0.5"},
+            True,
+            0.25,
+        ),
+    ),
+)
+def test_infinite_tracing_backpressure(ini, env, expected_enabled, expected_threshold, global_settings):
+    settings = global_settings()
+    assert settings.infinite_tracing.backpressure.enabled == expected_enabled
+    assert settings.infinite_tracing.backpressure.drop_threshold == expected_threshold
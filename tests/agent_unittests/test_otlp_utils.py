@@ -0,0 +1,201 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+
+import pytest
+
+from newrelic.core.log_event_node import LogEventNode
+from newrelic.core.otlp_utils import (
+    encode_custom_event_data,
+    encode_error_event_data,
+    encode_log_event_data,
+    encode_span_event_data,
+    encode_transaction_event_data,
+    otlp_content_setting,
+    otlp_encode,
+)
+
+if otlp_content_setting == "protobuf":
+    from google.protobuf.json_format import MessageToDict
+
+    from newrelic.packages.opentelemetry_proto.logs_pb2 import LogsData
+    from newrelic.packages.opentelemetry_proto.trace_pb2 import TracesData
+else:
+    LogsData = TracesData = MessageToDict = None
+
+
+def decode_log_records(payload):
+    # Round trip the payload through the wire format to validate the encoding.
+    if otlp_content_setting == "protobuf":
+        payload = LogsData.FromString(otlp_encode(payload))
+        payload = MessageToDict(payload, use_integers_for_enums=True, preserving_proto_field_name=True)
+
+    resource_logs = payload["resource_logs"]
+    assert len(resource_logs) == 1
+    log_records = resource_logs[0]["scope_logs"][0]["log_records"]
+
+    decoded = []
+    for log_record in log_records:
+        attributes = {}
+        for attribute in log_record.get("attributes") or []:
+            (_, value) = next(iter(attribute["value"].items()))
+            attributes[attribute["key"]] = value
+        decoded.append((int(log_record["time_unix_nano"]), attributes, log_record))
+    return decoded
+
+
+def decode_spans(payload):
+    # Round trip the payload through the wire format to validate the encoding.
+    if otlp_content_setting == "protobuf":
+        payload = TracesData.FromString(otlp_encode(payload))
+        payload = MessageToDict(payload, use_integers_for_enums=True, preserving_proto_field_name=True)
+
+    resource_spans = payload["resource_spans"]
+    assert len(resource_spans) == 1
+    spans = resource_spans[0]["scope_spans"][0]["spans"]
+
+    decoded = []
+    for span in spans:
+        attributes = {}
+        for attribute in span.get("attributes") or []:
+            (_, value) = next(iter(attribute["value"].items()))
+            attributes[attribute["key"]] = value
+        decoded.append((attributes, span))
+    return decoded
+
+
+def otlp_id(value):
+    # Ids are base64 encoded bytes when decoded from protobuf to a dict.
+    if otlp_content_setting == "protobuf":
+        return base64.b64encode(bytes.fromhex(value)).decode("ascii")
+    return value
+
+
+@pytest.mark.parametrize(
+    "encoder,event,event_domain",
+    (
+        (
+            encode_transaction_event_data,
+            [{"type": "Transaction", "timestamp": 1000}, {"user": "attr"}, {}],
+            "newrelic.transaction_events",
+        ),
+        (
+            encode_error_event_data,
+            [{"type": "TransactionError", "timestamp": 1000, "parentId": None}, {"user": "attr"}, {}],
+            "newrelic.error_events",
+        ),
+        (
+            encode_custom_event_data,
+            [{"type": "MyEvent", "timestamp": 1000}, {"user": "attr"}],
+            "newrelic.custom_events",
+        ),
+    ),
+)
+def test_encode_event_data(encoder, event, event_domain):
+    decoded = decode_log_records(encoder([event], "1234"))
+
+    assert len(decoded) == 1
+    time_unix_nano, attributes, _ = decoded[0]
+
+    assert time_unix_nano == 1000 * 1000000
+    assert attributes["event.domain"] == event_domain
+    assert attributes["event.name"] == event[0]["type"]
+    assert attributes["user"] == "attr"
+    assert "timestamp" not in attributes
+    # None values are dropped rather than encoded
+    assert "parentId" not in attributes
+
+
+def test_encode_event_data_intrinsics_take_precedence():
+    event = [{"type": "TransactionError", "name": "intrinsic", "timestamp": 1000}, {"name": "user"}, {"name": "agent"}]
+    decoded = decode_log_records(encode_error_event_data([event]))
+
+    assert decoded[0][1]["name"] == "intrinsic"
+
+
+def test_encode_span_event_data():
+    event = [
+        {
+            "type": "Span",
+            "name": "External/example.com/requests/GET",
+            "traceId": "0af7651916cd43dd8448eb211c80319c",
+            "guid": "b7ad6b7169203331",
+            "parentId": "00f067aa0ba902b7",
+            "timestamp": 1000,
+            "duration": 0.5,
+            "category": "http",
+            "span.kind": "client",
+        },
+        {"user": "attr"},
+        {"error.class": "ValueError", "error.message": "oops"},
+    ]
+    decoded = decode_spans(encode_span_event_data([event], "1234"))
+
+    assert len(decoded) == 1
+    attributes, span = decoded[0]
+
+    assert span["name"] == "External/example.com/requests/GET"
+    assert span["trace_id"] == otlp_id("0af7651916cd43dd8448eb211c80319c")
+    assert span["span_id"] == otlp_id("b7ad6b7169203331")
+    assert span["parent_span_id"] == otlp_id("00f067aa0ba902b7")
+    assert int(span["kind"]) == 3
+    assert int(span["start_time_unix_nano"]) == 1000 * 1000000
+    assert int(span["end_time_unix_nano"]) == 1000 * 1000000 + 500000000
+    assert int(span["status"]["code"]) == 2
+    assert span["status"]["message"] == "oops"
+
+    # Fields with a native OTLP representation are not repeated as attributes.
+    assert "guid" not in attributes
+    assert "timestamp" not in attributes
+    assert attributes["category"] == "http"
+    assert attributes["user"] == "attr"
+
+
+def test_encode_span_event_data_root_span():
+    event = [{"type": "Span", "name": "Function/foo", "traceId": "8448eb211c80319c", "guid": "invalid", "timestamp": 0}]
+    decoded = decode_spans(encode_span_event_data([event]))
+
+    attributes, span = decoded[0]
+
+    # Short trace ids are left padded, and invalid ids are not sent.
+    assert span["trace_id"] == otlp_id("00000000000000008448eb211c80319c")
+    assert "span_id" not in span
+    assert "parent_span_id" not in span
+    assert int(span["kind"]) == 1
+    assert "status" not in span
+
+
+@pytest.mark.parametrize(
+    "timestamp,expected",
+    (
+        (1700000000.5, 1700000000500000000),
+        (1700000000500, 1700000000500000000),
+    ),
+)
+def test_encode_log_event_data(timestamp, expected):
+    log = LogEventNode(
+        timestamp=timestamp,
+        level="WARNING",
+        message="A log message",
+        attributes={"context.key": "value", "trace.id": "0af7651916cd43dd8448eb211c80319c"},
+    )
+    decoded = decode_log_records(encode_log_event_data([log], {"tags.env": "test"}, "1234"))
+
+    time_unix_nano, attributes, log_record = decoded[0]
+    assert time_unix_nano == expected
+    assert attributes["context.key"] == "value"
+    assert log_record["severity_text"] == "WARNING"
+    assert int(log_record["severity_number"]) == 13
+    assert log_record["body"]["string_value"] == "A log message"
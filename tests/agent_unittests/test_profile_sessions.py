@@ -0,0 +1,114 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import time
+
+import pytest
+from testing_support.fixtures import override_generic_settings
+
+from newrelic.core.config import global_settings
+from newrelic.core.profile_sessions import ProfileSession, ProfileSessionManager, format_stack_trace
+
+SETTINGS = global_settings()
+
+
+def _sample(code_cache=None):
+    return format_stack_trace(sys._getframe(), "REQUEST", code_cache)
+
+
+def test_format_stack_trace_leaf_node():
+    frame = sys._getframe()
+    stack_trace = format_stack_trace(frame, "REQUEST")
+
+    code = frame.f_code
+    method, leaf = stack_trace[-2], stack_trace[-1]
+
+    assert method[:3] == (code.co_filename, code.co_name, code.co_firstlineno)
+    assert leaf[2] == leaf[3] == method[3]
+
+
+def test_format_stack_trace_cached():
+    code_cache = {}
+
+    samples = [_sample(code_cache) for _ in range(2)]
+    uncached = [_sample() for _ in range(2)]
+
+    assert list(samples[0]) == list(samples[1])
+
+    # Only the line of the test function taking the sample differs.
+
+    assert list(samples[0])[-2:] == list(uncached[0])[-2:]
+
+    # A line within a code object is only formatted once, with the tuples
+    # being reused by later samples.
+
+    for first, second in zip(samples[0], samples[1]):
+        assert first is second
+
+    assert not all(first is second for first, second in zip(uncached[0], uncached[1]))
+
+
+@pytest.mark.parametrize(
+    "sample_time,overhead_budget,expected",
+    (
+        (0.001, 0.05, 0.1),
+        (0.01, 0.05, 0.2),
+        (0.1, 0.05, 2.0),
+        (1.0, 0.05, 5.0),
+        (1.0, 0.0, 0.1),
+    ),
+)
+def test_adapt_sample_period(sample_time, overhead_budget, expected):
+    @override_generic_settings(
+        SETTINGS, {"thread_profiler.overhead_budget": overhead_budget, "thread_profiler.max_sample_period": 5.0}
+    )
+    def _test():
+        manager = ProfileSessionManager()
+        manager.sample_period_s = 0.1
+
+        assert manager.adapt_sample_period(sample_time) == pytest.approx(expected)
+
+    _test()
+
+
+def test_overhead_metrics():
+    manager = ProfileSessionManager()
+
+    # The session is set up directly, so that a profiler thread is not
+    # started to take samples.
+
+    manager.full_profile_session = ProfileSession(1, time.time() + 60)
+    manager.full_profile_app = "app"
+    manager.sample_period_s = 0.1
+    manager.current_sample_period_s = 0.2
+
+    manager.record_overhead(0.01, 3)
+
+    metrics = dict(manager.overhead_metrics("app"))
+    assert metrics["Supportability/Python/Profiler/SampleTime"].total_call_time == 0.01
+    assert metrics["Supportability/Python/Profiler/SamplePeriod"].total_call_time == 0.2
+    assert metrics["Supportability/Python/Profiler/Threads"].total_call_time == 3
+    assert metrics["Supportability/Python/Profiler/BackOff"].call_count == 1
+
+    assert not manager.overhead_metrics("other")
+
+    # Metrics are only returned once, including for a finished session.
+
+    manager.record_overhead(0.02, 3)
+    manager.stop_profile_session("app")
+
+    metrics = dict(manager.overhead_metrics("app"))
+    assert metrics["Supportability/Python/Profiler/SampleTime"].total_call_time == 0.02
+    assert not manager.overhead_metrics("app")
@@ -21,7 +21,8 @@ from testing_support.fixtures import override_generic_settings
 
 from newrelic.core.config import global_settings
 from newrelic.samplers.cpu_usage import cpu_usage_data_source
-from newrelic.samplers.gc_data import garbage_collector_data_source
+from newrelic.samplers.gc_data import _object_type_census, garbage_collector_data_source
+from newrelic.samplers.memory_allocations import memory_allocations_data_source
 from newrelic.samplers.memory_usage import memory_usage_data_source
 
 settings = global_settings()
@@ -43,6 +44,14 @@ def cpu_data_source():
     sampler.stop()
 
 
+@pytest.fixture
+def memory_allocations_sampler():
+    sampler = memory_allocations_data_source(settings=())["factory"](environ={})
+    sampler.start()
+    yield sampler
+    sampler.stop()
+
+
 @pytest.fixture
 def memory_data_source():
     sampler = memory_usage_data_source(settings=())["factory"](environ=())
@@ -111,6 +120,63 @@ def test_gc_metrics_collection(gc_data_source, top_object_count_limit):
     _test()
 
 
+class CensusObject:
+    pass
+
+
+CENSUS_OBJECTS = [{} for _ in range(60000)] + [[] for _ in range(30000)] + [CensusObject() for _ in range(10000)]
+
+
+def test_gc_object_type_census_full():
+    census = _object_type_census(CENSUS_OBJECTS, 2)
+    assert census == [(dict, 60000, 0), (list, 30000, 0)]
+
+
+@pytest.mark.parametrize("time_budget", (0.0, 1e-9))
+def test_gc_object_type_census_sampled(time_budget):
+    census = _object_type_census(CENSUS_OBJECTS, 3, sample_size=20000, time_budget=time_budget)
+
+    assert [obj_type for obj_type, _, _ in census] == [dict, list, CensusObject]
+
+    expected = {dict: 60000, list: 30000, CensusObject: 10000}
+    for obj_type, count, margin in census:
+        assert margin > 0
+        # Allow for twice the 95% margin of error so that the test is not
+        # flaky.
+        assert abs(count - expected[obj_type]) <= 2 * margin
+
+    if time_budget:
+        # Only the first slice is counted once the time budget has run
+        # out, which gives a wider margin of error.
+        full_budget = _object_type_census(CENSUS_OBJECTS, 1, sample_size=20000)
+        assert census[0][2] > full_budget[0][2]
+
+
+@pytest.mark.xfail(
+    platform.python_implementation() == "PyPy",
+    reason="Not implemented on PyPy yet",
+    strict=True,
+    raises=AssertionError,
+)
+def test_gc_metrics_sampled_census(gc_data_source):
+    @override_generic_settings(
+        settings,
+        {
+            "gc_runtime_metrics.enabled": True,
+            "gc_runtime_metrics.top_object_count_limit": 1,
+            "gc_runtime_metrics.census_sample_size": 1000,
+        },
+    )
+    def _test():
+        metrics_table = set(m[0] for m in (gc_data_source() or ()))
+
+        type_metrics = [metric for metric in metrics_table if metric.startswith(f"GC/objects/{PID}/type/")]
+        assert len(type_metrics) == 2, type_metrics
+        assert any(metric.endswith("/margin") for metric in type_metrics)
+
+    _test()
+
+
 @pytest.mark.skipif(
     platform.python_implementation() == "PyPy",
     reason="GC Metrics are always disabled on PyPy",
@@ -162,3 +228,61 @@ def test_memory_metrics_collection(memory_data_source, enabled):
             assert EXPECTED_MEMORY_METRICS[1] in metrics_table
 
     _test()
+
+
+def allocate_blocks():
+    return [bytearray(1024) for _ in range(1000)]
+
+
+@pytest.mark.skipif(
+    platform.python_implementation() == "PyPy",
+    reason="tracemalloc is not available on PyPy",
+)
+def test_memory_allocations_metrics(memory_allocations_sampler):
+    @override_generic_settings(settings, {"memory_allocations.enabled": True, "memory_allocations.overhead_budget": 0.0})
+    def _test():
+        import tracemalloc
+
+        # Tracing is started by the first harvest, and the first snapshot
+        # is only used as the baseline.
+        assert list(memory_allocations_sampler() or ()) == []
+        assert tracemalloc.is_tracing()
+
+        metrics_table = dict(memory_allocations_sampler() or ())
+        assert f"Memory/Allocations/{PID}/traced" in metrics_table
+
+        blocks = allocate_blocks()  # noqa: F841
+
+        metrics_table = dict(memory_allocations_sampler() or ())
+        assert metrics_table[f"Memory/Allocations/{PID}/growth"] >= 1024 * 1000
+
+        # The allocation sites are only reported in custom events, so the
+        # number of metric names is bounded.
+        assert not any("/site/" in metric for metric in metrics_table)
+
+    _test()
+
+
+@pytest.mark.skipif(
+    platform.python_implementation() == "PyPy",
+    reason="tracemalloc is not available on PyPy",
+)
+def test_memory_allocations_paused(memory_allocations_sampler):
+    @override_generic_settings(
+        settings, {"memory_allocations.enabled": True, "memory_allocations.max_overhead_memory": 1}
+    )
+    def _test():
+        import tracemalloc
+
+        list(memory_allocations_sampler() or ())
+
+        # Tracing is paused as tracemalloc is using more memory than the
+        # limit, and is resumed at the following harvest.
+        metrics_table = dict(memory_allocations_sampler() or ())
+        assert "Supportability/Python/MemoryAllocations/Paused" in metrics_table
+        assert not tracemalloc.is_tracing()
+
+        assert list(memory_allocations_sampler() or ()) == []
+        assert tracemalloc.is_tracing()
+
+    _test()
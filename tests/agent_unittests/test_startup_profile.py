@@ -0,0 +1,82 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+
+import newrelic
+from newrelic.core.startup_profile import StartupProfile
+
+
+def test_startup_profile_report(tmp_path):
+    sys.modules.pop("_test_import_hook", None)
+
+    profile = StartupProfile(str(tmp_path / "profile-{pid}.json"))
+
+    with profile.phase("initialize"):
+        pass
+
+    with profile.hook("target", "newrelic.hooks.target", "instrument"):
+        import _test_import_hook  # noqa: F401
+
+    profile.write()
+
+    with open(tmp_path / f"profile-{os.getpid()}.json") as fh:
+        report = json.load(fh)
+
+    assert [phase["name"] for phase in report["phases"]] == ["initialize"]
+
+    (hook,) = report["hooks"]
+    assert (hook["target"], hook["module"], hook["function"]) == ("target", "newrelic.hooks.target", "instrument")
+    assert report["instrumentation_time"] == hook["duration"]
+
+    assert report["imported_by_agent"] == ["_test_import_hook"]
+    assert report["agent_modules"] == []
+
+
+def test_startup_profile_command(tmp_path):
+    root_directory = os.path.dirname(os.path.dirname(newrelic.__file__))
+    output = tmp_path / "profile.json"
+
+    env = dict(os.environ)
+    env.pop("NEW_RELIC_CONFIG_FILE", None)
+    env.update({"PYTHONPATH": root_directory, "NEW_RELIC_DEVELOPER_MODE": "true"})
+
+    subprocess.check_call(
+        [
+            sys.executable,
+            "-m",
+            "newrelic.admin",
+            "startup-profile",
+            f"--output={output}",
+            sys.executable,
+            "-c",
+            "import sqlite3",
+        ],
+        env=env,
+        cwd=str(tmp_path),
+    )
+
+    with open(output) as fh:
+        report = json.load(fh)
+
+    phases = [phase["name"] for phase in report["phases"]]
+    assert phases[:2] == ["bootstrap", "import"]
+    assert "initialize.instrumentation" in phases
+    assert "initialize" in phases
+
+    assert "sqlite3" in {hook["target"] for hook in report["hooks"]}
+    assert "newrelic.config" in report["agent_modules"]
@@ -0,0 +1,100 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import _thread
+import threading
+import time
+
+from newrelic.core.thread_counters import ThreadLocalCounters
+
+THREADS = 200
+
+
+def test_thread_local_counters_harvest():
+    counters = ThreadLocalCounters()
+    counters.increment("INFO")
+    counters.increment("INFO")
+    counters.increment("ERROR", 3)
+
+    assert counters.harvest() == {"INFO": 2, "ERROR": 3}
+    assert counters.harvest() == {}
+
+    counters.increment("INFO")
+    assert counters.harvest() == {"INFO": 1}
+
+
+def test_thread_local_counters_threads():
+    counters = ThreadLocalCounters()
+    harvested = {}
+    done = threading.Event()
+
+    def _increment():
+        for _ in range(10000):
+            counters.increment("INFO")
+
+    def _harvest():
+        # Harvest while the counters are being incremented to check that
+        # no counts are lost.
+        while not done.is_set():
+            for key, value in counters.harvest().items():
+                harvested[key] = harvested.get(key, 0) + value
+
+    harvester = threading.Thread(target=_harvest)
+    harvester.start()
+
+    threads = [threading.Thread(target=_increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    done.set()
+    harvester.join()
+
+    for key, value in counters.harvest().items():
+        harvested[key] = harvested.get(key, 0) + value
+
+    assert harvested == {"INFO": 80000}
+
+    # The counts for threads which have exited are dropped once they have
+    # been harvested.
+    assert counters._entries == []
+
+
+def test_thread_local_counters_released_without_threading():
+    # Threads not started through the threading module are represented by
+    # dummy threads which are always alive, so the entries are released
+    # when the thread local storage of the thread is cleared instead.
+
+    counters = ThreadLocalCounters()
+    done = threading.Semaphore(0)
+
+    def _increment():
+        counters.increment("INFO")
+        done.release()
+
+    for _ in range(THREADS):
+        _thread.start_new_thread(_increment, ())
+    for _ in range(THREADS):
+        assert done.acquire(timeout=5.0)
+
+    harvested = {}
+    deadline = time.time() + 5.0
+    while counters._entries and time.time() < deadline:
+        for key, value in counters.harvest().items():
+            harvested[key] = harvested.get(key, 0) + value
+        time.sleep(0.01)
+
+    assert harvested == {"INFO": THREADS}
+    assert counters._entries == []
@@ -0,0 +1,136 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from newrelic.common.utilization import (
+    AzureUtilization,
+    GCPUtilization,
+    UtilizationHttpClient,
+    detect_cloud_vendor,
+    utilization_cache_path,
+)
+
+GCP_METADATA = {"id": "1", "machineType": "t1000", "name": "arnold", "zone": "abc"}
+AZURE_METADATA = {"location": "foo", "name": "bar", "vmId": "baz", "vmSize": "boo"}
+
+
+def metadata_server(metadata, delay=0.0):
+    """Starts a local stand in for a cloud vendor metadata endpoint which
+    responds with the metadata after the delay.
+
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps(metadata).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def local_vendor(base, port, fetch_timeout=5.0):
+    class LocalClient(UtilizationHttpClient):
+        def __init__(self, host, *args, **kwargs):
+            super(LocalClient, self).__init__(host, port, *args, **kwargs)
+
+    return type(
+        base.__name__,
+        (base,),
+        {"METADATA_HOST": "127.0.0.1", "CLIENT_CLS": LocalClient, "FETCH_TIMEOUT": fetch_timeout},
+    )
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def _server(metadata, delay=0.0):
+        server = metadata_server(metadata, delay)
+        started.append(server)
+        return server.server_address[1]
+
+    yield _server
+
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def unused_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_detect_cloud_vendor_in_order(servers):
+    gcp = local_vendor(GCPUtilization, servers(GCP_METADATA, delay=0.2))
+    azure = local_vendor(AzureUtilization, servers(AZURE_METADATA))
+
+    # The vendors earlier in the order are preferred, even when a later one
+    # responds first.
+    assert detect_cloud_vendor([gcp, azure], timeout=5.0) == ("gcp", GCP_METADATA)
+
+
+def test_detect_cloud_vendor_timeout(servers):
+    gcp = local_vendor(GCPUtilization, servers(GCP_METADATA, delay=1.0))
+    azure = local_vendor(AzureUtilization, servers(AZURE_METADATA))
+
+    start = time.time()
+    assert detect_cloud_vendor([gcp, azure], timeout=0.3) == ("azure", AZURE_METADATA)
+    assert time.time() - start < 0.8
+
+
+def test_detect_cloud_vendor_unreachable_host():
+    port = unused_port()
+    gcp = local_vendor(GCPUtilization, port)
+    azure = local_vendor(AzureUtilization, port)
+
+    assert detect_cloud_vendor([gcp, azure], timeout=5.0) is None
+    assert ("127.0.0.1", port) in UtilizationHttpClient.UNREACHABLE_HOSTS
+
+
+def test_detect_cloud_vendor_cache(servers, tmp_path):
+    cache_path = utilization_cache_path(str(tmp_path), "cca356a7-d727-37f6-45a1-0c122ebbe906")
+    azure = local_vendor(AzureUtilization, servers(AZURE_METADATA))
+
+    assert detect_cloud_vendor([azure], timeout=5.0, cache_path=cache_path) == ("azure", AZURE_METADATA)
+
+    # The cached vendor is returned without probing the metadata endpoint.
+    azure = local_vendor(AzureUtilization, unused_port())
+    assert detect_cloud_vendor([azure], timeout=5.0, cache_path=cache_path) == ("azure", AZURE_METADATA)
+
+    # Vendors which are not in the cache are still probed.
+    gcp = local_vendor(GCPUtilization, servers(GCP_METADATA))
+    assert detect_cloud_vendor([gcp], timeout=5.0, cache_path=cache_path) == ("gcp", GCP_METADATA)
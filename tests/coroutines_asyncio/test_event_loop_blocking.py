@@ -0,0 +1,152 @@
+# Copyright 2010 New Relic, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+
+import pytest
+from testing_support.fixtures import core_application_stats_engine, override_generic_settings, reset_core_stats_engine
+
+from newrelic.api.application import application_instance
+from newrelic.api.background_task import background_task
+from newrelic.common.object_wrapper import wrap_function_wrapper
+from newrelic.core.config import global_settings
+from newrelic.hooks.coroutines_asyncio import _wrap_handle_run
+from newrelic.samplers.event_loop_blocking import SLOW_CALLBACK_EVENT_TYPE, event_loop_blocking_data_source
+
+
+@pytest.fixture(scope="module", autouse=True)
+def callback_timing():
+    # Callback timing is only enabled for the tests in this module, so that
+    # the callbacks of other tests are not timed. As it was not enabled when
+    # asyncio was instrumented, the callbacks are instrumented here.
+
+    original_run = asyncio.events.Handle._run
+    original_callback_timing = global_settings().event_loop_visibility.callback_timing
+
+    settings = global_settings().event_loop_visibility
+    settings.callback_timing = True
+    wrap_function_wrapper(asyncio.events, "Handle._run", _wrap_handle_run(settings))
+
+    yield
+
+    asyncio.events.Handle._run = original_run
+    global_settings().event_loop_visibility.callback_timing = original_callback_timing
+
+
+def create_sampler(app_name):
+    sampler = event_loop_blocking_data_source(settings=())["factory"](environ={"consumer.name": app_name})
+    sampler.start()
+    return sampler
+
+
+@pytest.fixture
+def event_loop_blocking_sampler():
+    sampler = create_sampler(application_instance().name)
+    yield sampler
+    sampler.stop()
+
+
+async def blocking_coroutine():
+    await asyncio.sleep(0)
+    time.sleep(0.1)
+
+
+async def fast_coroutine():
+    await asyncio.sleep(0)
+
+
+def run_in_event_loop(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro())
+    finally:
+        loop.close()
+
+
+@reset_core_stats_engine()
+def test_event_loop_blocked(event_loop_blocking_sampler):
+    @background_task(name="blocking_task")
+    def _test():
+        run_in_event_loop(blocking_coroutine)
+
+    @override_generic_settings(global_settings(), {"event_loop_visibility.blocking_threshold": 0.05})
+    def _harvest():
+        _test()
+        return dict(event_loop_blocking_sampler() or ())
+
+    metrics = _harvest()
+
+    loop_name = threading.current_thread().name
+
+    assert metrics[f"EventLoop/Blocked/{loop_name}"]["count"] == 1
+    assert metrics[f"EventLoop/Blocked/{loop_name}"]["total"] >= 0.1
+    assert metrics["EventLoop/Blocked/all"]["count"] == 1
+
+    events = [
+        params
+        for intrinsics, params in core_application_stats_engine().custom_events
+        if intrinsics["type"] == SLOW_CALLBACK_EVENT_TYPE
+    ]
+
+    assert len(events) == 1
+    assert events[0]["coroutine"] == "blocking_coroutine"
+    assert events[0]["transactionName"] == "OtherTransaction/Function/blocking_task"
+    assert events[0]["loop"] == loop_name
+    assert events[0]["duration"] >= 0.1
+
+
+@reset_core_stats_engine()
+def test_event_loop_not_blocked(event_loop_blocking_sampler):
+    @override_generic_settings(global_settings(), {"event_loop_visibility.blocking_threshold": 0.05})
+    def _harvest():
+        run_in_event_loop(fast_coroutine)
+        return list(event_loop_blocking_sampler() or ())
+
+    assert _harvest() == []
+
+    events = [
+        params
+        for intrinsics, params in core_application_stats_engine().custom_events
+        if intrinsics["type"] == SLOW_CALLBACK_EVENT_TYPE
+    ]
+    assert not events
+
+
+def test_event_loop_blocking_disabled(event_loop_blocking_sampler):
+    @override_generic_settings(global_settings(), {"event_loop_visibility.callback_timing": False})
+    def _harvest():
+        return list(event_loop_blocking_sampler() or ())
+
+    assert _harvest() == []
+
+
+def test_event_loop_blocked_per_application(event_loop_blocking_sampler):
+    other_sampler = create_sampler("Other Application")
+
+    @override_generic_settings(global_settings(), {"event_loop_visibility.blocking_threshold": 0.05})
+    def _harvest():
+        # A callback outside of a transaction is recorded against the
+        # default application.
+        run_in_event_loop(blocking_coroutine)
+        return dict(event_loop_blocking_sampler() or ()), list(other_sampler() or ())
+
+    try:
+        metrics, other_metrics = _harvest()
+    finally:
+        other_sampler.stop()
+
+    assert metrics["EventLoop/Blocked/all"]["count"] == 1
+    assert other_metrics == []
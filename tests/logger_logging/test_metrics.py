@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
+
 from newrelic.api.background_task import background_task
 from testing_support.fixtures import reset_core_stats_engine
 from testing_support.validators.validate_custom_metrics_outside_transaction import validate_custom_metrics_outside_transaction
@@ -55,3 +57,27 @@ def test_logging_metrics_outside_transaction(logger):
         exercise_logging(logger)
 
     test()
+
+
+@reset_core_stats_engine()
+def test_logging_metrics_outside_transaction_threads(logger):
+    @validate_custom_metrics_outside_transaction(
+        [(name, count * 4) for name, count in _test_logging_unscoped_metrics]
+    )
+    def test():
+        def _exercise_logging():
+            logger.debug("A")
+            logger.info("B")
+            logger.warning("C")
+            logger.error("D")
+            logger.critical("E")
+
+        threads = [threading.Thread(target=_exercise_logging) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(logger.caplog.records) == 12
+
+    test()
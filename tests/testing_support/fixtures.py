@@ -54,7 +54,7 @@ from newrelic.core.attribute_filter import (
     DST_TRANSACTION_TRACER,
     AttributeFilter,
 )
-from newrelic.core.config import apply_config_setting, flatten_settings, global_settings
+from newrelic.core.config import HotFlags, apply_config_setting, flatten_settings, global_settings
 from newrelic.network.exceptions import RetryDataForRequest
 
 _logger = logging.getLogger("newrelic.tests")
@@ -1007,11 +1007,12 @@ def override_application_settings(overrides):
             for name, value in overrides.items():
                 apply_config_setting(original_settings, name, value)
 
-            # should also update the attribute filter since it is affected
-            # by application settings
+            # should also update the attribute filter and hot flags since
+            # they are affected by application settings
 
             flat_settings = flatten_settings(original_settings)
             original_settings.attribute_filter = AttributeFilter(flat_settings)
+            original_settings.hot_flags = HotFlags.from_settings(original_settings)
 
             return wrapped(*args, **kwargs)
         finally:
@@ -1056,6 +1057,12 @@ def override_generic_settings(settings_object, overrides):
         try:
             for name, value in overrides.items():
                 apply_config_setting(original, name, value)
+
+            # Finalized application settings carry a snapshot of the hot
+            # flags which must reflect the overrides.
+            if "hot_flags" in vars(original):
+                original.hot_flags = HotFlags.from_settings(original)
+
             return wrapped(*args, **kwargs)
         finally:
             original.__dict__.clear()
@@ -1129,6 +1136,9 @@ def reset_core_stats_engine():
         custom_stats = core_application._stats_custom_engine
         custom_stats.reset_stats(custom_stats.settings)
 
+        # Discard any log lines counted but not yet recorded as metrics.
+        core_application._log_line_counters.harvest()
+
         return wrapped(*args, **kwargs)
 
     return _reset_core_stats_engine
@@ -1149,6 +1159,21 @@ def core_application_stats_engine(app_name=None):
     return core_application._stats_engine
 
 
+def record_log_line_metrics(app_name=None):
+    """Record the log lines counted outside of a transaction as metrics in
+    the custom StatsEngine of the core application, as is done at the start
+    of a harvest.
+
+    """
+
+    api_application = application_instance(app_name)
+    api_name = api_application.name
+    core_application = api_application._agent.application(api_name)
+
+    with core_application._stats_custom_lock:
+        core_application._record_log_line_metrics()
+
+
 def core_application_stats_engine_error(error_type, app_name=None):
     """Return a single error with the type of error_type, or None.
 
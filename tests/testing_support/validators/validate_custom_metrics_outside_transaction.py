@@ -14,7 +14,7 @@
 
 import copy
 
-from testing_support.fixtures import catch_background_exceptions
+from testing_support.fixtures import catch_background_exceptions, record_log_line_metrics
 from newrelic.common.object_wrapper import transient_function_wrapper, function_wrapper
 
 
@@ -75,7 +75,15 @@ def validate_custom_metrics_outside_transaction(custom_metrics=None):
             else:
                 assert metric is None, _metrics_table()
 
-        _new_wrapper = _validate_custom_metrics_outside_transaction(wrapped)
+        def _wrapped(*args, **kwargs):
+            try:
+                return wrapped(*args, **kwargs)
+            finally:
+                # Log lines counted outside of a transaction are only
+                # recorded as metrics at harvest time.
+                record_log_line_metrics()
+
+        _new_wrapper = _validate_custom_metrics_outside_transaction(_wrapped)
         val = _new_wrapper(*args, **kwargs)
         assert record_custom_metric_called
         metrics = recorded_metrics[0]